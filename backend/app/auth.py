@@ -1,17 +1,36 @@
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Any, Callable, Dict, Optional
+import asyncio
+import hashlib
+import threading
+import time
 from jose import JWTError, jwt
 import bcrypt
 from fastapi import Depends, HTTPException, status, Request
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy import inspect
+from sqlalchemy.orm import Session, make_transient_to_detached
+from app.cache import TTLCache
 from app.config import get_settings
 from app.database import get_db
+from app.jwt_backend import get_jwt_backend
+from app.metrics import register_collector
 from app.models import User
 
 settings = get_settings()
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/login")
 
+# Column values of recently authenticated users, keyed by (user id, token iat)
+user_cache = TTLCache(maxsize=settings.USER_CACHE_SIZE, ttl=settings.USER_CACHE_TTL_SECONDS)
+register_collector("user_cache", user_cache.stats)
+_USER_COLUMNS = [attr.key for attr in inspect(User).column_attrs]
+
+# Verified claims keyed by token digest, each entry lives until the token's exp
+token_cache = TTLCache(maxsize=settings.TOKEN_CACHE_SIZE, ttl=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+register_collector("token_cache", token_cache.stats)
+jwt_backend = get_jwt_backend(settings.JWT_BACKEND)
+
 def get_token_from_request(request: Request) -> Optional[str]:
     """Extract token from Authorization header if present"""
     authorization: str = request.headers.get("Authorization", "")
@@ -26,9 +45,85 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
 
 def get_password_hash(password: str) -> str:
-    # Use minimal salt rounds for faster hashing (4 rounds = ~50ms)
-    # Production should use 10-12 rounds for better security
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=4)).decode('utf-8')
+    # Cost comes from settings (BCRYPT_ROUNDS), each +1 doubles the work
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=settings.BCRYPT_ROUNDS)).decode('utf-8')
+
+def password_needs_rehash(hashed_password: str) -> bool:
+    """True if the hash was made with fewer rounds than currently configured"""
+    try:
+        rounds = int(hashed_password.split('$')[2])
+    except (IndexError, ValueError):
+        return False
+    return rounds < settings.BCRYPT_ROUNDS
+
+class PasswordHasherPool:
+    """
+    Runs bcrypt on a bounded thread pool so it never blocks the event loop
+
+    bcrypt releases the GIL, so threads hash in parallel. Callers beyond
+    `max_pending` queued or running jobs get a 429 instead of piling up.
+    """
+
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.pending = 0
+        self.rejected = 0
+        self.completed = 0
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    async def run(self, fn: Callable, *args):
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise HTTPException(
+                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                    detail="Too many login attempts in progress, please retry",
+                    headers={"Retry-After": "1"},
+                )
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+            self.pending += 1
+            try:
+                future = self._executor.submit(fn, *args)
+            except BaseException:
+                self.pending -= 1
+                raise
+        # A cancelled caller (client disconnect) leaves the hash running, so
+        # the slot is freed when the thread finishes rather than when the
+        # awaiting coroutine unwinds
+        future.add_done_callback(self._done)
+        return await asyncio.wrap_future(future)
+
+    def _done(self, future: Future) -> None:
+        with self._lock:
+            self.pending -= 1
+            self.completed += 1
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "pending": self.pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "bcrypt_rounds": settings.BCRYPT_ROUNDS,
+        }
+
+password_pool = PasswordHasherPool(workers=settings.PASSWORD_HASH_WORKERS, max_pending=settings.PASSWORD_HASH_MAX_PENDING)
+register_collector("password_pool", password_pool.stats)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await password_pool.run(verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    return await password_pool.run(get_password_hash, password)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     to_encode = data.copy()
@@ -36,10 +131,60 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "iat": datetime.utcnow()})
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
+def decode_token(token: str) -> Dict[str, Any]:
+    """
+    Verify a token and return its claims, raising JWTError if invalid
+
+    The SPA sends the same token on every call, so verified claims are
+    remembered until the token expires and repeats skip the signature check.
+    """
+    digest = hashlib.sha256(token.encode("utf-8")).digest()
+    claims = token_cache.get(digest)
+    if claims is not None:
+        return claims
+
+    claims = jwt_backend.decode(token, settings.SECRET_KEY, [settings.ALGORITHM])
+    exp = claims.get("exp")
+    if isinstance(exp, (int, float)):
+        token_cache.set(digest, claims, ttl=exp - time.time())
+    return claims
+
+def invalidate_user_cache(user_id: int) -> None:
+    """Forget cached identities for a user after their row changes"""
+    user_cache.pop_where(lambda key: key[0] == user_id)
+
+def load_user(db: Session, user_id, issued_at=None) -> Optional[User]:
+    """
+    Return the user for a verified token, from the cache when possible
+
+    A cache hit rebuilds the User from stored column values and attaches it
+    to the request session without a SELECT. Relationships still lazy-load
+    and attribute changes are flushed on commit as usual.
+    """
+    try:
+        user_id = int(user_id)
+    except (TypeError, ValueError):
+        return None
+
+    key = (user_id, issued_at)
+    values = user_cache.get(key)
+    if values is not None:
+        user = db.identity_map.get(db.identity_key(User, user_id))
+        if user is None:
+            user = User(**values)
+            make_transient_to_detached(user)
+            db.add(user)
+        return user
+
+    user = db.query(User).filter(User.id == user_id).first()
+    if user is not None:
+        user_cache.set(key, {column: getattr(user, column) for column in _USER_COLUMNS})
+    return user
+
 def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -47,14 +192,14 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        payload = decode_token(token)
         user_id: int = payload.get("sub")
         if user_id is None:
             raise credentials_exception
     except JWTError:
         raise credentials_exception
     
-    user = db.query(User).filter(User.id == user_id).first()
+    user = load_user(db, user_id, payload.get("iat"))
     if user is None:
         raise credentials_exception
     return user
@@ -67,12 +212,11 @@ def get_current_user_optional(request: Request, db: Session = Depends(get_db)) -
         return None
     
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        payload = decode_token(token)
         user_id: int = payload.get("sub")
         if user_id is None:
             return None
     except JWTError:
         return None
     
-    user = db.query(User).filter(User.id == user_id).first()
-    return user
+    return load_user(db, user_id, payload.get("iat"))
\ No newline at end of file
@@ -5,10 +5,39 @@ import json
 class Settings(BaseSettings):
     APP_NAME: str = "Unified Services Portal"
     DATABASE_URL: str = "sqlite:///./unified_portal.db"
+    # Connection pool (file SQLite and Postgres)
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = 1800
+    # SQLite tuning, applied to every new connection
+    SQLITE_JOURNAL_MODE: str = "WAL"
+    SQLITE_SYNCHRONOUS: str = "NORMAL"
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    SQLITE_MMAP_SIZE: int = 268435456
+    # Apply pending schema migrations at startup instead of failing (single-worker dev setups)
+    AUTO_MIGRATE: bool = False
     SECRET_KEY: str = "your-secret-key-here-change-in-production"
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     
+    # Authenticated-user cache (per process)
+    USER_CACHE_SIZE: int = 10000
+    USER_CACHE_TTL_SECONDS: float = 60.0
+    
+    # JWT verification: "jose", or opt in to "hmac" (stdlib HS256/384/512 fast path), and verified-claims cache size
+    JWT_BACKEND: str = "jose"
+    TOKEN_CACHE_SIZE: int = 10000
+    
+    # Per-user autofill account bundle cache, dropped whenever an account is added or deleted
+    AUTOFILL_CACHE_SIZE: int = 10000
+    AUTOFILL_CACHE_TTL_SECONDS: float = 300.0
+    
+    # Password hashing: bcrypt cost, worker threads and max queued+running hashes before 429
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_PENDING: int = 64
+    
     # Server Configuration
     HOST: Optional[str] = "127.0.0.1"
     PORT: Optional[str] = "8000"
@@ -31,6 +60,11 @@ class Settings(BaseSettings):
     BROWSER_USE_API_KEY: Optional[str] = None
     PYTHONPATH: Optional[str] = None
     
+    # Services catalog: seconds between services_data.json change checks (0 disables)
+    SERVICES_RELOAD_INTERVAL: float = 10.0
+    # Browser cache lifetime (seconds) for pre-rendered catalog responses
+    CATALOG_CACHE_MAX_AGE: int = 60
+    
     # WhatsApp Business API Configuration
     WHATSAPP_BUSINESS_ACCOUNT_ID: str = ""
     WHATSAPP_PHONE_NUMBER_ID: str = ""
@@ -41,6 +75,91 @@ class Settings(BaseSettings):
     RPA_MODE: str = "DEMO"  # DEMO, STAGING, PRODUCTION
     DEMO_BASE_URL: str = "http://localhost:8000/demo-govt"
     
+    # RPA job queue: in-process worker threads (0 = run python -m app.rpa instead),
+    # idle poll interval, claim lease (visibility timeout), how often expired
+    # leases are recovered and retry backoff
+    RPA_WORKERS: int = 2
+    RPA_POLL_INTERVAL: float = 2.0
+    RPA_LEASE_SECONDS: float = 300.0
+    RPA_REAP_INTERVAL: float = 30.0
+    RPA_MAX_RETRIES: int = 3
+    RPA_RETRY_BASE_SECONDS: float = 30.0
+    RPA_RETRY_MAX_SECONDS: float = 900.0
+    # Per-portal limits for targets without "rpa_limits" in services_data.json,
+    # counted from the job table so they hold across all worker processes
+    RPA_DEFAULT_RATE_PER_MINUTE: float = 6.0
+    RPA_DEFAULT_BURST: float = 2.0
+    RPA_DEFAULT_MAX_IN_FLIGHT: int = 1
+    # Headless browser pool: off uses the direct demo handlers; browsers are
+    # recycled after MAX_USES jobs or past MAX_MEMORY_MB of RSS
+    RPA_BROWSER_AUTOMATION: bool = False
+    RPA_BROWSER_POOL_SIZE: int = 2
+    RPA_BROWSER_MAX_USES: int = 50
+    RPA_BROWSER_MAX_MEMORY_MB: float = 1024.0
+    RPA_BROWSER_CHECKOUT_TIMEOUT: float = 60.0
+    RPA_PAGE_TIMEOUT: float = 30.0
+    RPA_SCREENSHOT_DIR: str = "screenshots"
+    CHROME_DRIVER_PATH: Optional[str] = None
+    
+    # Bulk application filing: max items per request, rows per executemany,
+    # and batch size above which results stream as NDJSON
+    BULK_MAX_ITEMS: int = 1000
+    BULK_CHUNK_SIZE: int = 200
+    BULK_STREAM_THRESHOLD: int = 100
+    
+    # Status event streams: "memory" reaches only this process, "postgres"
+    # shares events between workers over LISTEN/NOTIFY
+    EVENT_BROKER: str = "memory"
+    EVENT_QUEUE_SIZE: int = 100
+    EVENT_HEARTBEAT_SECONDS: float = 15.0
+    EVENT_RETRY_MS: int = 3000
+    # Lifetime of the signed ticket an EventSource opens a stream with
+    EVENT_TICKET_SECONDS: float = 30.0
+    
+    # Document uploads: root directory, size cap and streaming chunk size
+    UPLOAD_DIR: str = "uploads"
+    UPLOAD_MAX_BYTES: int = 15 * 1024 * 1024
+    UPLOAD_CHUNK_SIZE: int = 256 * 1024
+    # nginx internal location aliasing UPLOAD_DIR (e.g. /protected-uploads/);
+    # when set, document downloads are handed to nginx with X-Accel-Redirect
+    DOWNLOAD_ACCEL_PREFIX: Optional[str] = None
+    
+    # Background processing of uploaded documents: worker processes shared
+    # by image normalization and OCR
+    DOCUMENT_WORKERS: int = 2
+    # Canonical image (longest side, JPEG quality) and list-view thumbnail
+    IMAGE_NORMALIZE: bool = True
+    IMAGE_MAX_DIMENSION: int = 2000
+    IMAGE_JPEG_QUALITY: int = 85
+    THUMBNAIL_SIZE: int = 320
+    THUMBNAIL_JPEG_QUALITY: int = 70
+    # OCR: tesseract binary, languages and per-image time limit
+    OCR_ENABLED: bool = True
+    TESSERACT_CMD: str = "tesseract"
+    OCR_LANGUAGES: str = "eng"
+    OCR_TIMEOUT_SECONDS: float = 60.0
+    # A process claims pending documents before processing them; a claim this
+    # old is taken to be from a process that died, and resume() retries it
+    DOCUMENT_CLAIM_SECONDS: float = 600.0
+    
+    # Outbound HTTP (proxy, WhatsApp): pooled clients per upstream host,
+    # HTTP/2 when h2 is installed, and per-caller timeouts
+    HTTP_MAX_HOSTS: int = 32
+    HTTP_MAX_CONNECTIONS_PER_HOST: int = 20
+    HTTP_MAX_KEEPALIVE_PER_HOST: int = 10
+    HTTP_KEEPALIVE_EXPIRY_SECONDS: float = 30.0
+    HTTP2_ENABLED: bool = True
+    HTTP_CONNECT_TIMEOUT_SECONDS: float = 5.0
+    PROXY_TIMEOUT_SECONDS: float = 30.0
+    WHATSAPP_TIMEOUT_SECONDS: float = 10.0
+    
+    # Rewritten proxy pages: cache size, cap on the Last-Modified heuristic
+    # freshness used when upstream sends no Cache-Control/Expires, and how
+    # long an expired page may be served while it is revalidated
+    PROXY_CACHE_MAX_BYTES: int = 32 * 1024 * 1024
+    PROXY_CACHE_DEFAULT_TTL_SECONDS: int = 60
+    PROXY_CACHE_STALE_SECONDS: int = 300
+    
     # Blocked URLs for safety
     BLOCKED_URLS: list = [
         "https://connect.torrentpower.com",
@@ -1,3 +1,5 @@
-from .service_loader import get_service_loader, ServiceLoader
+from .service_loader import get_service_loader, ServiceLoader, ServiceCatalog
+from .rendered import RenderedJSON, cached_json_response
+from .search_index import SupplierSearchIndex
 
-__all__ = ['get_service_loader', 'ServiceLoader']
+__all__ = ['get_service_loader', 'ServiceLoader', 'ServiceCatalog', 'RenderedJSON', 'cached_json_response', 'SupplierSearchIndex']
@@ -0,0 +1,103 @@
+"""
+Pre-rendered JSON responses for catalog endpoints
+Bodies are serialized and compressed once per catalog snapshot and served
+with a strong ETag, so repeat requests cost a dict lookup or a bare 304.
+Each content-coding has its own ETag ("<hash>-gzip"), as a strong
+validator must, and revalidation accepts any coding of the same body.
+"""
+import gzip
+import hashlib
+import json
+from typing import Any, Dict, Optional
+
+from fastapi import Request, Response
+from app.config import get_settings
+
+try:
+    import brotli
+except ImportError:  # optional, gzip is always available
+    brotli = None
+
+settings = get_settings()
+
+# Bodies smaller than this are not worth compressing
+MIN_COMPRESS_SIZE = 512
+
+
+class RenderedJSON:
+    """A JSON payload rendered to bytes, plus its compressed variants"""
+
+    def __init__(self, payload: Any):
+        # Same encoding as FastAPI's JSONResponse
+        self.body = json.dumps(
+            payload, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+        ).encode("utf-8")
+        self.digest = hashlib.sha256(self.body).hexdigest()[:32]
+        self.etag = '"' + self.digest + '"'
+        self.encoded: Dict[str, bytes] = {}
+
+        if len(self.body) >= MIN_COMPRESS_SIZE:
+            if brotli is not None:
+                self.encoded["br"] = brotli.compress(self.body, quality=11)
+            self.encoded["gzip"] = gzip.compress(self.body, compresslevel=9, mtime=0)
+
+    def etag_for(self, coding: Optional[str]) -> str:
+        """Strong ETag of the representation sent with `coding` (None for identity)"""
+        return f'"{self.digest}-{coding}"' if coding else self.etag
+
+    def pick_encoding(self, accept_encoding: str) -> Optional[str]:
+        """Best encoding we have that the client accepts, None for identity"""
+        # An explicit q for a coding overrides "*", so gzip;q=0 stays refused
+        qvalues: Dict[str, float] = {}
+        for item in accept_encoding.lower().split(","):
+            coding, *params = item.split(";")
+            q = 1.0
+            for param in params:
+                name, _, value = param.strip().partition("=")
+                if name == "q":
+                    try:
+                        q = float(value)
+                    except ValueError:
+                        q = 0.0
+            qvalues[coding.strip()] = q
+        for coding in ("br", "gzip"):
+            if coding in self.encoded and qvalues.get(coding, qvalues.get("*", 0.0)) > 0:
+                return coding
+        return None
+
+
+def etag_matches(if_none_match: str, digest: str) -> bool:
+    """
+    Weak comparison of an If-None-Match header against a body's digest,
+    ignoring the content-coding suffix: every coding decodes to the same body
+    """
+    if if_none_match.strip() == "*":
+        return True
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        opaque = candidate.strip('"')
+        if opaque == digest or opaque.rpartition("-")[0] == digest:
+            return True
+    return False
+
+
+def cached_json_response(request: Request, catalog: Any, key: str) -> Response:
+    """Serve a pre-rendered catalog body, or 304 if the client already has it"""
+    rendered: RenderedJSON = catalog.rendered[key]
+    coding = rendered.pick_encoding(request.headers.get("accept-encoding", ""))
+    headers = {
+        "ETag": rendered.etag_for(coding),
+        "Cache-Control": f"public, max-age={settings.CATALOG_CACHE_MAX_AGE}",
+        "Vary": "Accept-Encoding",
+        "X-Catalog-Version": str(catalog.version),
+    }
+
+    if etag_matches(request.headers.get("if-none-match", ""), rendered.digest):
+        return Response(status_code=304, headers=headers)
+
+    if coding:
+        headers["Content-Encoding"] = coding
+        return Response(content=rendered.encoded[coding], media_type="application/json", headers=headers)
+    return Response(content=rendered.body, media_type="application/json", headers=headers)
@@ -0,0 +1,175 @@
+"""
+Supplier Search Index
+Inverted index over supplier names, ids, aliases and facility text with
+exact, prefix and trigram (typo tolerant) matching
+"""
+import bisect
+import json
+import os
+import unicodedata
+from typing import Dict, List, Any, Tuple, Set
+
+# Field weights, a name hit outranks an id hit outranks a facility text hit
+FIELD_WEIGHTS = {
+    'name': 3.0,
+    'aliases': 2.5,
+    'id': 2.5,
+    'category': 1.0,
+    'name_change_facility': 0.5,
+    'address_change_facility': 0.5,
+}
+PREFIX_FACTOR = 0.8
+FUZZY_FACTOR = 0.6
+# Minimum trigram Jaccard similarity for a fuzzy match
+MIN_SIMILARITY = 0.35
+# Bonus when the whole query appears in the supplier name
+PHRASE_BONUS = 2.0
+MIN_PREFIX_LEN = 2
+
+ALIASES_FILE = os.path.join(os.path.dirname(__file__), 'search_aliases.json')
+
+
+def load_aliases() -> Dict[str, str]:
+    """
+    Gujarati/Hindi term -> English term, taken from the frontend i18n files
+    (frontend/src/i18n/{gu,hi}.json), which are not shipped with the backend
+    """
+    try:
+        with open(ALIASES_FILE, 'r', encoding='utf-8') as f:
+            by_language = json.load(f)
+    except Exception as e:
+        print(f"Error loading search aliases: {e}")
+        return {}
+    aliases = {}
+    for terms in by_language.values():
+        for term, english in terms.items():
+            aliases[normalize(term)] = normalize(english)
+    return aliases
+
+
+def normalize(text: str) -> str:
+    """NFKC, lowercase, punctuation and symbols turned into spaces"""
+    text = unicodedata.normalize('NFKC', text).lower()
+    return ''.join(
+        ' ' if unicodedata.category(ch)[0] in 'PZSC' else ch
+        for ch in text
+    ).strip()
+
+
+def tokenize(text: str) -> List[str]:
+    return normalize(text).split()
+
+
+def trigrams(token: str) -> Set[str]:
+    padded = f"  {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class SupplierSearchIndex:
+    """Built once per catalog snapshot, queried without scanning suppliers"""
+
+    def __init__(self, data: Dict[str, List[Dict[str, Any]]], aliases: Dict[str, str]):
+        self.aliases = aliases
+        # doc number -> (category, supplier)
+        self.docs: List[Tuple[str, Dict[str, Any]]] = []
+        self.doc_names: List[str] = []
+        # token -> {doc number: best field weight}
+        self.postings: Dict[str, Dict[int, float]] = {}
+        # trigram -> tokens containing it
+        self.trigram_tokens: Dict[str, Set[str]] = {}
+        self.token_trigrams: Dict[str, Set[str]] = {}
+
+        for category, suppliers in data.items():
+            for supplier in suppliers:
+                doc = len(self.docs)
+                self.docs.append((category, supplier))
+                self.doc_names.append(normalize(supplier.get('name', '')))
+
+                fields = {
+                    'name': supplier.get('name'),
+                    'aliases': ' '.join(supplier.get('aliases', [])),
+                    'id': supplier.get('id'),
+                    'category': category,
+                    'name_change_facility': supplier.get('name_change_facility'),
+                    'address_change_facility': supplier.get('address_change_facility'),
+                }
+                for field, text in fields.items():
+                    if not text:
+                        continue
+                    weight = FIELD_WEIGHTS[field]
+                    for token in tokenize(text):
+                        postings = self.postings.setdefault(token, {})
+                        if postings.get(doc, 0) < weight:
+                            postings[doc] = weight
+
+        self.sorted_tokens = sorted(self.postings)
+        for token in self.sorted_tokens:
+            grams = trigrams(token)
+            self.token_trigrams[token] = grams
+            for gram in grams:
+                self.trigram_tokens.setdefault(gram, set()).add(token)
+
+    def _expand(self, query: str) -> List[str]:
+        """Query tokens plus English equivalents of any Gujarati/Hindi terms"""
+        normalized = normalize(query)
+        tokens = normalized.split()
+        for term, english in self.aliases.items():
+            if term in normalized:
+                tokens.extend(english.split())
+        return list(dict.fromkeys(tokens))
+
+    def _matches(self, token: str) -> Dict[str, float]:
+        """Index tokens matching a query token, with a match quality factor"""
+        matches = {}
+        if token in self.postings:
+            matches[token] = 1.0
+
+        if len(token) >= MIN_PREFIX_LEN:
+            i = bisect.bisect_left(self.sorted_tokens, token)
+            while i < len(self.sorted_tokens) and self.sorted_tokens[i].startswith(token):
+                candidate = self.sorted_tokens[i]
+                matches.setdefault(candidate, PREFIX_FACTOR * len(token) / len(candidate))
+                i += 1
+
+        grams = trigrams(token)
+        shared: Dict[str, int] = {}
+        for gram in grams:
+            for candidate in self.trigram_tokens.get(gram, ()):
+                shared[candidate] = shared.get(candidate, 0) + 1
+        for candidate, count in shared.items():
+            similarity = count / len(grams | self.token_trigrams[candidate])
+            if similarity >= MIN_SIMILARITY:
+                quality = FUZZY_FACTOR * similarity
+                if quality > matches.get(candidate, 0):
+                    matches[candidate] = quality
+        return matches
+
+    def search(self, query: str, limit: int = 20, offset: int = 0) -> Tuple[int, List[Tuple[float, str, Dict[str, Any]]]]:
+        """
+        Ranked search, returns (total matches, [(score, category, supplier)])
+        for the requested page
+        """
+        scores: Dict[int, float] = {}
+        for token in self._expand(query):
+            # Each query token contributes its single best match per supplier
+            best: Dict[int, float] = {}
+            for candidate, quality in self._matches(token).items():
+                for doc, weight in self.postings[candidate].items():
+                    score = weight * quality
+                    if score > best.get(doc, 0):
+                        best[doc] = score
+            for doc, score in best.items():
+                scores[doc] = scores.get(doc, 0) + score
+
+        phrase = normalize(query)
+        if phrase:
+            for doc in scores:
+                if phrase in self.doc_names[doc]:
+                    scores[doc] += PHRASE_BONUS
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        page = ranked[offset:offset + limit]
+        return len(ranked), [
+            (round(score, 3), self.docs[doc][0], self.docs[doc][1])
+            for doc, score in page
+        ]
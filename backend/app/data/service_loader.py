@@ -3,14 +3,177 @@ Service Data Loader
 Loads all services from JSON file
 """
 import json
+import logging
 import os
-from typing import Dict, List, Any
+import threading
+from typing import Dict, List, Any, Optional, Tuple
+
+from .rendered import RenderedJSON
+from .search_index import SupplierSearchIndex, load_aliases
+
+logger = logging.getLogger(__name__)
+
+CATEGORIES = ["gas", "electricity", "water", "property"]
+AUTOMATED_TYPES = ('direct_form', 'login_assisted')
+SEARCH_ALIASES = load_aliases()
+
+
+class ServiceCatalog:
+    """
+    Indexed, read-only snapshot of services_data.json
+
+    Every lookup the routers need is precomputed once when the snapshot is
+    built, so request handlers never scan the supplier lists.
+    """
+
+    def __init__(self, data: Dict[str, List[Dict[str, Any]]], version: int = 1):
+        self.data = data
+        self.version = version
+        self.categories = list(data.keys())
+
+        # supplier id -> (category, supplier)
+        self.by_id: Dict[str, Tuple[str, Dict[str, Any]]] = {}
+        # (category, supplier id) -> supplier
+        self.by_category_id: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        # (category, lowercased name) -> supplier
+        self.by_name: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        # automation_type -> suppliers tagged with their category
+        self.by_automation_type: Dict[str, List[Dict[str, Any]]] = {}
+        # category -> filtered supplier lists
+        self.online: Dict[str, List[Dict[str, Any]]] = {}
+        self.rpa_enabled: Dict[str, List[Dict[str, Any]]] = {}
+        self.names: Dict[str, List[str]] = {}
+        # suppliers that are RPA enabled or have a fillable portal form
+        self.automation_capable: List[Dict[str, Any]] = []
+        # supplier id -> automation rate limits for that portal
+        self.rpa_limits: Dict[str, Dict[str, float]] = {}
+
+        for category, suppliers in data.items():
+            self.online[category] = [s for s in suppliers if s.get('online_available', False)]
+            self.rpa_enabled[category] = [s for s in suppliers if s.get('rpa_enabled', False)]
+            self.names[category] = [s['name'] for s in suppliers]
+
+            for supplier in suppliers:
+                supplier_id = supplier.get('id')
+                # First match wins, same as the old linear scans
+                self.by_id.setdefault(supplier_id, (category, supplier))
+                self.by_category_id.setdefault((category, supplier_id), supplier)
+                self.by_name.setdefault((category, supplier.get('name', '').lower()), supplier)
+                if supplier.get('rpa_limits'):
+                    self.rpa_limits.setdefault(supplier_id, supplier['rpa_limits'])
+
+                tagged = {**supplier, "category": category}
+                automation_type = supplier.get('automation_type', 'manual_only')
+                self.by_automation_type.setdefault(automation_type, []).append(tagged)
+                if supplier.get('rpa_enabled') or supplier.get('automation_type') in AUTOMATED_TYPES:
+                    self.automation_capable.append(tagged)
+
+        self.stats = self._compute_stats()
+        self.search_index = SupplierSearchIndex(data, SEARCH_ALIASES)
+        self.automation_summary = {
+            "automation_capable_suppliers": self.automation_capable,
+            "count": len(self.automation_capable),
+            "categories": {
+                "direct_form": len(self.by_automation_type.get('direct_form', [])),
+                "login_assisted": len(self.by_automation_type.get('login_assisted', [])),
+                "total": len(self.automation_capable)
+            }
+        }
+        supplier_summaries = [
+            {
+                "id": supplier.get('id'),
+                "name": supplier.get('name'),
+                "category": category,
+                "type": supplier.get('type'),
+                "portal_url": supplier.get('portal_url'),
+                "online_available": supplier.get('online_available', False),
+                "automation_type": supplier.get('automation_type', 'manual_only')
+            }
+            for category, suppliers in data.items()
+            for supplier in suppliers
+        ]
+        self.portal_suppliers = {
+            "suppliers": supplier_summaries,
+            "total_count": len(supplier_summaries),
+            "categories": self.categories
+        }
+
+        # Response bodies for the read-only catalog endpoints, rendered once
+        self.rendered: Dict[str, RenderedJSON] = {
+            "all": RenderedJSON(data),
+            "stats": RenderedJSON(self.stats),
+            "automation_capable": RenderedJSON(self.automation_summary),
+            "portal_suppliers": RenderedJSON(self.portal_suppliers),
+        }
+        for category in set(CATEGORIES) | set(self.categories):
+            services = data.get(category, [])
+            self.rendered[f"category:{category}"] = RenderedJSON({
+                "category": category,
+                "count": len(services),
+                "services": services
+            })
+
+    def _compute_stats(self) -> Dict[str, Any]:
+        """Statistics about services and automation capabilities"""
+        stats = {
+            "total_suppliers": 0,
+            "by_category": {},
+            "automation_stats": {
+                "direct_form": 0,
+                "login_assisted": 0,
+                "manual_only": 0,
+                "total_automated": 0
+            },
+            "online_availability": {
+                "online_available": 0,
+                "offline_only": 0
+            },
+            "portal_types": {
+                "government": 0,
+                "private": 0
+            }
+        }
+
+        for category, suppliers in self.data.items():
+            stats["by_category"][category] = len(suppliers)
+            stats["total_suppliers"] += len(suppliers)
+
+            for supplier in suppliers:
+                automation_type = supplier.get('automation_type', 'manual_only')
+                if automation_type in stats["automation_stats"]:
+                    stats["automation_stats"][automation_type] += 1
+                if automation_type in AUTOMATED_TYPES:
+                    stats["automation_stats"]["total_automated"] += 1
+
+                if supplier.get('online_available'):
+                    stats["online_availability"]["online_available"] += 1
+                else:
+                    stats["online_availability"]["offline_only"] += 1
+
+                portal_type = supplier.get('type', 'government')
+                if portal_type in stats["portal_types"]:
+                    stats["portal_types"][portal_type] += 1
+
+        return stats
+
+    def find_supplier(self, supplier_id: str) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+        """Find a supplier in any category, returns (category, supplier)"""
+        return self.by_id.get(supplier_id, (None, None))
+
 
 class ServiceLoader:
     def __init__(self):
         self.data_file = os.path.join(os.path.dirname(__file__), 'services_data.json')
-        self.services = self._load_services()
-    
+        self._lock = threading.Lock()
+        self._watcher: Optional[threading.Thread] = None
+        self._stop_watcher = threading.Event()
+        self._file_signature = self._stat_file()
+        self.catalog = ServiceCatalog(self._load_services())
+
+    @property
+    def services(self) -> Dict[str, List[Dict[str, Any]]]:
+        return self.catalog.data
+
     def _load_services(self) -> Dict[str, List[Dict[str, Any]]]:
         """Load services from JSON file"""
         try:
@@ -19,45 +182,124 @@ class ServiceLoader:
         except Exception as e:
             print(f"Error loading services: {e}")
             return {}
-    
+
+    def _stat_file(self) -> Optional[Tuple[int, int, int]]:
+        """(inode, mtime, size) of the data file, None if it is missing"""
+        try:
+            st = os.stat(self.data_file)
+        except OSError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    @staticmethod
+    def _validate(data: Any) -> None:
+        """Raise ValueError if data does not look like services_data.json"""
+        if not isinstance(data, dict) or not data:
+            raise ValueError("services data must be a non-empty object of categories")
+        seen = set()
+        for category, suppliers in data.items():
+            if not isinstance(suppliers, list):
+                raise ValueError(f"category '{category}' must be a list")
+            for supplier in suppliers:
+                if not isinstance(supplier, dict) or not supplier.get('id') or not supplier.get('name'):
+                    raise ValueError(f"supplier in '{category}' is missing id or name")
+                if supplier['id'] in seen:
+                    raise ValueError(f"duplicate supplier id '{supplier['id']}'")
+                seen.add(supplier['id'])
+                limits = supplier.get('rpa_limits')
+                if limits is not None and (
+                    not isinstance(limits, dict)
+                    or not all(isinstance(v, (int, float)) and v > 0 for v in limits.values())
+                ):
+                    raise ValueError(f"rpa_limits for '{supplier['id']}' must map names to positive numbers")
+
+    def reload_if_changed(self) -> bool:
+        """
+        Rebuild the catalog if services_data.json changed on disk
+
+        The new snapshot is built and validated off to the side, then swapped
+        in with a single assignment, so in-flight requests holding the old
+        catalog are unaffected. A broken file keeps the current snapshot.
+        """
+        with self._lock:
+            signature = self._stat_file()
+            if signature is None or signature == self._file_signature:
+                return False
+            try:
+                with open(self.data_file, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                self._validate(data)
+                catalog = ServiceCatalog(data, version=self.catalog.version + 1)
+            except Exception as e:
+                logger.error(f"Services data reload rejected, keeping version {self.catalog.version}: {e}")
+                # Remember the bad file so it isn't re-parsed on every poll
+                self._file_signature = signature
+                return False
+
+            self.catalog = catalog
+            self._file_signature = signature
+            logger.info(f"Services data reloaded, catalog version {catalog.version}")
+            return True
+
+    def start_watcher(self, interval: float) -> None:
+        """Poll the data file every `interval` seconds in a daemon thread"""
+        if interval <= 0 or (self._watcher and self._watcher.is_alive()):
+            return
+        self._stop_watcher.clear()
+
+        def watch():
+            while not self._stop_watcher.wait(interval):
+                try:
+                    self.reload_if_changed()
+                except Exception as e:
+                    logger.error(f"Services data watcher error: {e}")
+
+        self._watcher = threading.Thread(target=watch, name="services-data-watcher", daemon=True)
+        self._watcher.start()
+
+    def stop_watcher(self) -> None:
+        """Stop the polling thread started by start_watcher"""
+        self._stop_watcher.set()
+        if self._watcher:
+            self._watcher.join(timeout=5)
+            self._watcher = None
+
+    def get_catalog(self) -> ServiceCatalog:
+        """
+        Get the current indexed catalog snapshot
+
+        Handlers should fetch this once per request and use that snapshot
+        throughout, so a concurrent reload can't mix two versions.
+        """
+        return self.catalog
+
     def get_all_services(self) -> Dict[str, List[Dict[str, Any]]]:
         """Get all services"""
-        return self.services
-    
+        return self.catalog.data
+
     def get_services_by_category(self, category: str) -> List[Dict[str, Any]]:
         """Get services by category (gas, electricity, water, property)"""
-        return self.services.get(category, [])
-    
+        return self.catalog.data.get(category, [])
+
     def get_service_by_id(self, category: str, service_id: str) -> Dict[str, Any]:
         """Get specific service by ID"""
-        services = self.services.get(category, [])
-        for service in services:
-            if service['id'] == service_id:
-                return service
-        return {}
-    
+        return self.catalog.by_category_id.get((category, service_id), {})
+
     def get_online_services(self, category: str) -> List[Dict[str, Any]]:
         """Get only online available services"""
-        services = self.services.get(category, [])
-        return [s for s in services if s.get('online_available', False)]
-    
+        return self.catalog.online.get(category, [])
+
     def get_rpa_enabled_services(self, category: str) -> List[Dict[str, Any]]:
         """Get only RPA enabled services"""
-        services = self.services.get(category, [])
-        return [s for s in services if s.get('rpa_enabled', False)]
-    
+        return self.catalog.rpa_enabled.get(category, [])
+
     def get_service_names(self, category: str) -> List[str]:
         """Get list of service names for a category"""
-        services = self.services.get(category, [])
-        return [s['name'] for s in services]
-    
+        return self.catalog.names.get(category, [])
+
     def get_service_by_name(self, category: str, name: str) -> Dict[str, Any]:
         """Get service by name"""
-        services = self.services.get(category, [])
-        for service in services:
-            if service['name'].lower() == name.lower():
-                return service
-        return {}
+        return self.catalog.by_name.get((category, name.lower()), {})
 
 # Global instance
 _loader = None
@@ -87,4 +329,4 @@ if __name__ == "__main__":
         if rpa_services:
             print(f"\n{category.upper()}:")
             for service in rpa_services:
-                print(f"  - {service['name']}")
+                print(f"  - {service['name']}")
\ No newline at end of file
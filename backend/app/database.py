@@ -1,19 +1,222 @@
-from sqlalchemy import create_engine
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool, StaticPool
 from app.config import get_settings
+from app.metrics import register_collector
 
 settings = get_settings()
 
-# SQLite needs connect_args for check_same_thread
-connect_args = {"check_same_thread": False} if "sqlite" in settings.DATABASE_URL else {}
-engine = create_engine(settings.DATABASE_URL, connect_args=connect_args)
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long checkouts wait for a free connection"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self.checkouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.errors = 0
+        self.connections_opened = 0
+
+    def _create_connection(self):
+        record = super()._create_connection()
+        with self._stats_lock:
+            self.connections_opened += 1
+        return record
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except Exception:
+            # Pool timeout or failure to open a new connection
+            with self._stats_lock:
+                self.errors += 1
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            with self._stats_lock:
+                self.checkouts += 1
+                self.wait_total += waited
+                if waited > self.wait_max:
+                    self.wait_max = waited
+
+
+def _in_memory_sqlite(url: str) -> bool:
+    url = make_url(url)
+    return url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")
+
+
+_shared_sqlite: Optional[sqlite3.Connection] = None
+
+
+def _shared_sqlite_connection() -> sqlite3.Connection:
+    """The single connection behind an in-memory SQLite database"""
+    global _shared_sqlite
+    if _shared_sqlite is None:
+        _shared_sqlite = sqlite3.connect(":memory:", check_same_thread=False)
+    return _shared_sqlite
+
+
+def _engine_kwargs(url: str) -> Dict[str, Any]:
+    """Engine options for the configured database backend"""
+    url = make_url(url)
+    if url.get_backend_name() == "sqlite":
+        # SQLite needs connect_args for check_same_thread
+        kwargs = {"connect_args": {"check_same_thread": False}}
+        if _in_memory_sqlite(url):
+            # An in-memory database lives and dies with its one connection,
+            # which every thread and the async engine share
+            kwargs.update(poolclass=StaticPool, creator=_shared_sqlite_connection)
+        else:
+            kwargs.update(
+                poolclass=TimedQueuePool,
+                pool_size=settings.DB_POOL_SIZE,
+                max_overflow=settings.DB_MAX_OVERFLOW,
+                pool_timeout=settings.DB_POOL_TIMEOUT,
+            )
+        return kwargs
+    return {
+        "poolclass": TimedQueuePool,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": True,
+    }
+
+
+# Async drivers for each sync backend the app supports
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+}
+
+
+def async_database_url(url: str) -> str:
+    """Same database as `url`, addressed through its asyncio driver"""
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for '{backend}' databases")
+    return url.set(drivername=ASYNC_DRIVERS[backend]).render_as_string(hide_password=False)
+
+
+def _async_engine_kwargs(url: str) -> Dict[str, Any]:
+    kwargs = _engine_kwargs(url)
+    if _in_memory_sqlite(url):
+        # Wrap the sync engine's connection so both engines see one database
+        import aiosqlite
+
+        async def shared_connection():
+            return await aiosqlite.Connection(_shared_sqlite_connection, iter_chunk_size=64)
+
+        del kwargs["creator"]
+        kwargs["async_creator"] = shared_connection
+    elif "poolclass" in kwargs:
+        # aiosqlite would default to NullPool, pool connections like the sync engine
+        kwargs["poolclass"] = AsyncAdaptedQueuePool
+    if make_url(url).get_backend_name() == "postgresql":
+        # asyncpg takes no check_same_thread style arguments
+        kwargs.pop("connect_args", None)
+    return kwargs
+
+
+def _configure_sqlite(engine) -> None:
+    """WAL lets readers run alongside the single writer instead of blocking on it"""
+
+    @event.listens_for(getattr(engine, "sync_engine", engine), "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"PRAGMA journal_mode={settings.SQLITE_JOURNAL_MODE}")
+        cursor.execute(f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT_MS)}")
+        cursor.execute(f"PRAGMA mmap_size={int(settings.SQLITE_MMAP_SIZE)}")
+        cursor.close()
+
+
+def pool_stats(engine) -> Dict[str, Any]:
+    pool = engine.pool
+    stats: Dict[str, Any] = {
+        "backend": engine.dialect.name,
+        "pool_class": type(pool).__name__,
+    }
+    if isinstance(pool, QueuePool):
+        stats.update(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            overflow=pool.overflow(),
+        )
+    if isinstance(pool, TimedQueuePool):
+        stats.update(
+            connections_opened=pool.connections_opened,
+            checkouts=pool.checkouts,
+            checkout_errors=pool.errors,
+            checkout_wait_avg_ms=round(pool.wait_total / pool.checkouts * 1000, 3) if pool.checkouts else 0.0,
+            checkout_wait_max_ms=round(pool.wait_max * 1000, 3),
+        )
+    return stats
+
+
+engine = create_engine(settings.DATABASE_URL, **_engine_kwargs(settings.DATABASE_URL))
+if engine.dialect.name == "sqlite":
+    _configure_sqlite(engine)
+register_collector("db_pool", lambda: pool_stats(engine))
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Bound to the async engine when get_async_engine first builds it
+AsyncSessionLocal = async_sessionmaker(autoflush=False, expire_on_commit=False)
 Base = declarative_base()
 
+_async_engine: Optional[AsyncEngine] = None
+_async_engine_lock = threading.Lock()
+
+
+def get_async_engine() -> AsyncEngine:
+    """
+    Async engine on the same database, for async def handlers. Built on
+    first use, so a database without an async driver only fails the
+    endpoints that need one instead of every process at import.
+    """
+    global _async_engine
+    with _async_engine_lock:
+        if _async_engine is None:
+            async_engine = create_async_engine(
+                async_database_url(settings.DATABASE_URL), **_async_engine_kwargs(settings.DATABASE_URL)
+            )
+            if async_engine.dialect.name == "sqlite":
+                _configure_sqlite(async_engine)
+            AsyncSessionLocal.configure(bind=async_engine)
+            _async_engine = async_engine
+        return _async_engine
+
+
+async def dispose_async_engine() -> None:
+    if _async_engine is not None:
+        await _async_engine.dispose()
+
+
+register_collector("db_async_pool", lambda: pool_stats(_async_engine) if _async_engine is not None else {})
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    """AsyncSession dependency for async def handlers, never blocks the event loop"""
+    get_async_engine()
+    async with AsyncSessionLocal() as db:
+        yield db
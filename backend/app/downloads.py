@@ -0,0 +1,184 @@
+"""
+File Downloads
+Responses for stored files: conditional requests (ETag / Last-Modified),
+single-range requests for resumable and seeking clients, and optional
+hand-off of the bytes to nginx through X-Accel-Redirect so API workers
+never copy a document.
+"""
+import os
+import re
+import stat
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Dict, Optional, Tuple
+from urllib.parse import quote
+
+import aiofiles
+import aiofiles.os
+from fastapi import HTTPException, Request
+from fastapi.responses import FileResponse, Response, StreamingResponse
+from starlette.datastructures import Headers
+
+from app.config import get_settings
+
+settings = get_settings()
+
+_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def local_path(file_url: str) -> Optional[str]:
+    """Filesystem path behind a stored file_url, None if it points outside UPLOAD_DIR"""
+    root = os.path.realpath(settings.UPLOAD_DIR)
+    path = os.path.realpath(os.path.join(root, file_url))
+    return path if path.startswith(root + os.sep) else None
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    (first, last) byte positions of a single `bytes=` range, None to send the
+    whole file (no header, several ranges, or a malformed one, as RFC 9110
+    allows). Raises RangeNotSatisfiable when the range starts past the end.
+    """
+    match = _RANGE.match((header or "").strip())
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first:
+        if not last:
+            return None
+        suffix = int(last)
+        if suffix == 0 or size == 0:
+            raise RangeNotSatisfiable()
+        return max(0, size - suffix), size - 1
+    start = int(first)
+    if start >= size:
+        raise RangeNotSatisfiable()
+    end = min(int(last), size - 1) if last else size - 1
+    if end < start:
+        return None
+    return start, end
+
+
+def content_disposition(filename: str, disposition: str = "inline") -> str:
+    quoted = quote(filename)
+    if quoted != filename:
+        return f"{disposition}; filename*=utf-8''{quoted}"
+    return f'{disposition}; filename="{filename}"'
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    # Weak comparison, as If-None-Match requires
+    opaque = etag.removeprefix("W/")
+    return any(
+        candidate.strip() == "*" or candidate.strip().removeprefix("W/") == opaque
+        for candidate in header.split(",")
+    )
+
+
+def _not_modified(headers: Headers, etag: str, mtime: float) -> bool:
+    if_none_match = headers.get("if-none-match")
+    if if_none_match is not None:
+        return _etag_matches(if_none_match, etag)
+    if_modified_since = headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def _range_applies(headers: Headers, etag: str, last_modified: str) -> bool:
+    # If-Range: only send part of the file if it is still the version the client has
+    if_range = headers.get("if-range")
+    if if_range is None:
+        return True
+    if if_range.startswith('"'):
+        return not etag.startswith("W/") and if_range == etag
+    return if_range == last_modified
+
+
+async def _file_chunks(path: str, start: int, length: int):
+    async with aiofiles.open(path, "rb") as f:
+        await f.seek(start)
+        while length > 0:
+            chunk = await f.read(min(settings.UPLOAD_CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+async def file_response(
+    request: Request,
+    path: str,
+    etag: Optional[str] = None,
+    media_type: Optional[str] = None,
+    filename: Optional[str] = None,
+    disposition: str = "inline",
+) -> Response:
+    """
+    Serve `path` for a GET/HEAD request. `etag` should be derived from the
+    content (strong); without one a weak tag from size and mtime is used.
+    """
+    try:
+        stat_result = await aiofiles.os.stat(path)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="File not found")
+    if not stat.S_ISREG(stat_result.st_mode):
+        raise HTTPException(status_code=404, detail="File not found")
+
+    size = stat_result.st_size
+    etag = etag or f'W/"{size:x}-{int(stat_result.st_mtime):x}"'
+    last_modified = formatdate(stat_result.st_mtime, usegmt=True)
+    headers: Dict[str, str] = {
+        "ETag": etag,
+        "Last-Modified": last_modified,
+        "Cache-Control": "private, no-cache",
+        "Accept-Ranges": "bytes",
+    }
+
+    if _not_modified(request.headers, etag, stat_result.st_mtime):
+        return Response(status_code=304, headers=headers)
+
+    if settings.DOWNLOAD_ACCEL_PREFIX:
+        # nginx serves the bytes (ranges included) from an internal location
+        relative = os.path.relpath(path, os.path.realpath(settings.UPLOAD_DIR)).replace(os.sep, "/")
+        headers["X-Accel-Redirect"] = settings.DOWNLOAD_ACCEL_PREFIX.rstrip("/") + "/" + relative
+        if filename:
+            headers["Content-Disposition"] = content_disposition(filename, disposition)
+        return Response(status_code=200, headers=headers, media_type=media_type)
+
+    byte_range = None
+    if request.headers.get("range") and _range_applies(request.headers, etag, last_modified):
+        try:
+            byte_range = parse_range(request.headers["range"], size)
+        except RangeNotSatisfiable:
+            return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+
+    if byte_range is None:
+        return FileResponse(
+            path,
+            headers=headers,
+            media_type=media_type,
+            filename=filename,
+            stat_result=stat_result,
+            content_disposition_type=disposition,
+        )
+
+    start, end = byte_range
+    headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(end - start + 1)
+    if filename:
+        headers["Content-Disposition"] = content_disposition(filename, disposition)
+    if request.method == "HEAD":
+        return Response(status_code=206, headers=headers, media_type=media_type)
+    return StreamingResponse(
+        _file_chunks(path, start, end - start + 1),
+        status_code=206,
+        headers=headers,
+        media_type=media_type or "application/octet-stream",
+    )
@@ -0,0 +1,286 @@
+"""
+Status Events
+Application and RPASubmission status transitions, published after the
+transaction that made them commits and fanned out to each user's open
+event streams. A broker carries events between processes; the default
+in-process one only reaches streams served by the same worker.
+"""
+import asyncio
+import json
+import logging
+import threading
+from datetime import datetime
+from typing import Any, Dict, Optional, Set
+
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.metrics import register_collector
+from app.models import Application, RPASubmission
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+class Subscriber:
+    """One open stream: a bounded queue fed from any thread"""
+
+    def __init__(self, user_id: int, maxsize: int):
+        self.user_id = user_id
+        self.loop = asyncio.get_running_loop()
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.overflowed = False
+
+    def _put(self, item: Dict[str, Any]) -> None:
+        try:
+            self.queue.put_nowait(item)
+        except asyncio.QueueFull:
+            # A client this far behind reconnects and refetches instead
+            self.overflowed = True
+
+    def deliver(self, item: Dict[str, Any]) -> None:
+        self.loop.call_soon_threadsafe(self._put, item)
+
+
+class EventHub:
+    """Fan-out of published events to the subscribers of this process"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers: Dict[int, Set[Subscriber]] = {}
+        self.delivered = 0
+        self.dropped = 0
+
+    def subscribe(self, user_id: int) -> Subscriber:
+        subscriber = Subscriber(user_id, settings.EVENT_QUEUE_SIZE)
+        with self._lock:
+            self._subscribers.setdefault(user_id, set()).add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        with self._lock:
+            subscribers = self._subscribers.get(subscriber.user_id)
+            if subscribers is not None:
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del self._subscribers[subscriber.user_id]
+            if subscriber.overflowed:
+                self.dropped += 1
+
+    def dispatch(self, item: Dict[str, Any]) -> None:
+        """Hand an event to every local stream of its user, safe from any thread"""
+        with self._lock:
+            subscribers = list(self._subscribers.get(item["user_id"], ()))
+            self.delivered += len(subscribers)
+        for subscriber in subscribers:
+            try:
+                subscriber.deliver(item)
+            except RuntimeError:
+                # Event loop already closed (shutdown)
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "broker": broker.name,
+                "users": len(self._subscribers),
+                "streams": sum(len(s) for s in self._subscribers.values()),
+                "delivered": self.delivered,
+                "overflowed_streams": self.dropped,
+            }
+
+
+hub = EventHub()
+
+
+class InProcessBroker:
+    """Delivers straight to this process's hub"""
+    name = "memory"
+    transactional = False
+
+    def start(self) -> None:
+        pass
+
+    def stop(self) -> None:
+        pass
+
+    def publish(self, item: Dict[str, Any]) -> None:
+        hub.dispatch(item)
+
+
+class PostgresBroker:
+    """
+    NOTIFY on publish, and a LISTEN thread per process feeding the local hub,
+    so every API worker sees events from every other worker and RPA process.
+    Events from a session are NOTIFYed on its own connection before it
+    commits (see _notify_status_changes); Postgres delivers them at commit.
+    """
+    name = "postgres"
+    CHANNEL = "app_status_events"
+    transactional = True
+
+    def __init__(self, engine):
+        self.engine = engine
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._listen, name="event-listener", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread = None
+
+    def notify(self, connection, item: Dict[str, Any]) -> None:
+        """Queue a NOTIFY in `connection`'s transaction"""
+        connection.exec_driver_sql("SELECT pg_notify(%s, %s)", (self.CHANNEL, json.dumps(item, default=str)))
+
+    def publish(self, item: Dict[str, Any]) -> None:
+        # Blocking, only for callers outside a session (worker threads)
+        with self.engine.begin() as connection:
+            self.notify(connection, item)
+
+    def _listen(self) -> None:
+        import select as selectors
+        while not self._stop.is_set():
+            try:
+                raw = self.engine.raw_connection()
+                try:
+                    connection = raw.driver_connection
+                    connection.autocommit = True
+                    connection.cursor().execute(f"LISTEN {self.CHANNEL}")
+                    while not self._stop.is_set():
+                        if selectors.select([connection], [], [], 5.0) == ([], [], []):
+                            continue
+                        connection.poll()
+                        while connection.notifies:
+                            hub.dispatch(json.loads(connection.notifies.pop(0).payload))
+                finally:
+                    raw.close()
+            except Exception as e:
+                logger.error(f"Event listener connection lost: {e}")
+                self._stop.wait(5.0)
+
+
+def _make_broker():
+    if settings.EVENT_BROKER == "postgres":
+        from app.database import engine
+        return PostgresBroker(engine)
+    return InProcessBroker()
+
+
+broker = _make_broker()
+register_collector("events", hub.stats)
+
+
+def _item(kind: str, user_id: int, payload: Dict[str, Any]) -> Dict[str, Any]:
+    return {"type": kind, "user_id": user_id, "at": datetime.utcnow().isoformat(), **payload}
+
+
+def publish(kind: str, user_id: int, payload: Dict[str, Any]) -> None:
+    item = _item(kind, user_id, payload)
+    try:
+        broker.publish(item)
+    except Exception as e:
+        # Status streams are best effort, never fail the transition itself
+        logger.error(f"Could not publish {kind} event: {e}")
+
+
+def _status_value(status) -> Optional[str]:
+    return getattr(status, "value", status)
+
+
+# ============ ORM HOOKS ============
+# Status changes made through the ORM are collected at flush and published
+# once the transaction commits, so streams never see rolled-back states.
+# Core INSERT/UPDATE statements bypass the flush; callers queue their
+# events with publish_on_commit instead.
+
+def publish_on_commit(session: Session, kind: str, user_id: Optional[int], payload: Dict[str, Any]) -> None:
+    """Publish an event when `session` commits, drop it if it rolls back"""
+    session.info.setdefault("status_events", []).append((kind, user_id, payload))
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_status_changes(session: Session, flush_context) -> None:
+    pending = session.info.setdefault("status_events", [])
+    for obj in list(session.new) + list(session.dirty):
+        if not isinstance(obj, (Application, RPASubmission)):
+            continue
+        history = inspect(obj).attrs.status.history
+        if not history.added:
+            continue
+        if isinstance(obj, Application):
+            pending.append(("application", obj.user_id, application_payload(obj)))
+        else:
+            application = inspect(obj).attrs.application.loaded_value
+            if getattr(application, "user_id", None) is not None:
+                user_id = application.user_id
+            else:
+                user_id = session.connection().scalar(
+                    select(Application.user_id).where(Application.id == obj.application_id)
+                )
+            pending.append(("rpa_submission", user_id, rpa_submission_payload(obj)))
+
+
+def application_payload(application) -> Dict[str, Any]:
+    return {
+        "id": application.id,
+        "status": _status_value(application.status),
+        "external_reference": application.external_reference,
+    }
+
+
+def rpa_submission_payload(submission) -> Dict[str, Any]:
+    """Payload for an RPASubmission, or a row with the same columns"""
+    return {
+        "id": submission.id,
+        "application_id": submission.application_id,
+        "target_website": submission.target_website,
+        "status": _status_value(submission.status),
+        "retry_count": submission.retry_count,
+        "confirmation_number": submission.confirmation_number,
+        "error_message": submission.error_message,
+    }
+
+
+@event.listens_for(Session, "before_commit")
+def _notify_status_changes(session: Session) -> None:
+    """
+    With the Postgres broker, NOTIFY in the committing transaction itself:
+    no second connection, and nothing blocking runs in after_commit, which
+    also fires for AsyncSession commits on the event loop.
+    """
+    if not broker.transactional:
+        return
+    # Commit flushes after this hook; flush now so its status changes are included
+    session.flush()
+    pending = session.info.pop("status_events", [])
+    if not pending:
+        return
+    connection = session.connection()
+    for kind, user_id, payload in pending:
+        if user_id is None:
+            continue
+        try:
+            with connection.begin_nested():
+                broker.notify(connection, _item(kind, user_id, payload))
+        except Exception as e:
+            # Status streams are best effort, never fail the transition itself
+            logger.error(f"Could not publish {kind} event: {e}")
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_status_changes(session: Session) -> None:
+    for kind, user_id, payload in session.info.pop("status_events", []):
+        if user_id is not None:
+            publish(kind, user_id, payload)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_status_changes(session: Session) -> None:
+    session.info.pop("status_events", None)
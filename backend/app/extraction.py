@@ -0,0 +1,339 @@
+"""
+Document Extraction Pipeline
+Image normalization and OCR run in a process pool after the upload has
+been answered. Results are keyed by (content hash, document type): a
+document whose bytes were read before reuses that result at upload,
+concurrent uploads of the same bytes share one job, and a finished job
+fills in every document still waiting on it, then copies identity fields
+onto the owners' profiles.
+"""
+import asyncio
+import logging
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Set, Tuple
+
+from sqlalchemy import and_, or_, select, update
+from sqlalchemy.orm import selectinload
+from starlette.concurrency import run_in_threadpool
+
+from app.auth import invalidate_user_cache
+from app.config import get_settings
+from app.database import SessionLocal
+from app.metrics import register_collector
+from app.imaging import process_document
+from app.models import Document, DocumentType, User
+from app.ocr import PARSERS
+from app.storage import blob_path, blob_url, derivative_path, derivative_url
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Document.extraction_status values
+PENDING = "pending"
+DONE = "done"
+FAILED = "failed"
+SKIPPED = "skipped"  # not an image, nothing enabled to run, or tesseract missing
+
+# Profile fields filled from each identity document, and whether an
+# existing value is overwritten
+PROFILE_FIELDS = {
+    DocumentType.AADHAAR: {
+        "aadhaar_number": True,
+        "full_name": False,
+        "date_of_birth": True,
+        "address": True,
+        "pincode": True,
+    },
+    DocumentType.PAN: {
+        "pan_number": True,
+        "full_name": False,
+        "date_of_birth": False,
+    },
+}
+
+
+# Columns a finished job sets, copied as-is when the result is reused
+RESULT_COLUMNS = ("extracted_data", "file_url", "content_type", "file_size", "thumbnail_url")
+
+
+def cached_extraction(sha256: str, doc_type: DocumentType):
+    """Statement for a finished extraction of the same bytes read as the same type"""
+    return select(*(getattr(Document, column) for column in RESULT_COLUMNS)).where(
+        Document.content_hash == sha256,
+        Document.doc_type == doc_type,
+        Document.extraction_status == DONE,
+    ).limit(1)
+
+
+def reuse_result(document: Document, cached) -> None:
+    """Fill a new document from a cached_extraction row"""
+    for column, value in cached._mapping.items():
+        setattr(document, column, value)
+    document.extracted_data = dict(document.extracted_data or {})
+    document.extraction_status = DONE
+
+
+def _runs_ocr(doc_type: DocumentType) -> bool:
+    return settings.OCR_ENABLED and doc_type.value in PARSERS
+
+
+def initial_status(doc_type: DocumentType, content_type: Optional[str]) -> str:
+    if not (content_type or "").startswith("image/"):
+        return SKIPPED
+    if not (settings.IMAGE_NORMALIZE or _runs_ocr(doc_type)):
+        return SKIPPED
+    return PENDING
+
+
+def apply_to_user(user: User, doc_type: DocumentType, extracted_data: Dict[str, Any]) -> bool:
+    """Copy identity fields onto the profile, True if anything changed"""
+    changed = False
+    for field, overwrite in PROFILE_FIELDS.get(doc_type, {}).items():
+        value = extracted_data.get(field)
+        if value and (overwrite or not getattr(user, field)) and getattr(user, field) != value:
+            setattr(user, field, value)
+            changed = True
+    return changed
+
+
+def update_profile(user_id: int, doc_type: DocumentType, extracted_data: Dict[str, Any]) -> bool:
+    """apply_to_user in its own session, for callers holding an AsyncSession"""
+    db = SessionLocal()
+    try:
+        user = db.get(User, user_id)
+        changed = user is not None and apply_to_user(user, doc_type, extracted_data)
+        if changed:
+            db.commit()
+    finally:
+        db.close()
+    if changed:
+        invalidate_user_cache(user_id)
+    return changed
+
+
+def _job_status(result: Dict[str, Any]) -> str:
+    if result["ocr"] == "done":
+        return DONE
+    if result["ocr"] == "failed":
+        return FAILED
+    # OCR not wanted for this type, or tesseract is missing (retried on a later upload)
+    return SKIPPED if "ocr_error" in result else DONE
+
+
+def store_result(sha256: str, doc_type: DocumentType, result: Dict[str, Any]) -> int:
+    """Write a finished job to every document waiting on it, returns how many"""
+    extracted_data, status = result["extracted_data"], _job_status(result)
+    db = SessionLocal()
+    try:
+        if result["normalized_size"] is not None:
+            # Every document with these bytes now serves the canonical image
+            db.execute(
+                update(Document)
+                .where(Document.content_hash == sha256, Document.file_url == blob_url(sha256))
+                .values(
+                    file_url=derivative_url(sha256, "normalized"),
+                    content_type="image/jpeg",
+                    file_size=result["normalized_size"],
+                    thumbnail_url=derivative_url(sha256, "thumbnail"),
+                )
+                .execution_options(synchronize_session=False)
+            )
+        query = select(Document).where(
+            Document.content_hash == sha256,
+            Document.doc_type == doc_type,
+            Document.extraction_status == PENDING,
+        )
+        if status == DONE:
+            # Profiles get the result too, load every owner in one query
+            query = query.options(selectinload(Document.user))
+        documents = db.execute(query).scalars().all()
+        changed_users = set()
+        for document in documents:
+            document.extracted_data = extracted_data
+            document.extraction_status = status
+            if status == DONE and apply_to_user(document.user, doc_type, extracted_data):
+                changed_users.add(document.user_id)
+        db.commit()
+    finally:
+        db.close()
+    for user_id in changed_users:
+        invalidate_user_cache(user_id)
+    return len(documents)
+
+
+def _unclaimed(now: datetime):
+    """Pending documents no live process is working on"""
+    return and_(
+        Document.extraction_status == PENDING,
+        or_(
+            Document.extraction_claimed_at.is_(None),
+            Document.extraction_claimed_at < now - timedelta(seconds=settings.DOCUMENT_CLAIM_SECONDS),
+        ),
+    )
+
+
+def claim_job(sha256: str, doc_type: DocumentType) -> bool:
+    """
+    Stamp a job's unclaimed pending documents in one UPDATE, False if there
+    were none, because another API process already holds them
+    """
+    now = datetime.utcnow()
+    db = SessionLocal()
+    try:
+        claimed = db.execute(
+            update(Document)
+            .where(Document.content_hash == sha256, Document.doc_type == doc_type, _unclaimed(now))
+            .values(extraction_claimed_at=now)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.commit()
+    finally:
+        db.close()
+    return bool(claimed)
+
+
+def _pending_jobs():
+    """(hash, type) of every document still waiting on extraction that nobody has claimed"""
+    db = SessionLocal()
+    try:
+        return db.execute(
+            select(Document.content_hash, Document.doc_type).where(_unclaimed(datetime.utcnow())).distinct()
+        ).all()
+    finally:
+        db.close()
+
+
+class ExtractionPipeline:
+    """Document jobs on a lazily started process pool, one per (hash, type) at a time"""
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+        # Only touched from the event loop thread, so no lock is needed
+        self._in_flight: Set[Tuple[str, DocumentType]] = set()
+        self._tasks: Set[asyncio.Task] = set()
+        self.submitted = 0
+        self.coalesced = 0
+        self.claimed_elsewhere = 0
+        self.completed = 0
+        self.failed = 0
+        self.normalized = 0
+        self.documents_updated = 0
+        self.job_seconds = 0.0
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn: never fork the server's threads into OCR workers
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    def submit(self, sha256: str, doc_type: DocumentType) -> None:
+        """Queue OCR for a stored blob, must be called from the event loop"""
+        key = (sha256, doc_type)
+        if key in self._in_flight:
+            # The running job updates every pending document with this key
+            self.coalesced += 1
+            return
+        self.submitted += 1
+        self._in_flight.add(key)
+        task = asyncio.get_running_loop().create_task(self._run(sha256, doc_type))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, sha256: str, doc_type: DocumentType) -> None:
+        # Every API process resumes pending documents at startup; the claim
+        # makes sure only one of them processes each job
+        try:
+            claimed = await run_in_threadpool(claim_job, sha256, doc_type)
+        except Exception as e:
+            logger.error(f"Could not claim document job {sha256[:12]}: {e}")
+            claimed = False
+        if not claimed:
+            self.claimed_elsewhere += 1
+            self._in_flight.discard((sha256, doc_type))
+            return
+        started = time.monotonic()
+        image_options = None
+        if settings.IMAGE_NORMALIZE:
+            image_options = (
+                settings.IMAGE_MAX_DIMENSION,
+                settings.IMAGE_JPEG_QUALITY,
+                settings.THUMBNAIL_SIZE,
+                settings.THUMBNAIL_JPEG_QUALITY,
+            )
+        ocr_options = None
+        if _runs_ocr(doc_type):
+            ocr_options = (settings.TESSERACT_CMD, settings.OCR_LANGUAGES, settings.OCR_TIMEOUT_SECONDS)
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(
+                self._pool(),
+                process_document,
+                blob_path(sha256),
+                derivative_path(sha256, "normalized"),
+                derivative_path(sha256, "thumbnail"),
+                image_options,
+                doc_type.value,
+                ocr_options,
+            )
+        except BrokenProcessPool as e:
+            # A crashed worker poisons the pool, start a fresh one next time
+            logger.error(f"Document worker pool broke on {sha256[:12]}: {e}")
+            self._executor = None
+            result = {"normalized_size": None, "extracted_data": {}, "ocr": "failed"}
+        except Exception as e:
+            logger.error(f"Document job failed for {doc_type.value} {sha256[:12]}: {e}")
+            result = {"normalized_size": None, "extracted_data": {}, "ocr": "failed"}
+        for key in ("image_error", "ocr_error"):
+            if key in result:
+                logger.warning(f"{doc_type.value} {sha256[:12]}: {result[key]}")
+        if _job_status(result) == FAILED:
+            self.failed += 1
+        else:
+            self.completed += 1
+        if result["normalized_size"] is not None:
+            self.normalized += 1
+        self.job_seconds += time.monotonic() - started
+        # Documents committed from here on start a new job rather than
+        # coalescing into one whose result is already being written
+        self._in_flight.discard((sha256, doc_type))
+        try:
+            self.documents_updated += await run_in_threadpool(store_result, sha256, doc_type, result)
+        except Exception as e:
+            logger.error(f"Could not store document result for {sha256[:12]}: {e}")
+
+    async def resume(self) -> None:
+        """Requeue documents left pending by a previous process, or claimed by one that died"""
+        for sha256, doc_type in await run_in_threadpool(_pending_jobs):
+            self.submit(sha256, doc_type)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> Dict[str, Any]:
+        finished = self.completed + self.failed
+        return {
+            "ocr_enabled": settings.OCR_ENABLED,
+            "image_normalize": settings.IMAGE_NORMALIZE,
+            "workers": self.workers,
+            "in_flight": len(self._in_flight),
+            "submitted": self.submitted,
+            "coalesced": self.coalesced,
+            "claimed_elsewhere": self.claimed_elsewhere,
+            "completed": self.completed,
+            "failed": self.failed,
+            "normalized": self.normalized,
+            "documents_updated": self.documents_updated,
+            "avg_job_ms": round(self.job_seconds / finished * 1000, 1) if finished else 0.0,
+        }
+
+
+extraction_pipeline = ExtractionPipeline(workers=settings.DOCUMENT_WORKERS)
+register_collector("extraction", extraction_pipeline.stats)
@@ -0,0 +1,173 @@
+"""
+Outbound HTTP Clients
+Shared httpx.AsyncClient pools for calls to external sites, so repeated
+requests reuse kept-alive (HTTP/2 where the server offers it) connections
+instead of a TCP and TLS handshake each. Each profile (proxy, whatsapp)
+has its own timeouts, and each upstream host its own bounded pool.
+Clients are created on first use and closed at application shutdown.
+"""
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Set, Tuple
+from urllib.parse import urlsplit
+
+import httpx
+
+from app.config import get_settings
+from app.metrics import register_collector
+
+try:
+    import h2  # noqa: F401  (httpx negotiates HTTP/2 only when h2 is installed)
+except ImportError:
+    h2 = None
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+class ClientProfile:
+    """Timeouts and headers shared by every host pool of one kind of caller"""
+
+    def __init__(self, timeout: httpx.Timeout, headers: Optional[Dict[str, str]] = None):
+        self.timeout = timeout
+        self.headers = headers or {}
+
+
+PROFILES = {
+    # Government portal pages loaded into the form iframe
+    "proxy": ClientProfile(
+        timeout=httpx.Timeout(settings.PROXY_TIMEOUT_SECONDS, connect=settings.HTTP_CONNECT_TIMEOUT_SECONDS),
+        headers={
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+        },
+    ),
+    # WhatsApp Cloud API replies, short so a slow API cannot hold webhook handlers
+    "whatsapp": ClientProfile(
+        timeout=httpx.Timeout(settings.WHATSAPP_TIMEOUT_SECONDS, connect=settings.HTTP_CONNECT_TIMEOUT_SECONDS),
+    ),
+}
+
+
+class HostClient:
+    def __init__(self, profile: str, origin: str, client: httpx.AsyncClient):
+        self.profile = profile
+        self.origin = origin
+        self.client = client
+        self.in_flight = 0
+        self.requests = 0
+        self.errors = 0
+
+    def pool_stats(self) -> Dict[str, int]:
+        # httpcore's pool is not public API, report nothing rather than fail
+        pool = getattr(getattr(self.client, "_transport", None), "_pool", None)
+        connections = list(getattr(pool, "connections", []) or [])
+        idle = 0
+        http2 = 0
+        for connection in connections:
+            try:
+                idle += connection.is_idle()
+                http2 += "HTTP/2" in connection.info()
+            except Exception:
+                pass
+        return {"connections": len(connections), "idle": idle, "http2": http2}
+
+
+class HTTPClientRegistry:
+    """
+    One AsyncClient per (profile, origin), at most HTTP_MAX_HOSTS of them;
+    the least recently used idle one is closed to make room. Only used from
+    the event loop, so no lock is needed.
+    """
+
+    def __init__(self, max_hosts: int):
+        self.max_hosts = max_hosts
+        self._clients: "OrderedDict[Tuple[str, str], HostClient]" = OrderedDict()
+        self._closing: Set[asyncio.Task] = set()
+        self.created = 0
+        self.evicted = 0
+
+    def _limits(self) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=settings.HTTP_MAX_CONNECTIONS_PER_HOST,
+            max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_PER_HOST,
+            keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY_SECONDS,
+        )
+
+    def _host_client(self, profile: str, url: str) -> HostClient:
+        parts = urlsplit(url)
+        key = (profile, f"{parts.scheme}://{parts.netloc}".lower())
+        host = self._clients.get(key)
+        if host is not None:
+            self._clients.move_to_end(key)
+            return host
+
+        options = PROFILES[profile]
+        host = HostClient(profile, key[1], httpx.AsyncClient(
+            timeout=options.timeout,
+            limits=self._limits(),
+            headers=options.headers,
+            http2=settings.HTTP2_ENABLED and h2 is not None,
+        ))
+        self._clients[key] = host
+        self.created += 1
+        self._evict()
+        return host
+
+    def _evict(self) -> None:
+        for key in list(self._clients):
+            if len(self._clients) <= self.max_hosts:
+                return
+            host = self._clients[key]
+            if host.in_flight:
+                continue
+            del self._clients[key]
+            self.evicted += 1
+            task = asyncio.get_running_loop().create_task(host.client.aclose())
+            self._closing.add(task)
+            task.add_done_callback(self._closing.discard)
+
+    async def request(self, profile: str, method: str, url: str, **kwargs: Any) -> httpx.Response:
+        """client.request through the host's pool; `timeout=` overrides the profile's"""
+        host = self._host_client(profile, url)
+        host.in_flight += 1
+        host.requests += 1
+        try:
+            return await host.client.request(method, url, **kwargs)
+        except Exception:
+            host.errors += 1
+            raise
+        finally:
+            host.in_flight -= 1
+
+    async def aclose(self) -> None:
+        clients, self._clients = list(self._clients.values()), OrderedDict()
+        for host in clients:
+            try:
+                await host.client.aclose()
+            except Exception as e:
+                logger.warning(f"Closing HTTP client for {host.origin} failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        hosts = []
+        for host in list(self._clients.values()):
+            hosts.append({
+                "profile": host.profile,
+                "origin": host.origin,
+                "in_flight": host.in_flight,
+                "requests": host.requests,
+                "errors": host.errors,
+                **host.pool_stats(),
+            })
+        return {
+            "http2_available": h2 is not None,
+            "max_hosts": self.max_hosts,
+            "max_connections_per_host": settings.HTTP_MAX_CONNECTIONS_PER_HOST,
+            "clients_created": self.created,
+            "clients_evicted": self.evicted,
+            "hosts": hosts,
+        }
+
+
+http_clients = HTTPClientRegistry(max_hosts=settings.HTTP_MAX_HOSTS)
+register_collector("http_clients", http_clients.stats)
@@ -0,0 +1,87 @@
+"""
+Document Images
+Pillow derivatives of an uploaded photo: a canonical copy (EXIF orientation
+applied, downscaled, recompressed as JPEG) that is served and OCR'd in
+place of the camera original, and a small thumbnail for list views.
+process_document is the worker-process entry point of the extraction
+pipeline; like app/ocr.py this module has no app imports.
+"""
+import os
+from typing import Any, Dict, Optional, Tuple
+
+from PIL import Image, ImageOps
+
+from app.ocr import OCRUnavailable, extract_document
+
+
+def _save_jpeg(image: Image.Image, path: str, quality: int) -> int:
+    """Write atomically, returns the file size"""
+    if image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+    temp_path = f"{path}.{os.getpid()}.part"
+    try:
+        image.save(temp_path, "JPEG", quality=quality, optimize=True, progressive=True)
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    return os.path.getsize(path)
+
+
+def _scaled(source: str, max_dimension: int) -> Image.Image:
+    with Image.open(source) as image:
+        # JPEG decodes straight at a reduced scale, far cheaper than a full decode
+        image.draft("RGB", (max_dimension, max_dimension))
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+        return image
+
+
+def normalize_image(source: str, target: str, max_dimension: int, quality: int) -> int:
+    """Canonical JPEG no larger than max_dimension on either side, returns its size"""
+    return _save_jpeg(_scaled(source, max_dimension), target, quality)
+
+
+def make_thumbnail(source: str, target: str, size: int, quality: int) -> int:
+    return _save_jpeg(_scaled(source, size), target, quality)
+
+
+def process_document(
+    source: str,
+    normalized: str,
+    thumbnail: str,
+    image_options: Optional[Tuple[int, int, int, int]],
+    doc_type: str,
+    ocr_options: Optional[Tuple[str, str, float]],
+) -> Dict[str, Any]:
+    """
+    Derive the canonical image and thumbnail unless a previous job already
+    did (paths are keyed by the source's content hash), then OCR the
+    canonical image. Failures are reported in the result, not raised.
+    """
+    result: Dict[str, Any] = {"normalized_size": None, "thumbnail": False, "extracted_data": {}, "ocr": "skipped"}
+    ocr_source = source
+    if image_options is not None:
+        max_dimension, quality, thumbnail_size, thumbnail_quality = image_options
+        try:
+            if not os.path.exists(normalized):
+                normalize_image(source, normalized, max_dimension, quality)
+            if not os.path.exists(thumbnail):
+                make_thumbnail(normalized, thumbnail, thumbnail_size, thumbnail_quality)
+            result["normalized_size"] = os.path.getsize(normalized)
+            result["thumbnail"] = True
+            ocr_source = normalized
+        except Exception as e:
+            # Not decodable by Pillow (HEIC, truncated upload...): keep the original
+            result["image_error"] = str(e)
+
+    if ocr_options is not None:
+        try:
+            result["extracted_data"] = extract_document(ocr_source, doc_type, *ocr_options)
+            result["ocr"] = "done"
+        except OCRUnavailable as e:
+            result["ocr_error"] = str(e)
+        except Exception as e:
+            result["ocr"] = "failed"
+            result["ocr_error"] = str(e)
+    return result
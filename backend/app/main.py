@@ -1,13 +1,20 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.database import engine, Base
-from app.routers import auth, users, services, applications, services_api, whatsapp, documents, services_data, portal_redirect, proxy, torrent_power, torrent_power
+import threading
+from app.database import engine, dispose_async_engine
+from app import migrations
+from app.routers import auth, users, services, applications, services_api, whatsapp, documents, services_data, portal_redirect, proxy, torrent_power, torrent_power, demo_govt, events
 from app.config import get_settings
+from app.data import get_service_loader
+from app import metrics
+from app.auth import password_pool
+from app.rpa import worker_pool, browser_pool
+from app.events import broker as event_broker
+from app.extraction import extraction_pipeline
+from app.http_clients import http_clients
 
 settings = get_settings()
 
-# Create database tables (only creates if they don't exist)
-Base.metadata.create_all(bind=engine)
 
 app = FastAPI(
     title=settings.APP_NAME,
@@ -22,14 +29,18 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Pagination cursors for the SPA
+    expose_headers=["X-Next-Cursor", "Link"],
 )
 
 # Include routers
 app.include_router(auth.router)
 app.include_router(users.router)
 app.include_router(services.router)
-app.include_router(services_api.router)
+# services_data goes before services_api so its fixed paths (/data, /stats, ...)
+# are not captured by the /{category} routes
 app.include_router(services_data.router)
+app.include_router(services_api.router)
 app.include_router(portal_redirect.router)
 app.include_router(applications.router)
 app.include_router(documents.router)
@@ -37,6 +48,68 @@ app.include_router(whatsapp.router)
 app.include_router(proxy.router)
 app.include_router(torrent_power.router)
 app.include_router(torrent_power.router)
+app.include_router(demo_govt.router)
+app.include_router(events.router)
+
+@app.on_event("startup")
+def check_schema_version():
+    # Migrations run once per deploy (python -m app.migrations); workers only
+    # confirm the database is current instead of reflecting every table
+    if settings.AUTO_MIGRATE:
+        migrations.upgrade(engine)
+    migrations.check(engine)
+
+@app.on_event("startup")
+def start_services_watcher():
+    # Pick up edits to services_data.json without restarting the container
+    get_service_loader().start_watcher(settings.SERVICES_RELOAD_INTERVAL)
+
+@app.on_event("startup")
+def start_event_broker():
+    event_broker.start()
+
+@app.on_event("startup")
+def start_rpa_workers():
+    # RPA_WORKERS=0 leaves automation to separate python -m app.rpa processes
+    if settings.RPA_BROWSER_AUTOMATION and settings.RPA_WORKERS > 0:
+        # Launch browsers in the background so startup is not held up
+        threading.Thread(target=browser_pool.warm, name="browser-pool-warm", daemon=True).start()
+    worker_pool.start()
+
+@app.on_event("startup")
+async def resume_document_extraction():
+    # OCR jobs live in this process, pick up any cut short by a restart
+    if settings.OCR_ENABLED:
+        await extraction_pipeline.resume()
+
+@app.on_event("shutdown")
+def stop_services_watcher():
+    get_service_loader().stop_watcher()
+
+@app.on_event("shutdown")
+def stop_event_broker():
+    event_broker.stop()
+
+@app.on_event("shutdown")
+def stop_rpa_workers():
+    worker_pool.stop()
+    browser_pool.close()
+
+@app.on_event("shutdown")
+def stop_password_pool():
+    password_pool.shutdown()
+
+@app.on_event("shutdown")
+def stop_extraction_pipeline():
+    extraction_pipeline.shutdown()
+
+@app.on_event("shutdown")
+async def close_http_clients():
+    await http_clients.aclose()
+
+@app.on_event("shutdown")
+async def close_async_engine():
+    await dispose_async_engine()
 
 @app.get("/")
 def root():
@@ -49,3 +122,8 @@ def root():
 @app.get("/health")
 def health_check():
     return {"status": "healthy"}
+
+@app.get("/metrics")
+def runtime_metrics():
+    """Cache, pool and queue counters for this worker"""
+    return metrics.collect()
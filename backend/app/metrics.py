@@ -0,0 +1,26 @@
+"""
+Runtime Metrics
+Components register a collector callable, GET /metrics returns them all
+"""
+import logging
+from typing import Any, Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+_collectors: Dict[str, Callable[[], Dict[str, Any]]] = {}
+
+
+def register_collector(name: str, collector: Callable[[], Dict[str, Any]]) -> None:
+    """Register (or replace) the stats callable published under `name`"""
+    _collectors[name] = collector
+
+
+def collect() -> Dict[str, Any]:
+    snapshot = {}
+    for name, collector in _collectors.items():
+        try:
+            snapshot[name] = collector()
+        except Exception as e:
+            logger.error(f"Metrics collector '{name}' failed: {e}")
+            snapshot[name] = {"error": str(e)}
+    return snapshot
@@ -0,0 +1,177 @@
+"""
+Schema Migrations
+Versioned migrations run once per deploy (python -m app.migrations), so
+workers only check the recorded schema version when they start.
+
+Each migration is a module named mNNNN_description.py in this package with
+a `description` string and an `upgrade(connection)` function. The version
+applied is recorded in the schema_version table in the same transaction.
+On Postgres, indexes requested with create_index_if_missing are built
+with CREATE INDEX CONCURRENTLY once that transaction commits, so they do
+not block writes, and the version is recorded after they are all valid.
+"""
+import importlib
+import logging
+import pkgutil
+import re
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Iterator, List, Tuple
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, inspect, select, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.schema import CreateIndex
+
+logger = logging.getLogger(__name__)
+
+_MODULE_PATTERN = re.compile(r"^m(\d{4})_\w+$")
+
+# connection.info key for the indexes a Postgres migration builds after commit
+_DEFERRED_INDEXES = "migrations.deferred_indexes"
+
+_metadata = MetaData()
+schema_version = Table(
+    "schema_version",
+    _metadata,
+    Column("version", Integer, primary_key=True),
+    Column("description", String(255)),
+    Column("applied_at", DateTime),
+)
+
+
+class SchemaOutOfDate(RuntimeError):
+    pass
+
+
+def discover() -> List[Tuple[int, object]]:
+    """All migration modules in this package, ordered by version"""
+    migrations = []
+    for module_info in pkgutil.iter_modules(__path__):
+        match = _MODULE_PATTERN.match(module_info.name)
+        if match:
+            module = importlib.import_module(f"{__name__}.{module_info.name}")
+            migrations.append((int(match.group(1)), module))
+    migrations.sort(key=lambda item: item[0])
+    return migrations
+
+
+def latest_version() -> int:
+    migrations = discover()
+    return migrations[-1][0] if migrations else 0
+
+
+def current_version(engine: Engine) -> int:
+    """Highest applied version, 0 for a database that was never migrated"""
+    with engine.connect() as connection:
+        if not inspect(connection).has_table(schema_version.name):
+            return 0
+        version = connection.execute(select(schema_version.c.version).order_by(schema_version.c.version.desc())).scalar()
+        return version or 0
+
+
+@contextmanager
+def _deploy_lock(engine: Engine) -> Iterator[None]:
+    """
+    Serialize concurrent deploys on Postgres. A session-level advisory lock
+    on a connection of its own, since CREATE INDEX CONCURRENTLY waits for
+    every open transaction and so cannot run while one holds the lock.
+    """
+    if engine.dialect.name != "postgresql":
+        yield
+        return
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        connection.execute(text("SELECT pg_advisory_lock(727001)"))
+        try:
+            yield
+        finally:
+            connection.execute(text("SELECT pg_advisory_unlock(727001)"))
+
+
+def _record(connection: Connection, version: int, module) -> None:
+    # Primary key makes a second runner's insert fail and roll back
+    connection.execute(schema_version.insert().values(
+        version=version,
+        description=module.description,
+        applied_at=datetime.utcnow(),
+    ))
+
+
+def upgrade(engine: Engine) -> int:
+    """Apply every pending migration, each in its own transaction"""
+    _metadata.create_all(engine, checkfirst=True)
+    with _deploy_lock(engine):
+        # Read under the lock: another deploy may have just finished
+        applied = current_version(engine)
+
+        for version, module in discover():
+            if version <= applied:
+                continue
+            logger.info(f"Applying migration {version:04d}: {module.description}")
+            with engine.begin() as connection:
+                try:
+                    module.upgrade(connection)
+                finally:
+                    deferred = connection.info.pop(_DEFERRED_INDEXES, [])
+                if not deferred:
+                    _record(connection, version, module)
+            if deferred:
+                for index in deferred:
+                    _create_index_concurrently(engine, index)
+                with engine.begin() as connection:
+                    _record(connection, version, module)
+            applied = version
+    return applied
+
+
+def check(engine: Engine) -> int:
+    """Raise SchemaOutOfDate unless the database is at the latest version"""
+    current, latest = current_version(engine), latest_version()
+    if current < latest:
+        raise SchemaOutOfDate(
+            f"Database schema is at version {current}, code expects {latest}. "
+            f"Run 'python -m app.migrations' before starting the app."
+        )
+    return current
+
+
+# Helpers that keep migrations safe to re-run against a database whose
+# tables were created by an earlier create_all from the current models
+
+def has_column(connection: Connection, table: str, column: str) -> bool:
+    return any(c["name"] == column for c in inspect(connection).get_columns(table))
+
+
+def has_index(connection: Connection, table: str, index: str) -> bool:
+    return any(i["name"] == index for i in inspect(connection).get_indexes(table))
+
+
+def create_index_if_missing(connection: Connection, index) -> None:
+    """
+    Create a sqlalchemy Index unless one with that name already exists. On
+    Postgres the build is deferred until the migration's transaction has
+    committed and runs CONCURRENTLY (see upgrade).
+    """
+    if connection.dialect.name == "postgresql":
+        connection.info.setdefault(_DEFERRED_INDEXES, []).append(index)
+    elif not has_index(connection, index.table.name, index.name):
+        index.create(connection)
+
+
+def _concurrent_index_ddl(index, dialect) -> str:
+    ddl = str(CreateIndex(index, if_not_exists=True).compile(dialect=dialect))
+    return re.sub(r"^CREATE (UNIQUE )?INDEX ", r"CREATE \1INDEX CONCURRENTLY ", ddl)
+
+
+def _create_index_concurrently(engine: Engine, index) -> None:
+    """Build an index without blocking writes to its table (Postgres)"""
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        # A failed concurrent build leaves an INVALID index that IF NOT EXISTS would keep
+        invalid = connection.execute(text(
+            "SELECT 1 FROM pg_index JOIN pg_class ON pg_class.oid = pg_index.indexrelid "
+            "WHERE pg_class.relname = :name AND NOT pg_index.indisvalid"
+        ), {"name": index.name}).first()
+        if invalid:
+            logger.warning(f"Rebuilding invalid index {index.name}")
+            connection.execute(text(f'DROP INDEX CONCURRENTLY IF EXISTS "{index.name}"'))
+        logger.info(f"Building index {index.name} concurrently")
+        connection.execute(text(_concurrent_index_ddl(index, connection.dialect)))
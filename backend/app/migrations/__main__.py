@@ -0,0 +1,27 @@
+"""
+python -m app.migrations [upgrade|current|plans]
+"""
+import logging
+import sys
+
+from app.database import engine
+from app.migrations import current_version, latest_version, upgrade
+
+logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+command = sys.argv[1] if len(sys.argv) > 1 else "upgrade"
+if command == "upgrade":
+    version = upgrade(engine)
+    print(f"Database schema at version {version}")
+elif command == "current":
+    print(f"Database schema at version {current_version(engine)}, latest is {latest_version()}")
+elif command == "plans":
+    from app.migrations.plans import explain
+    failures = 0
+    for name, indexed, plan in explain(engine):
+        failures += not indexed
+        print(f"{'ok  ' if indexed else 'SCAN'} {name}: {plan}")
+    sys.exit(1 if failures else 0)
+else:
+    print(__doc__.strip())
+    sys.exit(2)
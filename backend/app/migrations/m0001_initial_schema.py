@@ -0,0 +1,185 @@
+"""
+Baseline schema: the tables create_all used to build at startup, frozen as
+the models stood before versioned migrations. Later columns and indexes
+belong to the migrations that introduced them, so this must not import
+app.models.
+"""
+from sqlalchemy import Column, DateTime, Enum, ForeignKey, Integer, JSON, MetaData, String, Table, Text
+from sqlalchemy.sql import func
+
+description = "initial schema"
+
+# Enum types store member names, as Enum(<python enum>) does in the models
+SERVICE_TYPE = Enum("ELECTRICITY", "GAS", "WATER", "PROPERTY", name="servicetype")
+APPLICATION_STATUS = Enum(
+    "DRAFT", "PENDING", "SUBMITTED", "PROCESSING", "COMPLETED", "REJECTED", name="applicationstatus"
+)
+DOCUMENT_TYPE = Enum(
+    "AADHAAR", "PAN", "ELECTRICITY_BILL", "GAS_BILL", "WATER_BILL", "PROPERTY_PAPER", "PASSPORT", "VOTER_ID", "OTHER",
+    name="documenttype",
+)
+RPA_SUBMISSION_STATUS = Enum("QUEUED", "PROCESSING", "SUCCESS", "FAILED", "RETRY", name="rpasubmissionstatus")
+
+metadata = MetaData()
+
+
+def _id() -> Column:
+    return Column("id", Integer, primary_key=True, index=True)
+
+
+def _user_id() -> Column:
+    return Column("user_id", Integer, ForeignKey("users.id"), nullable=False)
+
+
+def _created_at() -> Column:
+    return Column("created_at", DateTime(timezone=True), server_default=func.now())
+
+
+Table(
+    "users", metadata,
+    _id(),
+    Column("email", String(255), unique=True, index=True, nullable=False),
+    Column("mobile", String(15), unique=True, index=True, nullable=False),
+    Column("hashed_password", String(255), nullable=False),
+    Column("full_name", String(255)),
+    Column("aadhaar_number", String(12)),
+    Column("pan_number", String(10)),
+    Column("address", Text),
+    Column("city", String(100)),
+    Column("state", String(100)),
+    Column("pincode", String(6)),
+    Column("date_of_birth", String(10)),
+    _created_at(),
+    Column("updated_at", DateTime(timezone=True)),
+)
+
+Table(
+    "documents", metadata,
+    _id(),
+    _user_id(),
+    Column("doc_type", DOCUMENT_TYPE, nullable=False),
+    Column("file_url", String(500), nullable=False),
+    Column("file_name", String(255)),
+    Column("extracted_data", JSON),
+    Column("is_verified", Integer),
+    _created_at(),
+)
+
+Table(
+    "electricity_accounts", metadata,
+    _id(),
+    _user_id(),
+    Column("provider", String(100)),
+    Column("service_number", String(50)),
+    Column("t_no", String(50)),
+    Column("consumer_name", String(255)),
+    Column("connection_address", Text),
+    Column("meter_number", String(50)),
+    _created_at(),
+)
+
+Table(
+    "gas_accounts", metadata,
+    _id(),
+    _user_id(),
+    Column("provider", String(100)),
+    Column("consumer_number", String(50)),
+    Column("bp_number", String(50)),
+    Column("consumer_name", String(255)),
+    Column("connection_address", Text),
+    _created_at(),
+)
+
+Table(
+    "water_accounts", metadata,
+    _id(),
+    _user_id(),
+    Column("provider", String(100)),
+    Column("connection_id", String(50)),
+    Column("consumer_name", String(255)),
+    Column("connection_address", Text),
+    Column("zone", String(50)),
+    Column("ward", String(50)),
+    _created_at(),
+)
+
+Table(
+    "property_accounts", metadata,
+    _id(),
+    _user_id(),
+    Column("survey_number", String(50)),
+    Column("property_id", String(50)),
+    Column("owner_name", String(255)),
+    Column("property_type", String(50)),
+    Column("property_address", Text),
+    Column("city", String(100)),
+    Column("taluka", String(100)),
+    Column("district", String(100)),
+    Column("area_sqft", String(50)),
+    _created_at(),
+)
+
+Table(
+    "applications", metadata,
+    _id(),
+    _user_id(),
+    Column("service_type", SERVICE_TYPE, nullable=False),
+    Column("application_type", String(100)),
+    Column("status", APPLICATION_STATUS),
+    Column("form_data", JSON),
+    Column("external_reference", String(100)),
+    Column("submitted_at", DateTime(timezone=True)),
+    _created_at(),
+    Column("updated_at", DateTime(timezone=True)),
+)
+
+Table(
+    "rpa_submissions", metadata,
+    _id(),
+    Column("application_id", Integer, ForeignKey("applications.id"), nullable=False),
+    Column("target_website", String(255)),
+    Column("target_url", String(500)),
+    Column("status", RPA_SUBMISSION_STATUS),
+    Column("submission_data", JSON),
+    Column("response_data", JSON),
+    Column("confirmation_number", String(100)),
+    Column("error_message", Text),
+    Column("retry_count", Integer),
+    Column("max_retries", Integer),
+    Column("started_at", DateTime(timezone=True)),
+    Column("completed_at", DateTime(timezone=True)),
+    _created_at(),
+)
+
+
+def _demo_table(name: str, fields) -> None:
+    """The four demo government tables differ only in their portal-specific fields"""
+    Table(
+        name, metadata,
+        _id(),
+        Column("confirmation_number", String(20), unique=True, index=True),
+        *fields,
+        Column("applicant_name", String(255)),
+        Column("mobile", String(15)),
+        Column("email", String(255)),
+        Column("application_type", String(100)),
+        Column("status", String(50)),
+        Column("submitted_at", DateTime(timezone=True), server_default=func.now()),
+        Column("processed_at", DateTime(timezone=True)),
+        Column("processing_notes", Text),
+        Column("officer_name", String(255)),
+        Column("department", String(100)),
+    )
+
+
+_demo_table("demo_torrent_applications", [Column("service_number", String(50)), Column("t_no", String(50))])
+_demo_table("demo_adani_gas_applications", [Column("consumer_number", String(50)), Column("bp_number", String(50))])
+_demo_table("demo_amc_water_applications", [Column("connection_id", String(50)), Column("zone", String(50))])
+_demo_table("demo_anyror_applications", [
+    Column("survey_number", String(50)), Column("property_id", String(50)), Column("district", String(50)),
+])
+
+
+def upgrade(connection):
+    # checkfirst keeps databases created by the old create_all untouched
+    metadata.create_all(connection, checkfirst=True)
@@ -0,0 +1,38 @@
+"""
+Indexes for the per-user listing queries in the routers
+"""
+from sqlalchemy import Column, DateTime, Index, Integer, MetaData, String, Table
+
+from app.migrations import create_index_if_missing
+
+description = "composite indexes for per-user listings"
+
+# Only the indexed columns, as they stood when this migration was written
+metadata = MetaData()
+applications = Table(
+    "applications", metadata,
+    Column("user_id", Integer), Column("status", String(20)), Column("created_at", DateTime(timezone=True)),
+)
+documents = Table(
+    "documents", metadata,
+    Column("user_id", Integer), Column("doc_type", String(20)), Column("created_at", DateTime(timezone=True)),
+)
+rpa_submissions = Table("rpa_submissions", metadata, Column("application_id", Integer), Column("status", String(20)))
+accounts = {
+    name: Table(name, metadata, Column("user_id", Integer))
+    for name in ("electricity_accounts", "gas_accounts", "water_accounts", "property_accounts")
+}
+
+INDEXES = [
+    Index("ix_applications_user_created", applications.c.user_id, applications.c.created_at),
+    Index("ix_applications_user_status", applications.c.user_id, applications.c.status),
+    Index("ix_documents_user_created", documents.c.user_id, documents.c.created_at),
+    Index("ix_documents_user_type_created", documents.c.user_id, documents.c.doc_type, documents.c.created_at),
+    *(Index(f"ix_{name}_user_id", table.c.user_id) for name, table in accounts.items()),
+    Index("ix_rpa_submissions_application_status", rpa_submissions.c.application_id, rpa_submissions.c.status),
+]
+
+
+def upgrade(connection):
+    for index in INDEXES:
+        create_index_if_missing(connection, index)
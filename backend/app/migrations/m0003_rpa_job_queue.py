@@ -0,0 +1,28 @@
+"""
+Job queue columns on rpa_submissions: next attempt time and claim lease
+"""
+from sqlalchemy import DDL, Column, DateTime, Index, MetaData, String, Table
+
+from app.migrations import create_index_if_missing, has_column
+
+description = "rpa submission job queue"
+
+rpa_submissions = Table(
+    "rpa_submissions", MetaData(),
+    Column("status", String(20)),
+    Column("available_at", DateTime(timezone=True)),
+    Column("claimed_by", String(100)),
+    Column("lease_expires_at", DateTime(timezone=True)),
+)
+
+COLUMNS = ["available_at", "claimed_by", "lease_expires_at"]
+
+INDEX = Index("ix_rpa_submissions_status_available", rpa_submissions.c.status, rpa_submissions.c.available_at)
+
+
+def upgrade(connection):
+    for name in COLUMNS:
+        if not has_column(connection, rpa_submissions.name, name):
+            column_type = rpa_submissions.c[name].type.compile(dialect=connection.dialect)
+            connection.execute(DDL(f"ALTER TABLE {rpa_submissions.name} ADD COLUMN {name} {column_type}"))
+    create_index_if_missing(connection, INDEX)
@@ -0,0 +1,27 @@
+"""
+Content-addressed document storage: blob hash, type and size on documents
+"""
+from sqlalchemy import DDL, Column, Index, Integer, MetaData, String, Table
+
+from app.migrations import create_index_if_missing, has_column
+
+description = "document content hash for the blob store"
+
+documents = Table(
+    "documents", MetaData(),
+    Column("content_hash", String(64)),
+    Column("content_type", String(100)),
+    Column("file_size", Integer),
+)
+
+COLUMNS = ["content_hash", "content_type", "file_size"]
+
+INDEX = Index("ix_documents_content_hash", documents.c.content_hash)
+
+
+def upgrade(connection):
+    for name in COLUMNS:
+        if not has_column(connection, documents.name, name):
+            column_type = documents.c[name].type.compile(dialect=connection.dialect)
+            connection.execute(DDL(f"ALTER TABLE {documents.name} ADD COLUMN {name} {column_type}"))
+    create_index_if_missing(connection, INDEX)
@@ -0,0 +1,14 @@
+"""
+Background OCR state on documents
+"""
+from sqlalchemy import DDL, String
+
+from app.migrations import has_column
+
+description = "document extraction status"
+
+
+def upgrade(connection):
+    if not has_column(connection, "documents", "extraction_status"):
+        column_type = String(20).compile(dialect=connection.dialect)
+        connection.execute(DDL(f"ALTER TABLE documents ADD COLUMN extraction_status {column_type}"))
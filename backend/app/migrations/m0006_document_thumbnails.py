@@ -0,0 +1,14 @@
+"""
+Thumbnail derived from each uploaded document image
+"""
+from sqlalchemy import DDL, String
+
+from app.migrations import has_column
+
+description = "document thumbnails"
+
+
+def upgrade(connection):
+    if not has_column(connection, "documents", "thumbnail_url"):
+        column_type = String(500).compile(dialect=connection.dialect)
+        connection.execute(DDL(f"ALTER TABLE documents ADD COLUMN thumbnail_url {column_type}"))
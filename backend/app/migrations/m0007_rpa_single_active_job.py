@@ -0,0 +1,53 @@
+"""
+At most one queued, running or retrying RPA job per application
+"""
+from sqlalchemy import (
+    Column, DateTime, Enum, Index, Integer, MetaData, Table, Text, and_, select, text, update,
+)
+
+from app.migrations import create_index_if_missing
+
+description = "rpa single active job per application"
+
+# Enum types store member names, as Enum(<python enum>) does in the models
+RPA_SUBMISSION_STATUS = Enum("QUEUED", "PROCESSING", "SUCCESS", "FAILED", "RETRY", name="rpasubmissionstatus")
+
+rpa_submissions = Table(
+    "rpa_submissions", MetaData(),
+    Column("id", Integer, primary_key=True),
+    Column("application_id", Integer),
+    Column("status", RPA_SUBMISSION_STATUS),
+    Column("error_message", Text),
+    Column("lease_expires_at", DateTime(timezone=True)),
+)
+
+ACTIVE = ("QUEUED", "PROCESSING", "RETRY")
+
+INDEX = Index(
+    "uq_rpa_submissions_active_application",
+    rpa_submissions.c.application_id,
+    unique=True,
+    postgresql_where=text("status IN ('QUEUED', 'PROCESSING', 'RETRY')"),
+    sqlite_where=text("status IN ('QUEUED', 'PROCESSING', 'RETRY')"),
+)
+
+
+def upgrade(connection):
+    # Repeated autofill requests may already have queued duplicates; keep
+    # the oldest live job per application so the unique index can be built
+    older = rpa_submissions.alias("older")
+    has_older = select(older.c.id).where(
+        older.c.application_id == rpa_submissions.c.application_id,
+        older.c.id < rpa_submissions.c.id,
+        older.c.status.in_(ACTIVE),
+    ).exists()
+    connection.execute(
+        update(rpa_submissions)
+        .where(and_(rpa_submissions.c.status.in_(ACTIVE), has_older))
+        .values(
+            status="FAILED",
+            error_message="Duplicate of an earlier job for this application",
+            lease_expires_at=None,
+        )
+    )
+    create_index_if_missing(connection, INDEX)
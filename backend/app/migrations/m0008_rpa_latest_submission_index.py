@@ -0,0 +1,20 @@
+"""
+Index for an application's latest RPA job, newest first
+"""
+from sqlalchemy import Column, Index, Integer, MetaData, Table
+
+from app.migrations import create_index_if_missing
+
+description = "rpa submissions by application and id"
+
+rpa_submissions = Table(
+    "rpa_submissions", MetaData(),
+    Column("id", Integer),
+    Column("application_id", Integer),
+)
+
+INDEX = Index("ix_rpa_submissions_application_id", rpa_submissions.c.application_id, rpa_submissions.c.id)
+
+
+def upgrade(connection):
+    create_index_if_missing(connection, INDEX)
@@ -0,0 +1,24 @@
+"""
+Document file URLs relative to UPLOAD_DIR. They used to be stored as
+"/" + the path from the working directory, which an absolute UPLOAD_DIR
+turned into "//data/uploads/..." that downloads could not resolve.
+"""
+from sqlalchemy import String, column, func, table, update
+
+from app.config import get_settings
+
+description = "document file urls relative to UPLOAD_DIR"
+
+documents = table("documents", column("file_url", String), column("thumbnail_url", String))
+
+
+def upgrade(connection):
+    # The prefix the old URLs were built with under this deployment's UPLOAD_DIR
+    prefix = "/" + get_settings().UPLOAD_DIR.replace("\\", "/").rstrip("/") + "/"
+    for name in ("file_url", "thumbnail_url"):
+        url = documents.c[name]
+        connection.execute(
+            update(documents)
+            .where(func.substr(url, 1, len(prefix)) == prefix)
+            .values({name: func.substr(url, len(prefix) + 1)})
+        )
@@ -0,0 +1,14 @@
+"""
+Claim stamp on pending documents, so only one process runs each extraction
+"""
+from sqlalchemy import DDL, DateTime
+
+from app.migrations import has_column
+
+description = "document extraction claims"
+
+
+def upgrade(connection):
+    if not has_column(connection, "documents", "extraction_claimed_at"):
+        column_type = DateTime(timezone=True).compile(dialect=connection.dialect)
+        connection.execute(DDL(f"ALTER TABLE documents ADD COLUMN extraction_claimed_at {column_type}"))
@@ -0,0 +1,25 @@
+"""
+Indexes for the per-target limits queue.claim counts from the job table
+"""
+from sqlalchemy import Column, DateTime, Index, MetaData, String, Table
+
+from app.migrations import create_index_if_missing
+
+description = "rpa per-target limit indexes"
+
+rpa_submissions = Table(
+    "rpa_submissions", MetaData(),
+    Column("target_website", String(255)),
+    Column("status", String(20)),
+    Column("started_at", DateTime(timezone=True)),
+)
+
+INDEXES = [
+    Index("ix_rpa_submissions_target_status", rpa_submissions.c.target_website, rpa_submissions.c.status),
+    Index("ix_rpa_submissions_target_started", rpa_submissions.c.target_website, rpa_submissions.c.started_at),
+]
+
+
+def upgrade(connection):
+    for index in INDEXES:
+        create_index_if_missing(connection, index)
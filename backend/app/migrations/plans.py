@@ -0,0 +1,79 @@
+"""
+Query Plan Check
+EXPLAINs the hot per-user queries, built by the same functions the routers
+call, and reports any that would scan a whole table or sort without an
+index. Run it against a migrated database with: python -m app.migrations plans
+"""
+from datetime import datetime
+from typing import List, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+from app.autofill import bundle_query
+from app.extraction import cached_extraction
+from app.models import (
+    Application, ApplicationStatus, DocumentType, ElectricityAccount, GasAccount,
+    WaterAccount, PropertyAccount, ServiceType
+)
+from app.queries import (
+    application_page, application_status_counts, latest_document_data, latest_submission,
+    user_accounts, user_documents
+)
+from app.rpa.queue import active_submission_query
+from app.storage import blob_references
+
+
+def hot_queries(dialect: str) -> List[Tuple[str, object]]:
+    """(name, statement) for each query the routers run per request"""
+    columns = [Application.service_type, Application.status, Application.created_at]
+    # A cursor as applications._decode_cursor hands it over: stored text on SQLite
+    cursor = ("2024-01-01 00:00:00" if dialect == "sqlite" else datetime(2024, 1, 1), 1000)
+    return [
+        ("applications.get_applications", application_page(1, dialect, columns)),
+        ("applications.get_applications cursor", application_page(1, dialect, columns, after=cursor)),
+        ("applications.get_applications status", application_page(1, dialect, columns, status=ApplicationStatus.PENDING)),
+        ("applications.get_applications service_type cursor", application_page(
+            1, dialect, columns, service_type=ServiceType.ELECTRICITY, after=cursor
+        )),
+        ("applications.get_application_stats", application_status_counts(1)),
+        ("applications.get_automation_status", latest_submission(1, 1)),
+        ("applications.autofill_external_form", active_submission_query(1)),
+        ("documents.get_user_documents", user_documents(1)),
+        ("documents.get_autofill_data", latest_document_data(1, DocumentType.AADHAAR)),
+        ("documents.upload cached extraction", cached_extraction("0" * 64, DocumentType.AADHAAR)),
+        ("storage.blob_references", blob_references("0" * 64)),
+        ("autofill.get_account_bundle", bundle_query(1)),
+        ("services.get_electricity_accounts", user_accounts(ElectricityAccount, 1)),
+        ("services.get_gas_accounts", user_accounts(GasAccount, 1)),
+        ("services.get_water_accounts", user_accounts(WaterAccount, 1)),
+        ("services.get_property_accounts", user_accounts(PropertyAccount, 1)),
+    ]
+
+
+def explain(engine: Engine) -> List[Tuple[str, bool, str]]:
+    """(name, uses an index, plan text) per hot query"""
+    results = []
+    with engine.connect() as connection:
+        dialect = connection.dialect.name
+        if dialect == "postgresql":
+            # Small tables make a seq scan cheapest, which says nothing about
+            # the indexes; with seq scans priced out one only remains where
+            # no index can serve the query
+            connection.execute(text("SET enable_seqscan = off"))
+        for name, statement in hot_queries(dialect):
+            sql = str(statement.compile(dialect=connection.dialect, compile_kwargs={"literal_binds": True}))
+            if dialect == "sqlite":
+                rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}").fetchall()
+                plan = "; ".join(row[-1] for row in rows)
+                indexed = not any(
+                    detail.startswith("SCAN") or "TEMP B-TREE" in detail
+                    for detail in (row[-1] for row in rows)
+                )
+            else:
+                rows = connection.exec_driver_sql(f"EXPLAIN {sql}").fetchall()
+                plan = "; ".join(row[0] for row in rows)
+                indexed = "Seq Scan" not in plan
+            results.append((name, indexed, plan))
+        connection.rollback()
+    return results
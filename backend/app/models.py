@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, JSON, Enum, Text
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, JSON, Enum, Text, Index, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database import Base
@@ -85,13 +85,26 @@ class User(Base):
 
 class Document(Base):
     __tablename__ = "documents"
+    __table_args__ = (
+        # Per-user listing newest first, and latest document of a type
+        Index("ix_documents_user_created", "user_id", "created_at"),
+        Index("ix_documents_user_type_created", "user_id", "doc_type", "created_at"),
+        # Blob reference counting and reuse of earlier results for the same bytes
+        Index("ix_documents_content_hash", "content_hash"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     doc_type = Column(Enum(DocumentType), nullable=False)
     file_url = Column(String(500), nullable=False)
     file_name = Column(String(255))
+    content_hash = Column(String(64))  # SHA-256 of the stored blob
+    content_type = Column(String(100))
+    file_size = Column(Integer)
+    thumbnail_url = Column(String(500))
     extracted_data = Column(JSON)  # OCR extracted data
+    extraction_status = Column(String(20))  # pending, done, failed, skipped (app/extraction.py)
+    extraction_claimed_at = Column(DateTime(timezone=True))  # when a process took the pending job
     is_verified = Column(Integer, default=0)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
@@ -101,7 +114,7 @@ class ElectricityAccount(Base):
     __tablename__ = "electricity_accounts"
     
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     provider = Column(String(100))  # Torrent Power, UGVCL, etc.
     service_number = Column(String(50))
     t_no = Column(String(50))
@@ -117,7 +130,7 @@ class GasAccount(Base):
     __tablename__ = "gas_accounts"
     
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     provider = Column(String(100))  # Adani Gas, Gujarat Gas, etc.
     consumer_number = Column(String(50))
     bp_number = Column(String(50))
@@ -131,7 +144,7 @@ class WaterAccount(Base):
     __tablename__ = "water_accounts"
     
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     provider = Column(String(100))  # AMC, SMC, etc.
     connection_id = Column(String(50))
     consumer_name = Column(String(255))
@@ -146,7 +159,7 @@ class PropertyAccount(Base):
     __tablename__ = "property_accounts"
     
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     survey_number = Column(String(50))
     property_id = Column(String(50))
     owner_name = Column(String(255))
@@ -162,6 +175,10 @@ class PropertyAccount(Base):
 
 class Application(Base):
     __tablename__ = "applications"
+    __table_args__ = (
+        Index("ix_applications_user_created", "user_id", "created_at"),
+        Index("ix_applications_user_status", "user_id", "status"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -186,6 +203,23 @@ class RPASubmissionStatus(str, enum.Enum):
 
 class RPASubmission(Base):
     __tablename__ = "rpa_submissions"
+    __table_args__ = (
+        Index("ix_rpa_submissions_application_status", "application_id", "status"),
+        # Latest job of an application (automation status)
+        Index("ix_rpa_submissions_application_id", "application_id", "id"),
+        Index("ix_rpa_submissions_status_available", "status", "available_at"),
+        # Per-target limits counted at claim time (queue._has_capacity)
+        Index("ix_rpa_submissions_target_status", "target_website", "status"),
+        Index("ix_rpa_submissions_target_started", "target_website", "started_at"),
+        # At most one live job per application, so a repeated request cannot file twice
+        Index(
+            "uq_rpa_submissions_active_application",
+            "application_id",
+            unique=True,
+            postgresql_where=text("status IN ('QUEUED', 'PROCESSING', 'RETRY')"),
+            sqlite_where=text("status IN ('QUEUED', 'PROCESSING', 'RETRY')"),
+        ),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     application_id = Column(Integer, ForeignKey("applications.id"), nullable=False)
@@ -198,6 +232,10 @@ class RPASubmission(Base):
     error_message = Column(Text)
     retry_count = Column(Integer, default=0)
     max_retries = Column(Integer, default=3)
+    # Job queue bookkeeping: earliest next attempt, current claim and its expiry
+    available_at = Column(DateTime(timezone=True))
+    claimed_by = Column(String(100))
+    lease_expires_at = Column(DateTime(timezone=True))
     started_at = Column(DateTime(timezone=True))
     completed_at = Column(DateTime(timezone=True))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -0,0 +1,141 @@
+"""
+Document OCR
+Runs the tesseract binary (installed by the Dockerfile) on a stored image
+and pulls the autofill fields out of the recognised text. Everything here
+is plain functions without app imports, so it loads quickly in the
+extraction pipeline's worker processes.
+"""
+import re
+import subprocess
+from typing import Callable, Dict, List, Optional
+
+_AADHAAR_NUMBER = re.compile(r"\b([2-9]\d{3})\s?(\d{4})\s?(\d{4})\b")
+_PAN_NUMBER = re.compile(r"\b([A-Z]{5}\d{4}[A-Z])\b")
+_DATE = re.compile(r"\b(\d{2}[/\-.]\d{2}[/\-.]\d{4})\b")
+_GENDER = re.compile(r"\b(MALE|FEMALE|TRANSGENDER)\b", re.IGNORECASE)
+_ADDRESS = re.compile(r"Address\s*[:\-]?\s*(.+?\b(\d{6})\b)", re.IGNORECASE | re.DOTALL)
+_NAME_LABEL = re.compile(r"^\s*(?:Name|Consumer Name|Customer Name|Owner Name)\s*[:\-/]?\s*(.*)$", re.IGNORECASE)
+_CONSUMER_NUMBER = re.compile(
+    r"(?:Service|Consumer|Connection|Customer|BP|Account)\s*(?:No|Number|ID)\.?\s*[:\-]?\s*([A-Z0-9][A-Z0-9\-/]{4,19})",
+    re.IGNORECASE,
+)
+_SURVEY_NUMBER = re.compile(r"Survey\s*(?:No|Number)\.?\s*[:\-]?\s*([0-9A-Z][0-9A-Z/\-]*)", re.IGNORECASE)
+# Card furniture that is never the holder's name
+_NOT_A_NAME = re.compile(r"GOVERNMENT|GOVT|INDIA|INCOME TAX|DEPARTMENT|AADHAAR|UNIQUE|FATHER|SIGNATURE|DOB|BIRTH", re.IGNORECASE)
+
+
+class OCRUnavailable(Exception):
+    """The tesseract binary is missing"""
+
+
+def run_tesseract(path: str, command: str = "tesseract", languages: str = "eng", timeout: float = 60.0) -> str:
+    try:
+        result = subprocess.run(
+            [command, path, "stdout", "-l", languages],
+            capture_output=True,
+            timeout=timeout,
+            check=True,
+        )
+    except FileNotFoundError:
+        raise OCRUnavailable(f"'{command}' not found")
+    return result.stdout.decode("utf-8", errors="replace")
+
+
+def _lines(text: str) -> List[str]:
+    return [line.strip() for line in text.splitlines() if line.strip()]
+
+
+def _looks_like_name(line: str) -> bool:
+    return bool(re.fullmatch(r"[A-Za-z][A-Za-z .']{2,}", line)) and not _NOT_A_NAME.search(line)
+
+
+def _labelled_name(lines: List[str]) -> Optional[str]:
+    for index, line in enumerate(lines):
+        match = _NAME_LABEL.match(line)
+        if not match:
+            continue
+        candidate = match.group(1).strip() or (lines[index + 1] if index + 1 < len(lines) else "")
+        if _looks_like_name(candidate):
+            return candidate
+    return None
+
+
+def parse_aadhaar(text: str) -> Dict[str, str]:
+    fields: Dict[str, str] = {}
+    lines = _lines(text)
+    number = _AADHAAR_NUMBER.search(text)
+    if number:
+        fields["aadhaar_number"] = "".join(number.groups())
+    for index, line in enumerate(lines):
+        date = _DATE.search(line)
+        if date and re.search(r"DOB|Birth", line, re.IGNORECASE):
+            fields["date_of_birth"] = date.group(1).replace("-", "/").replace(".", "/")
+            # The holder's name is printed just above the date of birth
+            for previous in reversed(lines[:index]):
+                if _looks_like_name(previous):
+                    fields["full_name"] = previous
+                    break
+            break
+    gender = _GENDER.search(text)
+    if gender:
+        fields["gender"] = gender.group(1).capitalize()
+    address = _ADDRESS.search(text)
+    if address:
+        fields["address"] = " ".join(address.group(1).split()).rstrip(",")
+        fields["pincode"] = address.group(2)
+    return fields
+
+
+def parse_pan(text: str) -> Dict[str, str]:
+    fields: Dict[str, str] = {}
+    lines = _lines(text)
+    number = _PAN_NUMBER.search(text.upper())
+    if number:
+        fields["pan_number"] = number.group(1)
+    date = _DATE.search(text)
+    if date:
+        fields["date_of_birth"] = date.group(1).replace("-", "/").replace(".", "/")
+    name = _labelled_name(lines) or next((line for line in lines if _looks_like_name(line)), None)
+    if name:
+        fields["full_name"] = name
+    return fields
+
+
+def parse_bill(text: str) -> Dict[str, str]:
+    fields: Dict[str, str] = {}
+    number = _CONSUMER_NUMBER.search(text)
+    if number:
+        fields["consumer_number"] = number.group(1)
+    name = _labelled_name(_lines(text))
+    if name:
+        fields["full_name"] = name
+    address = _ADDRESS.search(text)
+    if address:
+        fields["address"] = " ".join(address.group(1).split()).rstrip(",")
+        fields["pincode"] = address.group(2)
+    return fields
+
+
+def parse_property_paper(text: str) -> Dict[str, str]:
+    fields = parse_bill(text)
+    fields.pop("consumer_number", None)
+    survey = _SURVEY_NUMBER.search(text)
+    if survey:
+        fields["survey_number"] = survey.group(1)
+    return fields
+
+
+# DocumentType value -> parser, other types are stored without OCR
+PARSERS: Dict[str, Callable[[str], Dict[str, str]]] = {
+    "aadhaar": parse_aadhaar,
+    "pan": parse_pan,
+    "electricity_bill": parse_bill,
+    "gas_bill": parse_bill,
+    "water_bill": parse_bill,
+    "property_paper": parse_property_paper,
+}
+
+
+def extract_document(path: str, doc_type: str, command: str, languages: str, timeout: float) -> Dict[str, str]:
+    """OCR one image and parse it as `doc_type`, run in a worker process"""
+    return PARSERS[doc_type](run_tesseract(path, command, languages, timeout))
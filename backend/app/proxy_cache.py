@@ -0,0 +1,262 @@
+"""
+Proxied Page Cache
+Rewritten upstream pages for the proxy router, shared by every request in
+the process. Freshness follows the upstream Cache-Control / Expires
+headers, or a heuristic from Last-Modified when they are absent; pages
+with neither, or that set cookies or vary on everything, are not kept.
+Expired pages are revalidated with If-None-Match / If-Modified-Since,
+served stale while that happens in the background, and served stale if
+the upstream is down. Concurrent misses for a page
+share one upstream fetch, and the cache is an LRU bounded in bytes.
+"""
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+import httpx
+
+from app.config import get_settings
+from app.http_clients import http_clients
+from app.metrics import register_collector
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+class UpstreamError(Exception):
+    """The upstream answered with something other than a page"""
+
+    def __init__(self, status_code: int):
+        super().__init__(f"Upstream returned {status_code}")
+        self.status_code = status_code
+
+
+class CachedPage:
+    __slots__ = ("body", "size", "etag", "last_modified", "fresh_until", "stale_until")
+
+    def __init__(self, body: str, etag: Optional[str], last_modified: Optional[str]):
+        self.body = body
+        self.size = len(body.encode("utf-8"))
+        self.etag = etag
+        self.last_modified = last_modified
+        self.fresh_until = 0.0
+        self.stale_until = 0.0
+
+
+def _cache_control(headers: httpx.Headers) -> Dict[str, Optional[str]]:
+    directives = {}
+    for part in headers.get("cache-control", "").split(","):
+        name, _, value = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = value.strip('"') or None
+    return directives
+
+
+def _seconds(value: Optional[str]) -> Optional[int]:
+    try:
+        return max(0, int(value))
+    except (TypeError, ValueError):
+        return None
+
+
+def _timestamp(value: Optional[str]) -> Optional[float]:
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+def freshness(headers: httpx.Headers, last_modified: Optional[str] = None) -> Tuple[bool, int, int]:
+    """
+    (storable, fresh seconds, stale-while-revalidate seconds) for a
+    response. `last_modified` stands in for a Last-Modified the response
+    lacks, as on a 304 for a page already held.
+    """
+    directives = _cache_control(headers)
+    if "no-store" in directives or "private" in directives:
+        return False, 0, 0
+    # The page is shared by every user, so never keep one that sets a
+    # cookie or varies on request headers no key here captures
+    if "set-cookie" in headers or headers.get("vary", "").strip() == "*":
+        return False, 0, 0
+
+    max_age = _seconds(directives.get("s-maxage"))
+    if max_age is None:
+        max_age = _seconds(directives.get("max-age"))
+    if "no-cache" in directives:
+        max_age = 0
+    elif max_age is None and headers.get("expires"):
+        expires = _timestamp(headers["expires"])
+        date = _timestamp(headers.get("date")) or time.time()
+        # an invalid Expires means already expired
+        max_age = max(0, int(expires - date)) if expires is not None else 0
+    if max_age is None:
+        # Heuristic freshness (RFC 9111 4.2.2) needs a Last-Modified to
+        # go on: a tenth of the page's age, capped by the default TTL
+        modified = _timestamp(headers.get("last-modified") or last_modified)
+        if modified is None:
+            return False, 0, 0
+        date = _timestamp(headers.get("date")) or time.time()
+        max_age = min(settings.PROXY_CACHE_DEFAULT_TTL_SECONDS, max(0, int((date - modified) / 10)))
+
+    stale = _seconds(directives.get("stale-while-revalidate"))
+    if stale is None:
+        stale = settings.PROXY_CACHE_STALE_SECONDS
+    if "must-revalidate" in directives or "proxy-revalidate" in directives or "no-cache" in directives:
+        stale = 0
+    return True, max_age, stale
+
+
+class PageCache:
+    """
+    LRU of rendered pages keyed by the caller (route and URL). Only used
+    from the event loop, so no lock is needed.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._entries: "OrderedDict[Hashable, CachedPage]" = OrderedDict()
+        self._fetches: Dict[Hashable, asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+        self.stale_served = 0
+        self.coalesced = 0
+        self.upstream_fetches = 0
+        self.not_modified = 0
+        self.uncacheable = 0
+        self.evictions = 0
+
+    async def get(self, key: Hashable, url: str, render: Callable[[str], str]) -> Tuple[str, str]:
+        """
+        (rendered page, cache status) for `url`, where `render` turns the
+        upstream HTML into what is served. Status is HIT, STALE, MISS or
+        REVALIDATED; raises UpstreamError or httpx errors when there is
+        nothing to serve.
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            now = time.monotonic()
+            if now < entry.fresh_until:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry.body, "HIT"
+            if now < entry.stale_until:
+                self._entries.move_to_end(key)
+                self.stale_served += 1
+                self._fetch(key, url, render)
+                return entry.body, "STALE"
+
+        if key in self._fetches:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+        # shield: a client going away must not cancel a fetch others wait on
+        return await asyncio.shield(self._fetch(key, url, render))
+
+    def _fetch(self, key: Hashable, url: str, render: Callable[[str], str]) -> asyncio.Task:
+        """The upstream fetch for `key`, started unless one is already running"""
+        task = self._fetches.get(key)
+        if task is None:
+            task = asyncio.get_running_loop().create_task(self._load(key, url, render))
+            self._fetches[key] = task
+            task.add_done_callback(lambda done: self._fetch_done(key, done))
+        return task
+
+    def _fetch_done(self, key: Hashable, task: asyncio.Task) -> None:
+        self._fetches.pop(key, None)
+        if not task.cancelled() and task.exception() is not None:
+            # Background revalidations have no one awaiting them
+            logger.warning(f"Proxy fetch for {key} failed: {task.exception()}")
+
+    async def _load(self, key: Hashable, url: str, render: Callable[[str], str]) -> Tuple[str, str]:
+        entry = self._entries.get(key)
+        headers = {}
+        if entry is not None:
+            if entry.etag:
+                headers["If-None-Match"] = entry.etag
+            if entry.last_modified:
+                headers["If-Modified-Since"] = entry.last_modified
+
+        self.upstream_fetches += 1
+        try:
+            response = await http_clients.request("proxy", "GET", url, headers=headers)
+        except httpx.HTTPError:
+            if entry is not None:
+                # Upstream down: keep serving the last good page
+                return entry.body, "STALE"
+            raise
+
+        if response.status_code == 304 and entry is not None:
+            self.not_modified += 1
+            storable, max_age, stale = freshness(response.headers, entry.last_modified)
+            if storable:
+                self._set_lifetime(entry, max_age, stale)
+                entry.etag = response.headers.get("etag", entry.etag)
+                if key not in self._entries:
+                    self._store(key, entry)
+            else:
+                self._remove(key)
+            return entry.body, "REVALIDATED"
+
+        if response.status_code != 200:
+            if entry is not None and response.status_code >= 500:
+                return entry.body, "STALE"
+            raise UpstreamError(response.status_code)
+
+        body = render(response.text)
+        storable, max_age, stale = freshness(response.headers)
+        if not storable:
+            self.uncacheable += 1
+            self._remove(key)
+            return body, "MISS"
+
+        page = CachedPage(body, response.headers.get("etag"), response.headers.get("last-modified"))
+        self._set_lifetime(page, max_age, stale)
+        self._store(key, page)
+        return body, "MISS"
+
+    @staticmethod
+    def _set_lifetime(page: CachedPage, max_age: int, stale: int) -> None:
+        now = time.monotonic()
+        page.fresh_until = now + max_age
+        page.stale_until = page.fresh_until + stale
+
+    def _remove(self, key: Hashable) -> None:
+        page = self._entries.pop(key, None)
+        if page is not None:
+            self.bytes -= page.size
+
+    def _store(self, key: Hashable, page: CachedPage) -> None:
+        self._remove(key)
+        if page.size > self.max_bytes:
+            return
+        self._entries[key] = page
+        self.bytes += page.size
+        while self.bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.bytes -= evicted.size
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale_served": self.stale_served,
+            "coalesced": self.coalesced,
+            "upstream_fetches": self.upstream_fetches,
+            "not_modified": self.not_modified,
+            "uncacheable": self.uncacheable,
+            "evictions": self.evictions,
+            "in_flight": len(self._fetches),
+        }
+
+
+page_cache = PageCache(max_bytes=settings.PROXY_CACHE_MAX_BYTES)
+register_collector("proxy_cache", page_cache.stats)
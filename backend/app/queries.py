@@ -0,0 +1,83 @@
+"""
+Per-User Queries
+Statements for the hot per-user reads, built here so the routers and the
+plan check (python -m app.migrations plans) EXPLAIN exactly what runs.
+"""
+from typing import Any, Optional, Sequence, Tuple
+
+from sqlalchemy import String, and_, func, or_, select, type_coerce
+
+from app.models import Application, ApplicationStatus, Document, DocumentType, RPASubmission, ServiceType
+
+
+def created_key(dialect: str):
+    """
+    Application.created_at as the database compares it. SQLite keeps
+    timestamps as text and its CURRENT_TIMESTAMP default has no
+    microseconds, so keyset cursors hold the stored text rather than a
+    re-rendered datetime.
+    """
+    if dialect == "sqlite":
+        return type_coerce(Application.created_at, String)
+    return Application.created_at
+
+
+def application_page(
+    user_id: int,
+    dialect: str,
+    columns: Sequence[Any],
+    service_type: Optional[ServiceType] = None,
+    status: Optional[ApplicationStatus] = None,
+    after: Optional[Tuple[Any, int]] = None,
+    limit: int = 50,
+):
+    """
+    One keyset page of a user's applications, newest first: the rows after
+    `after` (created key, id), plus one extra that tells whether another
+    page exists. Rows carry id and _created_key besides `columns`.
+    """
+    key = created_key(dialect)
+    query = select(Application.id, key.label("_created_key"), *columns).where(Application.user_id == user_id)
+    if service_type is not None:
+        query = query.where(Application.service_type == service_type)
+    if status is not None:
+        query = query.where(Application.status == status)
+    if after is not None:
+        after_created, after_id = after
+        query = query.where(or_(
+            key < after_created,
+            and_(key == after_created, Application.id < after_id)
+        ))
+    return query.order_by(Application.created_at.desc(), Application.id.desc()).limit(limit + 1)
+
+
+def application_status_counts(user_id: int):
+    return select(Application.status, func.count()).where(Application.user_id == user_id).group_by(Application.status)
+
+
+def latest_submission(application_id: int, user_id: int):
+    """The newest automation job of one of the user's applications"""
+    return (
+        select(RPASubmission)
+        .join(Application)
+        .where(Application.id == application_id, Application.user_id == user_id)
+        .order_by(RPASubmission.id.desc())
+        .limit(1)
+    )
+
+
+def user_documents(user_id: int):
+    return select(Document).where(Document.user_id == user_id).order_by(Document.created_at.desc())
+
+
+def latest_document_data(user_id: int, doc_type: DocumentType):
+    """Extraction result of the user's most recent document of a type"""
+    return select(Document.extracted_data, Document.extraction_status).where(
+        Document.user_id == user_id,
+        Document.doc_type == doc_type
+    ).order_by(Document.created_at.desc()).limit(1)
+
+
+def user_accounts(model, user_id: int):
+    """A user's electricity, gas, water or property accounts"""
+    return select(model).where(model.user_id == user_id)
@@ -1,12 +1,26 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Query, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy import String, insert, select, type_coerce
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from typing import List
+from typing import Any, Dict, Iterator, List, Optional
 from datetime import datetime
-from app.database import get_db
-from app.models import User, Application, ApplicationStatus, ServiceType
-from app.schemas import ApplicationCreate, ApplicationResponse
+import base64
+import json
+import logging
+from app.database import get_db, SessionLocal
+from app.models import User, Application, ApplicationStatus, ServiceType, RPASubmission, RPASubmissionStatus
+from app.schemas import ApplicationCreate, ApplicationResponse, BulkApplicationRequest
 from app.auth import get_current_user
+from app.autofill import get_account_bundle
+from app.config import get_settings
+from app.queries import application_page, application_status_counts, latest_submission
+from app import events, rpa
 
+logger = logging.getLogger(__name__)
+settings = get_settings()
 router = APIRouter(prefix="/api/applications", tags=["Applications"])
 
 @router.post("/", response_model=ApplicationResponse)
@@ -27,12 +41,204 @@ def create_application(
     db.refresh(application)
     return application
 
-@router.get("/", response_model=List[ApplicationResponse])
+# Fields a listing can project, form_data is only sent when asked for
+APPLICATION_FIELDS = list(ApplicationResponse.model_fields)
+DEFAULT_LIST_FIELDS = [field for field in APPLICATION_FIELDS if field != "form_data"]
+
+def _encode_cursor(created_key, application_id: int) -> str:
+    if isinstance(created_key, datetime):
+        created_key = created_key.isoformat()
+    raw = json.dumps([created_key, application_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def _decode_cursor(cursor: str, dialect: str):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_key, application_id = json.loads(raw)
+        if dialect == "sqlite":
+            # Compared as stored text, see app.queries.created_key
+            return type_coerce(str(created_key), String), int(application_id)
+        return datetime.fromisoformat(created_key), int(application_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def _bulk_results(db: Session, user: User, batch: BulkApplicationRequest) -> Iterator[Dict[str, Any]]:
+    """
+    Per-item results for a bulk filing, then a summary line. Valid items are
+    inserted BULK_CHUNK_SIZE at a time with executemany, all in one
+    transaction that commits after the last chunk.
+    """
+    rows, errors = [], []
+    for index, item in enumerate(batch.applications):
+        try:
+            app_data = ApplicationCreate.model_validate(item)
+            target = None
+            if batch.automate:
+                form_data = automation_data(app_data.form_data, app_data.application_type, user)
+                target, target_url = rpa.resolve_target(app_data.service_type, app_data.application_type, form_data)
+        except ValidationError as e:
+            errors.append({"index": index, "ok": False, "errors": e.errors(include_url=False, include_context=False)})
+            continue
+        except rpa.PermanentError as e:
+            errors.append({"index": index, "ok": False, "errors": [{"msg": str(e)}]})
+            continue
+        rows.append((index, app_data, target and (target, target_url, form_data)))
+    
+    yield from errors
+    if batch.atomic and errors:
+        yield {"summary": True, "committed": False, "created": 0, "failed": len(errors)}
+        return
+    
+    now = datetime.utcnow()
+    if batch.automate:
+        status = ApplicationStatus.PROCESSING
+    elif batch.submit:
+        status = ApplicationStatus.PENDING
+    else:
+        status = ApplicationStatus.DRAFT
+    
+    # Postgres returns rows in parameter order within the batched INSERT. SQLite
+    # would fall back to one statement per row for that, but it hands out
+    # rowids in VALUES order, so sorting by id lines the rows back up
+    ordered = db.get_bind().dialect.name != "sqlite"
+    created = []
+    try:
+        for start in range(0, len(rows), settings.BULK_CHUNK_SIZE):
+            chunk = rows[start:start + settings.BULK_CHUNK_SIZE]
+            inserted = db.execute(
+                insert(Application).returning(
+                    Application.id, Application.created_at, Application.status, Application.external_reference,
+                    sort_by_parameter_order=ordered
+                ),
+                [
+                    {
+                        "user_id": user.id,
+                        "service_type": app_data.service_type,
+                        "application_type": app_data.application_type,
+                        "form_data": app_data.form_data,
+                        "status": status,
+                        "submitted_at": now if batch.submit or batch.automate else None,
+                    }
+                    for _, app_data, _ in chunk
+                ]
+            ).all()
+            if not ordered:
+                inserted.sort(key=lambda row: row.id)
+            # Core INSERTs skip the ORM hooks, so queue the status events here;
+            # they are sent once the batch commits
+            for row in inserted:
+                events.publish_on_commit(db, "application", user.id, events.application_payload(row))
+            rpa.enqueue_many(db, user.id, [
+                {"application_id": row.id, "target_website": job[0], "target_url": job[1], "submission_data": job[2]}
+                for row, (_, _, job) in zip(inserted, chunk) if job
+            ])
+            for row, (index, _, job) in zip(inserted, chunk):
+                result = {"index": index, "ok": True, "id": row.id, "status": status, "created_at": row.created_at}
+                if job:
+                    result["target_website"] = job[0]
+                created.append(result)
+                yield result
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Bulk application insert failed: {e}")
+        yield {"summary": True, "committed": False, "created": 0, "failed": len(batch.applications), "error": "Batch could not be saved"}
+        return
+    yield {"summary": True, "committed": True, "created": len(created), "failed": len(errors)}
+
+@router.post("/bulk")
+def bulk_create_applications(
+    batch: BulkApplicationRequest,
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    File many applications in one transaction. Large batches, or callers
+    that Accept application/x-ndjson, get one JSON line per item as chunks
+    are inserted; the final summary line says whether the batch committed.
+    """
+    if not batch.applications:
+        raise HTTPException(status_code=400, detail="No applications in batch")
+    if len(batch.applications) > settings.BULK_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {settings.BULK_MAX_ITEMS} applications per batch")
+    
+    stream = (
+        "application/x-ndjson" in request.headers.get("accept", "")
+        or len(batch.applications) > settings.BULK_STREAM_THRESHOLD
+    )
+    if not stream:
+        results = list(_bulk_results(db, current_user, batch))
+        summary = results.pop()
+        summary.pop("summary")
+        return {**summary, "results": sorted(results, key=lambda result: result["index"])}
+    
+    user = current_user
+    
+    def ndjson():
+        # Own session: the request's one may be closed before streaming ends
+        session = SessionLocal()
+        try:
+            for result in _bulk_results(session, user, batch):
+                yield json.dumps(jsonable_encoder(result)) + "\n"
+        finally:
+            session.close()
+    
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+@router.get("/")
 def get_applications(
+    request: Request,
+    response: Response,
+    service_type: Optional[ServiceType] = None,
+    status: Optional[ApplicationStatus] = None,
+    fields: Optional[str] = Query(None, description="Comma separated fields, form_data is left out by default"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor from the previous page"),
+    limit: int = Query(50, ge=1, le=200),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+) -> List[Dict[str, Any]]:
+    """
+    Newest first, one page at a time. The next page's cursor is returned in
+    the X-Next-Cursor header (and a Link rel=next) while more rows remain.
+    """
+    if fields:
+        selected = [field.strip() for field in fields.split(",") if field.strip()]
+        unknown = [field for field in selected if field not in APPLICATION_FIELDS]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    else:
+        selected = DEFAULT_LIST_FIELDS
+    
+    dialect = db.get_bind().dialect.name
+    rows = db.execute(application_page(
+        current_user.id,
+        dialect,
+        [getattr(Application, field) for field in selected],
+        service_type=service_type,
+        status=status,
+        after=_decode_cursor(cursor, dialect) if cursor else None,
+        limit=limit,
+    )).all()
+    
+    page = rows[:limit]
+    if len(rows) > limit:
+        last = page[-1]
+        next_cursor = _encode_cursor(last._created_key, last.id)
+        response.headers["X-Next-Cursor"] = next_cursor
+        next_url = request.url.include_query_params(cursor=next_cursor)
+        response.headers["Link"] = f'<{next_url}>; rel="next"'
+    return [{field: getattr(row, field) for field in selected} for row in page]
+
+@router.get("/stats")
+def get_application_stats(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    return db.query(Application).filter(Application.user_id == current_user.id).all()
+    """Counts per status, answered from the (user_id, status) index"""
+    rows = db.execute(application_status_counts(current_user.id)).all()
+    by_status = {status.value: count for status, count in rows}
+    return {"total": sum(by_status.values()), "by_status": by_status}
 
 @router.get("/{application_id}", response_model=ApplicationResponse)
 def get_application(
@@ -69,13 +275,28 @@ def submit_application(
     
     return {"message": "Application submitted", "status": application.status}
 
-@router.post("/{application_id}/autofill-external")
+def automation_data(form_data: Optional[dict], application_type: str, user: User) -> Dict[str, Any]:
+    """Form data plus the contact details the portals ask for"""
+    data = dict(form_data or {})
+    data.update({
+        "email": user.email,
+        "mobile": user.mobile,
+        "full_name": user.full_name,
+        "application_type": application_type
+    })
+    return data
+
+@router.post("/{application_id}/autofill-external", status_code=202)
 def autofill_external_form(
     application_id: int,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Trigger automation to fill external website form"""
+    """
+    Queue automation to fill the external website form, workers pick it up.
+    Repeating the request while a job is live returns that job instead of
+    filing the form a second time.
+    """
     application = db.query(Application).filter(
         Application.id == application_id,
         Application.user_id == current_user.id
@@ -83,31 +304,59 @@ def autofill_external_form(
     if not application:
         raise HTTPException(status_code=404, detail="Application not found")
     
-    # Prepare data for automation
-    form_data = application.form_data or {}
-    form_data.update({
-        "email": current_user.email,
-        "mobile": current_user.mobile,
-        "full_name": current_user.full_name
-    })
-    
-    # Call appropriate automation service based on service type
-    if application.service_type == ServiceType.ELECTRICITY:
-        if application.application_type == "name_change":
-            result = direct_automation_service.submit_torrent_power_name_change(form_data)
-        else:
-            result = {"success": False, "message": "Application type not supported for automation"}
-    
-    elif application.service_type == ServiceType.GAS:
-        if application.application_type == "name_change":
-            result = direct_automation_service.submit_gujarat_gas_name_change(form_data)
-        else:
-            result = {"success": False, "message": "Application type not supported for automation"}
+    existing = rpa.active_submission(db, application.id)
+    if existing:
+        return _queued_response(existing, "Automation already queued")
     
-    else:
-        result = {"success": False, "message": "Service type not supported for automation yet"}
+    # Prepare data for automation
+    form_data = automation_data(application.form_data, application.application_type, current_user)
+    try:
+        target, target_url = rpa.resolve_target(application.service_type, application.application_type, form_data)
+    except rpa.PermanentError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    return result
+    submission = rpa.enqueue(db, application, target, target_url, form_data)
+    try:
+        db.commit()
+    except IntegrityError:
+        # A concurrent request queued it first
+        db.rollback()
+        existing = rpa.active_submission(db, application.id)
+        if existing is None:
+            raise
+        return _queued_response(existing, "Automation already queued")
+    return _queued_response(submission, "Automation queued")
+
+def _queued_response(submission: RPASubmission, message: str) -> Dict[str, Any]:
+    return {
+        "success": True,
+        "message": message,
+        "submission_id": submission.id,
+        "target_website": submission.target_website,
+        "status": submission.status
+    }
+
+@router.get("/{application_id}/automation")
+def get_automation_status(
+    application_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Latest automation submission for an application"""
+    submission = db.execute(latest_submission(application_id, current_user.id)).scalar_one_or_none()
+    if not submission:
+        raise HTTPException(status_code=404, detail="No automation submitted for this application")
+    return {
+        "submission_id": submission.id,
+        "target_website": submission.target_website,
+        "status": submission.status,
+        "retry_count": submission.retry_count,
+        "next_attempt_at": submission.available_at if submission.status == RPASubmissionStatus.RETRY else None,
+        "confirmation_number": submission.confirmation_number,
+        "error_message": submission.error_message,
+        "started_at": submission.started_at,
+        "completed_at": submission.completed_at
+    }
 
 @router.get("/prefill/{service_type}/{application_type}")
 def get_prefill_data(
@@ -129,47 +378,48 @@ def get_prefill_data(
     }
     
     # Add service-specific data
+    bundle = get_account_bundle(db, current_user.id)
     if service_type == ServiceType.ELECTRICITY:
-        accounts = current_user.electricity_accounts
+        accounts = bundle["electricity_accounts"]
         if accounts:
             account = accounts[0]
             prefill_data.update({
-                "service_number": account.service_number,
-                "t_no": account.t_no,
-                "consumer_name": account.consumer_name,
-                "provider": account.provider
+                "service_number": account["service_number"],
+                "t_no": account["t_no"],
+                "consumer_name": account["consumer_name"],
+                "provider": account["provider"]
             })
     
     elif service_type == ServiceType.GAS:
-        accounts = current_user.gas_accounts
+        accounts = bundle["gas_accounts"]
         if accounts:
             account = accounts[0]
             prefill_data.update({
-                "consumer_number": account.consumer_number,
-                "bp_number": account.bp_number,
-                "consumer_name": account.consumer_name,
-                "provider": account.provider
+                "consumer_number": account["consumer_number"],
+                "bp_number": account["bp_number"],
+                "consumer_name": account["consumer_name"],
+                "provider": account["provider"]
             })
     
     elif service_type == ServiceType.WATER:
-        accounts = current_user.water_accounts
+        accounts = bundle["water_accounts"]
         if accounts:
             account = accounts[0]
             prefill_data.update({
-                "connection_id": account.connection_id,
-                "consumer_name": account.consumer_name,
-                "provider": account.provider
+                "connection_id": account["connection_id"],
+                "consumer_name": account["consumer_name"],
+                "provider": account["provider"]
             })
     
     elif service_type == ServiceType.PROPERTY:
-        accounts = current_user.property_accounts
+        accounts = bundle["property_accounts"]
         if accounts:
             account = accounts[0]
             prefill_data.update({
-                "survey_number": account.survey_number,
-                "property_id": account.property_id,
-                "owner_name": account.owner_name,
-                "property_type": account.property_type
+                "survey_number": account["survey_number"],
+                "property_id": account["property_id"],
+                "owner_name": account["owner_name"],
+                "property_type": account["property_type"]
             })
     
     return prefill_data
@@ -1,18 +1,25 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Request
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import timedelta
-from app.database import get_db
+from app.database import get_async_db
 from app.models import User
 from app.schemas import UserCreate, UserResponse, Token
-from app.auth import get_password_hash, verify_password, create_access_token, get_current_user
+from app.auth import (
+    get_password_hash_async, verify_password_async, password_needs_rehash,
+    create_access_token, get_current_user, invalidate_user_cache
+)
 from app.config import get_settings
+import logging
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/auth", tags=["Authentication"])
 settings = get_settings()
 
 @router.post("/register", response_model=UserResponse)
-async def register(request: Request, db: Session = Depends(get_db)):
+async def register(request: Request, db: AsyncSession = Depends(get_async_db)):
     try:
         # Handle both JSON and form data
         content_type = request.headers.get("content-type", "")
@@ -49,24 +56,24 @@ async def register(request: Request, db: Session = Depends(get_db)):
             raise HTTPException(status_code=400, detail="Mobile number must be 10 digits")
         
         # Check if email exists
-        if db.query(User).filter(User.email == email).first():
+        if (await db.execute(select(User.id).where(User.email == email))).first():
             raise HTTPException(status_code=400, detail="Email already registered")
         
         # Check if mobile exists
-        if db.query(User).filter(User.mobile == mobile).first():
+        if (await db.execute(select(User.id).where(User.mobile == mobile))).first():
             raise HTTPException(status_code=400, detail="Mobile number already registered")
         
         # Create user
         user = User(
             email=email,
             mobile=mobile,
-            hashed_password=get_password_hash(password),
+            hashed_password=await get_password_hash_async(password),
             full_name=full_name,
             city=city if city else None
         )
         db.add(user)
-        db.commit()
-        db.refresh(user)
+        await db.commit()
+        await db.refresh(user)
         return user
         
     except HTTPException:
@@ -75,7 +82,7 @@ async def register(request: Request, db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/login", response_model=Token)
-async def login(request: Request, db: Session = Depends(get_db)):
+async def login(request: Request, db: AsyncSession = Depends(get_async_db)):
     try:
         # Handle both JSON and form data
         content_type = request.headers.get("content-type", "")
@@ -92,14 +99,24 @@ async def login(request: Request, db: Session = Depends(get_db)):
         if not email or not password:
             raise HTTPException(status_code=422, detail="Email and password required")
         
-        user = db.query(User).filter(User.email == email).first()
-        if not user or not verify_password(password, user.hashed_password):
+        user = (await db.execute(select(User).where(User.email == email))).scalars().first()
+        if not user or not await verify_password_async(password, user.hashed_password):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Incorrect email or password",
                 headers={"WWW-Authenticate": "Bearer"},
             )
         
+        # Transparently upgrade hashes made with an older, cheaper cost factor
+        if password_needs_rehash(user.hashed_password):
+            try:
+                user.hashed_password = await get_password_hash_async(password)
+                await db.commit()
+                invalidate_user_cache(user.id)
+            except Exception as e:
+                await db.rollback()
+                logger.warning(f"Password rehash failed for user {user.id}: {e}")
+        
         access_token = create_access_token(
             data={"sub": str(user.id)},
             expires_delta=timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
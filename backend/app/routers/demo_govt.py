@@ -0,0 +1,51 @@
+"""
+Demo Government Portals
+Stand-in name change forms for the RPA targets at DEMO_BASE_URL, so browser
+automation can be exercised end to end without touching real portals
+"""
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import HTMLResponse
+from starlette.concurrency import run_in_threadpool
+from html import escape
+from app.config import get_settings
+from app.data import get_service_loader
+from app.rpa.handlers import DEMO_PORTALS, PermanentError, record_demo_application
+
+settings = get_settings()
+router = APIRouter(prefix="/demo-govt", tags=["Demo Government Portals"])
+
+PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>{title}</title></head>
+<body><h1>{title}</h1>{body}</body></html>"""
+
+def _portal(target: str):
+    if settings.RPA_MODE != "DEMO" or target not in DEMO_PORTALS:
+        raise HTTPException(status_code=404, detail="Demo portal not found")
+    _, supplier = get_service_loader().catalog.find_supplier(target)
+    title = f"{supplier['name'] if supplier else target} - Name Change (Demo)"
+    return DEMO_PORTALS[target], escape(title)
+
+@router.get("/{target}", response_class=HTMLResponse)
+def demo_form(target: str):
+    portal, title = _portal(target)
+    fields = ["applicant_name", "mobile", "email"] + portal.fields
+    inputs = "".join(
+        f'<p><label>{escape(field.replace("_", " ").title())} <input name="{field}"></label></p>'
+        for field in fields
+    )
+    body = f'<form method="post">{inputs}<button type="submit">Submit Application</button></form>'
+    return PAGE.format(title=title, body=body)
+
+@router.post("/{target}", response_class=HTMLResponse)
+async def demo_submit(target: str, request: Request):
+    portal, title = _portal(target)
+    form = dict(await request.form())
+    try:
+        confirmation_number = await run_in_threadpool(record_demo_application, target, form)
+    except PermanentError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    body = (
+        "<p>Your application has been received.</p>"
+        f'<p>Confirmation number: <strong id="confirmation-number">{escape(confirmation_number)}</strong></p>'
+    )
+    return PAGE.format(title=title, body=body)
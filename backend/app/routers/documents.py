@@ -1,32 +1,55 @@
 """
 Documents Router - Upload and Storage
 """
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
-from sqlalchemy.orm import Session
-from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Request, UploadFile, File, Form
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+from typing import Literal, Optional
 import os
-from datetime import datetime
 
-from app.database import get_db
+from app.database import get_async_db
 from app.auth import get_current_user
-from app.models import User, Document
+from app.downloads import file_response, local_path
+from app.models import User, Document, DocumentType
+from app.queries import latest_document_data, user_documents
+from app.extraction import PENDING, cached_extraction, extraction_pipeline, initial_status, reuse_result, update_profile
+from app.storage import (
+    UploadTooLarge, blob_lock, blob_references, blob_url, discard_upload, publish_blob,
+    receive_upload, release_blob, safe_filename
+)
 
 router = APIRouter(prefix="/api/documents", tags=["Documents"])
 
-# Upload directory
-UPLOAD_DIR = "uploads/documents"
-os.makedirs(UPLOAD_DIR, exist_ok=True)
+# Form values the frontend sends that differ from DocumentType values
+DOCUMENT_TYPE_ALIASES = {
+    "aadhar": DocumentType.AADHAAR,
+    "property_document": DocumentType.PROPERTY_PAPER,
+}
+
+def parse_document_type(document_type: str) -> DocumentType:
+    """Map a document_type form value onto DocumentType, unknown values become OTHER"""
+    value = document_type.strip().lower()
+    if value in DOCUMENT_TYPE_ALIASES:
+        return DOCUMENT_TYPE_ALIASES[value]
+    try:
+        return DocumentType(value)
+    except ValueError:
+        return DocumentType.OTHER
 
 @router.post("/upload")
 async def upload_document(
     file: UploadFile = File(...),
     document_type: str = Form(...),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Upload document and extract data using OCR
     
+    OCR runs in the background; extraction_status is "pending" until the
+    result is available from /autofill/{document_type}.
+    
     Supported document types:
     - aadhar: Aadhar Card
     - pan: PAN Card
@@ -35,117 +58,194 @@ async def upload_document(
     - water_bill: Water Bill
     - property_document: Property Document
     """
+    stored = None
     try:
-        # Read file content
-        content = await file.read()
-        
-        # Generate unique filename
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"{current_user.id}_{document_type}_{timestamp}_{file.filename}"
-        filepath = os.path.join(UPLOAD_DIR, filename)
+        filename = safe_filename(file.filename)
         
-        # Save file
-        with open(filepath, "wb") as f:
-            f.write(content)
-        
-        # No OCR processing for now - just store the document
-        extracted_data = {}
+        # Stream file to the staging area, hashing as it goes
+        stored = await receive_upload(file)
         
         # Save document record in database
+        doc_type = parse_document_type(document_type)
         document = Document(
             user_id=current_user.id,
-            document_type=document_type,
-            filename=filename,
-            filepath=filepath,
-            extracted_data=extracted_data
+            doc_type=doc_type,
+            file_url=blob_url(stored.sha256),
+            file_name=filename,
+            content_hash=stored.sha256,
+            content_type=stored.content_type,
+            file_size=stored.size,
+            extracted_data={},
+            extraction_status=initial_status(doc_type, stored.content_type)
         )
-        db.add(document)
-        db.commit()
-        db.refresh(document)
+        
+        async with blob_lock(stored.sha256):
+            # Same bytes read before: reuse the result instead of processing them again
+            cached = (await db.execute(cached_extraction(stored.sha256, doc_type))).first()
+            if cached is not None:
+                reuse_result(document, cached)
+            extracted_data, extraction_status = document.extracted_data, document.extraction_status
+            
+            db.add(document)
+            await db.commit()
+            await db.refresh(document)
+            
+            # Publish the blob only once a row references it
+            await publish_blob(stored)
+            stored = None
+        
+        if extraction_status == PENDING:
+            extraction_pipeline.submit(document.content_hash, doc_type)
+        elif extracted_data:
+            await run_in_threadpool(update_profile, current_user.id, doc_type, extracted_data)
         
         return {
             "success": True,
             "message": "Document uploaded successfully",
             "document_id": document.id,
             "extracted_data": extracted_data,
-            "filename": filename
+            "extraction_status": extraction_status,
+            "filename": filename,
+            "size": document.file_size,
+            "thumbnail_url": document.thumbnail_url
         }
         
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
+    finally:
+        if stored is not None:
+            await discard_upload(stored)
 
 @router.get("/")
 async def get_user_documents(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get all documents for current user"""
-    documents = db.query(Document).filter(
-        Document.user_id == current_user.id
-    ).order_by(Document.created_at.desc()).all()
+    result = await db.execute(user_documents(current_user.id))
     
-    return documents
+    return result.scalars().all()
 
 @router.get("/{document_id}")
 async def get_document(
     document_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get specific document"""
-    document = db.query(Document).filter(
-        Document.id == document_id,
-        Document.user_id == current_user.id
-    ).first()
+    result = await db.execute(
+        select(Document).where(
+            Document.id == document_id,
+            Document.user_id == current_user.id
+        )
+    )
+    document = result.scalars().first()
     
     if not document:
         raise HTTPException(status_code=404, detail="Document not found")
     
     return document
 
+@router.api_route("/{document_id}/download", methods=["GET", "HEAD"])
+async def download_document(
+    document_id: int,
+    request: Request,
+    variant: Literal["file", "thumbnail"] = "file",
+    download: bool = False,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Stream a document's bytes (or its thumbnail)
+    Supports Range and If-None-Match / If-Modified-Since; the ETag is the
+    stored file's content hash for uploads kept in the blob store
+    """
+    result = await db.execute(
+        select(Document.file_url, Document.thumbnail_url, Document.file_name, Document.content_hash, Document.content_type).where(
+            Document.id == document_id,
+            Document.user_id == current_user.id
+        )
+    )
+    document = result.first()
+    await db.close()
+    
+    if not document:
+        raise HTTPException(status_code=404, detail="Document not found")
+    
+    file_url = document.thumbnail_url if variant == "thumbnail" else document.file_url
+    path = local_path(file_url) if file_url else None
+    if path is None:
+        raise HTTPException(status_code=404, detail="File not found")
+    
+    # Blob store files are named by content hash, which makes a strong ETag
+    name = os.path.basename(path)
+    filename = document.file_name or name
+    etag = None
+    if document.content_hash and name.startswith(document.content_hash):
+        etag = f'"{name}"'
+        if name != document.content_hash:
+            # Derived images are JPEG whatever was uploaded
+            filename = os.path.splitext(filename)[0] + ("-thumbnail.jpg" if variant == "thumbnail" else ".jpg")
+    media_type = "image/jpeg" if variant == "thumbnail" else document.content_type
+    
+    return await file_response(
+        request,
+        path,
+        etag=etag,
+        media_type=media_type,
+        filename=filename,
+        disposition="attachment" if download else "inline",
+    )
+
 @router.get("/autofill/{document_type}")
 async def get_autofill_data(
     document_type: str,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Get auto-fill data from user's uploaded documents
-    Returns merged data from all relevant documents
+    Served from the OCR result stored when the document was processed;
+    status "pending" means extraction has not finished yet
     """
     # Get user's documents of this type
-    documents = db.query(Document).filter(
-        Document.user_id == current_user.id,
-        Document.document_type == document_type
-    ).order_by(Document.created_at.desc()).limit(1).all()
-    
-    if not documents:
-        return {"data": {}}
+    result = await db.execute(latest_document_data(current_user.id, parse_document_type(document_type)))
+    row = result.first()
     
     # Return extracted data from most recent document
-    return {"data": documents[0].extracted_data or {}}
+    return {"data": (row.extracted_data if row else None) or {}, "status": row.extraction_status if row else None}
 
 @router.delete("/{document_id}")
 async def delete_document(
     document_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Delete document"""
-    document = db.query(Document).filter(
-        Document.id == document_id,
-        Document.user_id == current_user.id
-    ).first()
+    result = await db.execute(
+        select(Document).where(
+            Document.id == document_id,
+            Document.user_id == current_user.id
+        )
+    )
+    document = result.scalars().first()
     
     if not document:
         raise HTTPException(status_code=404, detail="Document not found")
     
-    # Delete file from disk
-    if os.path.exists(document.filepath):
-        os.remove(document.filepath)
-    
     # Delete from database
-    db.delete(document)
-    db.commit()
+    content_hash = document.content_hash
+    filepath = local_path(document.file_url)
+    await db.delete(document)
+    await db.commit()
+    
+    # Delete file from disk, blobs only when no other document references them
+    if content_hash:
+        async with blob_lock(content_hash):
+            await release_blob(content_hash, await db.scalar(blob_references(content_hash)))
+    elif filepath is not None and os.path.exists(filepath):
+        os.remove(filepath)
     
     return {"success": True, "message": "Document deleted successfully"}
@@ -0,0 +1,124 @@
+"""
+Status Event Stream
+Server-sent events for the signed-in user's application and automation
+status changes, replacing per-application polling
+"""
+import asyncio
+import hashlib
+import hmac
+import json
+import secrets
+import time
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import StreamingResponse
+from jose import JWTError, jwt
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.auth import decode_token, get_current_user, get_token_from_request, jwt_backend
+from app.cache import TTLCache
+from app.config import get_settings
+from app.database import get_async_db
+from app.events import hub
+from app.models import User
+
+settings = get_settings()
+router = APIRouter(prefix="/api/events", tags=["Events"])
+
+# Tickets are JWTs signed with a key of their own, so any worker can check
+# one another worker issued, and a ticket never passes for an access token
+_TICKET_KEY = hmac.new(settings.SECRET_KEY.encode("utf-8"), b"event-stream-ticket", hashlib.sha256).hexdigest()
+# jti of tickets already used in this process. Only touched from the event
+# loop, so checking and marking a ticket cannot interleave with another request
+_used_tickets = TTLCache(maxsize=10000, ttl=settings.EVENT_TICKET_SECONDS)
+
+@router.post("/ticket")
+def create_stream_ticket(current_user: User = Depends(get_current_user)):
+    """
+    Short-lived ticket for opening /stream. EventSource cannot set headers,
+    and a JWT in the query string would end up in access logs.
+    """
+    claims = {
+        "sub": str(current_user.id),
+        "jti": secrets.token_urlsafe(16),
+        "exp": int(time.time() + settings.EVENT_TICKET_SECONDS),
+    }
+    ticket = jwt.encode(claims, _TICKET_KEY, algorithm=settings.ALGORITHM)
+    return {"ticket": ticket, "expires_in": settings.EVENT_TICKET_SECONDS}
+
+def _ticket_user_id(ticket: str) -> Optional[int]:
+    """User a ticket was issued to, None if it is invalid, expired or used here already"""
+    try:
+        claims = jwt_backend.decode(ticket, _TICKET_KEY, [settings.ALGORITHM])
+        user_id, jti = int(claims["sub"]), claims["jti"]
+    except (JWTError, KeyError, TypeError, ValueError):
+        return None
+    if _used_tickets.get(jti) is not None:
+        return None
+    _used_tickets.set(jti, True)
+    return user_id
+
+async def _stream_user_id(request: Request, ticket: Optional[str], db: AsyncSession) -> int:
+    """Authenticate once when the stream opens, by bearer token or ticket"""
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    token = get_token_from_request(request)
+    if token:
+        try:
+            user_id = int(decode_token(token).get("sub"))
+        except (JWTError, TypeError, ValueError):
+            raise credentials_exception
+    elif ticket:
+        user_id = _ticket_user_id(ticket)
+        if user_id is None:
+            raise credentials_exception
+    else:
+        raise credentials_exception
+    if await db.get(User, user_id) is None:
+        raise credentials_exception
+    return user_id
+
+def _format(item: dict) -> str:
+    payload = {key: value for key, value in item.items() if key not in ("type", "user_id")}
+    return f"event: {item['type']}\ndata: {json.dumps(payload, default=str)}\n\n"
+
+@router.get("/stream")
+async def stream_events(
+    request: Request,
+    ticket: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    text/event-stream of `application` and `rpa_submission` events, each
+    carrying the row id and its new status. A comment line is sent every
+    EVENT_HEARTBEAT_SECONDS to keep proxies from closing an idle stream.
+    Browsers open it with ?ticket= from POST /api/events/ticket.
+    """
+    user_id = await _stream_user_id(request, ticket, db)
+    await db.close()
+
+    async def events():
+        subscriber = hub.subscribe(user_id)
+        try:
+            yield f"retry: {settings.EVENT_RETRY_MS}\n: connected\n\n"
+            while not subscriber.overflowed:
+                try:
+                    item = await asyncio.wait_for(subscriber.queue.get(), settings.EVENT_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": keep-alive\n\n"
+                    continue
+                yield _format(item)
+        finally:
+            hub.unsubscribe(subscriber)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
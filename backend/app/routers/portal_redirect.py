@@ -2,16 +2,16 @@
 Simple Portal Redirection API
 Redirects users to official government and private portals
 """
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
 from pydantic import BaseModel
 from typing import Dict, Any, List, Optional
-import json
-import os
 import logging
+from app.data import get_service_loader, cached_json_response
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/portal", tags=["portal-redirect"])
+loader = get_service_loader()
 
 class PortalRedirectRequest(BaseModel):
     supplier_id: str
@@ -28,50 +28,12 @@ class PortalRedirectResponse(BaseModel):
     user_guidance: List[str]
     automation_available: bool = False
 
-def load_services_data() -> Dict[str, Any]:
-    """Load services data from JSON file"""
-    try:
-        # Try multiple possible paths
-        possible_paths = [
-            os.path.join(os.path.dirname(__file__), "../data/services_data.json"),
-            "/app/app/data/services_data.json",
-            "/app/data/services_data.json",
-            "backend/app/data/services_data.json"
-        ]
-        
-        for services_file in possible_paths:
-            if os.path.exists(services_file):
-                with open(services_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                logger.info(f"Services data loaded from: {services_file}")
-                return data
-        
-        logger.error("Services data file not found in any expected location")
-        return {}
-        
-    except Exception as e:
-        logger.error(f"Error loading services data: {e}")
-        return {}
-
 @router.post("/redirect", response_model=PortalRedirectResponse)
 async def get_portal_redirect(request: PortalRedirectRequest):
     """Get portal redirection information for a supplier"""
     try:
-        # Load services data
-        services_data = load_services_data()
-        
         # Find supplier across all categories
-        supplier = None
-        category = None
-        
-        for cat, suppliers in services_data.items():
-            for s in suppliers:
-                if s.get('id') == request.supplier_id:
-                    supplier = s
-                    category = cat
-                    break
-            if supplier:
-                break
+        category, supplier = loader.get_catalog().find_supplier(request.supplier_id)
         
         if not supplier:
             raise HTTPException(
@@ -206,29 +168,10 @@ def generate_instructions(supplier: Dict[str, Any], service_type: str) -> List[s
     return instructions
 
 @router.get("/suppliers")
-async def get_all_suppliers():
+async def get_all_suppliers(request: Request):
     """Get list of all suppliers with portal information"""
     try:
-        services_data = load_services_data()
-        suppliers = []
-        
-        for category, supplier_list in services_data.items():
-            for supplier in supplier_list:
-                suppliers.append({
-                    "id": supplier.get('id'),
-                    "name": supplier.get('name'),
-                    "category": category,
-                    "type": supplier.get('type'),
-                    "portal_url": supplier.get('portal_url'),
-                    "online_available": supplier.get('online_available', False),
-                    "automation_type": supplier.get('automation_type', 'manual_only')
-                })
-        
-        return {
-            "suppliers": suppliers,
-            "total_count": len(suppliers),
-            "categories": list(services_data.keys())
-        }
+        return cached_json_response(request, loader.get_catalog(), "portal_suppliers")
         
     except Exception as e:
         logger.error(f"Error getting suppliers: {e}")
@@ -238,20 +181,8 @@ async def get_all_suppliers():
 async def get_supplier_portal_info(supplier_id: str):
     """Get detailed portal information for a specific supplier"""
     try:
-        services_data = load_services_data()
-        
         # Find supplier
-        supplier = None
-        category = None
-        
-        for cat, suppliers in services_data.items():
-            for s in suppliers:
-                if s.get('id') == supplier_id:
-                    supplier = s
-                    category = cat
-                    break
-            if supplier:
-                break
+        category, supplier = loader.get_catalog().find_supplier(supplier_id)
         
         if not supplier:
             raise HTTPException(status_code=404, detail="Supplier not found")
@@ -10,6 +10,8 @@ from app.schemas import (
     PropertyAccountCreate, PropertyAccountResponse
 )
 from app.auth import get_current_user
+from app.autofill import invalidate_account_bundle
+from app.queries import user_accounts
 
 router = APIRouter(prefix="/api/services", tags=["Services"])
 
@@ -23,6 +25,7 @@ def add_electricity_account(
     account = ElectricityAccount(user_id=current_user.id, **account_data.model_dump())
     db.add(account)
     db.commit()
+    invalidate_account_bundle(current_user.id)
     db.refresh(account)
     return account
 
@@ -31,7 +34,7 @@ def get_electricity_accounts(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    return db.query(ElectricityAccount).filter(ElectricityAccount.user_id == current_user.id).all()
+    return db.scalars(user_accounts(ElectricityAccount, current_user.id)).all()
 
 @router.delete("/electricity/{account_id}")
 def delete_electricity_account(
@@ -47,6 +50,7 @@ def delete_electricity_account(
         raise HTTPException(status_code=404, detail="Account not found")
     db.delete(account)
     db.commit()
+    invalidate_account_bundle(current_user.id)
     return {"message": "Account deleted"}
 
 # ============ GAS ============
@@ -59,6 +63,7 @@ def add_gas_account(
     account = GasAccount(user_id=current_user.id, **account_data.model_dump())
     db.add(account)
     db.commit()
+    invalidate_account_bundle(current_user.id)
     db.refresh(account)
     return account
 
@@ -67,7 +72,7 @@ def get_gas_accounts(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    return db.query(GasAccount).filter(GasAccount.user_id == current_user.id).all()
+    return db.scalars(user_accounts(GasAccount, current_user.id)).all()
 
 @router.delete("/gas/{account_id}")
 def delete_gas_account(
@@ -83,6 +88,7 @@ def delete_gas_account(
         raise HTTPException(status_code=404, detail="Account not found")
     db.delete(account)
     db.commit()
+    invalidate_account_bundle(current_user.id)
     return {"message": "Account deleted"}
 
 
@@ -96,6 +102,7 @@ def add_water_account(
     account = WaterAccount(user_id=current_user.id, **account_data.model_dump())
     db.add(account)
     db.commit()
+    invalidate_account_bundle(current_user.id)
     db.refresh(account)
     return account
 
@@ -104,7 +111,7 @@ def get_water_accounts(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    return db.query(WaterAccount).filter(WaterAccount.user_id == current_user.id).all()
+    return db.scalars(user_accounts(WaterAccount, current_user.id)).all()
 
 @router.delete("/water/{account_id}")
 def delete_water_account(
@@ -120,6 +127,7 @@ def delete_water_account(
         raise HTTPException(status_code=404, detail="Account not found")
     db.delete(account)
     db.commit()
+    invalidate_account_bundle(current_user.id)
     return {"message": "Account deleted"}
 
 # ============ PROPERTY ============
@@ -132,6 +140,7 @@ def add_property_account(
     account = PropertyAccount(user_id=current_user.id, **account_data.model_dump())
     db.add(account)
     db.commit()
+    invalidate_account_bundle(current_user.id)
     db.refresh(account)
     return account
 
@@ -140,7 +149,7 @@ def get_property_accounts(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    return db.query(PropertyAccount).filter(PropertyAccount.user_id == current_user.id).all()
+    return db.scalars(user_accounts(PropertyAccount, current_user.id)).all()
 
 @router.delete("/property/{account_id}")
 def delete_property_account(
@@ -156,4 +165,5 @@ def delete_property_account(
         raise HTTPException(status_code=404, detail="Account not found")
     db.delete(account)
     db.commit()
+    invalidate_account_bundle(current_user.id)
     return {"message": "Account deleted"}
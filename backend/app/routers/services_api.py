@@ -2,8 +2,8 @@
 Services API Router
 Provides endpoints for all services data
 """
-from fastapi import APIRouter, HTTPException
-from app.data import get_service_loader
+from fastapi import APIRouter, HTTPException, Query, Request
+from app.data import get_service_loader, cached_json_response
 from typing import List, Dict, Any
 
 router = APIRouter(prefix="/api/services", tags=["Services"])
@@ -17,17 +17,12 @@ def get_categories():
     }
 
 @router.get("/{category}")
-def get_services_by_category(category: str):
+def get_services_by_category(category: str, request: Request):
     """Get all services in a category"""
     if category not in ["gas", "electricity", "water", "property"]:
         raise HTTPException(status_code=400, detail="Invalid category")
     
-    services = loader.get_services_by_category(category)
-    return {
-        "category": category,
-        "count": len(services),
-        "services": services
-    }
+    return cached_json_response(request, loader.get_catalog(), f"category:{category}")
 
 @router.get("/{category}/online")
 def get_online_services(category: str):
@@ -57,6 +52,21 @@ def get_rpa_services(category: str):
         "services": services
     }
 
+@router.get("/search/{query}")
+def search_services(query: str, limit: int = Query(20, ge=1, le=100), offset: int = Query(0, ge=0)):
+    """Ranked fuzzy search across all categories"""
+    results = {}
+    total, matches = loader.get_catalog().search_index.search(query, limit=limit, offset=offset)
+    
+    for score, category, service in matches:
+        results.setdefault(category, []).append({**service, "score": score})
+    
+    return {
+        "query": query,
+        "total": total,
+        "results": results
+    }
+
 @router.get("/{category}/{service_id}")
 def get_service_details(category: str, service_id: str):
     """Get specific service details"""
@@ -84,24 +94,7 @@ def get_service_names(category: str):
         "names": names
     }
 
-@router.get("/search/{query}")
-def search_services(query: str):
-    """Search services across all categories"""
-    results = {}
-    query_lower = query.lower()
-    
-    for category in ["gas", "electricity", "water", "property"]:
-        services = loader.get_services_by_category(category)
-        matching = [s for s in services if query_lower in s['name'].lower()]
-        if matching:
-            results[category] = matching
-    
-    return {
-        "query": query,
-        "results": results
-    }
-
 @router.get("/")
-def get_all_services():
+def get_all_services(request: Request):
     """Get all services"""
-    return loader.get_all_services()
+    return cached_json_response(request, loader.get_catalog(), "all")
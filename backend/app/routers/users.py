@@ -1,11 +1,18 @@
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 from typing import List
-from app.database import get_db
+from app.database import get_async_db, get_db
 from app.models import User, Document, DocumentType
 from app.schemas import UserResponse, UserUpdate, DocumentResponse, AutoFillData
-from app.auth import get_current_user
-import uuid
+from app.auth import get_current_user, invalidate_user_cache
+from app.autofill import get_account_bundle
+from app.queries import user_documents
+from app.extraction import PENDING, cached_extraction, extraction_pipeline, initial_status, reuse_result, update_profile as apply_extraction
+from app.storage import (
+    UploadTooLarge, blob_lock, blob_url, discard_upload, publish_blob, receive_upload, safe_filename
+)
 
 router = APIRouter(prefix="/api/users", tags=["Users"])
 
@@ -19,6 +26,7 @@ def update_profile(
         setattr(current_user, field, value)
     
     db.commit()
+    invalidate_user_cache(current_user.id)
     db.refresh(current_user)
     return current_user
 
@@ -26,59 +34,52 @@ def update_profile(
 async def upload_document(
     doc_type: DocumentType,
     file: UploadFile = File(...),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
-    # Generate unique filename
-    file_extension = file.filename.split(".")[-1]
-    unique_filename = f"{current_user.id}/{doc_type.value}/{uuid.uuid4()}.{file_extension}"
-    
     # In production, upload to S3
-    # For now, save locally
-    file_url = f"/uploads/{unique_filename}"
+    # For now, stream into the local blob store
+    try:
+        stored = await receive_upload(file)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
     
-    # Read file content
-    content = await file.read()
+    async with blob_lock(stored.sha256):
+        try:
+            # Create document record
+            document = Document(
+                user_id=current_user.id,
+                doc_type=doc_type,
+                file_url=blob_url(stored.sha256),
+                file_name=safe_filename(file.filename),
+                content_hash=stored.sha256,
+                content_type=stored.content_type,
+                file_size=stored.size,
+                extracted_data={},
+                extraction_status=initial_status(doc_type, stored.content_type)
+            )
+            
+            # Same bytes read before: reuse the result instead of processing them again
+            cached = (await db.execute(cached_extraction(stored.sha256, doc_type))).first()
+            if cached is not None:
+                reuse_result(document, cached)
+            extracted_data, extraction_status = document.extracted_data, document.extraction_status
+            
+            db.add(document)
+            await db.commit()
+            await db.refresh(document)
+        except BaseException:
+            await discard_upload(stored)
+            raise
+        await publish_blob(stored)
     
-    # For now, no OCR processing - just store the document
-    extracted_data = {}
-    
-    # Create document record
-    document = Document(
-        user_id=current_user.id,
-        doc_type=doc_type,
-        file_url=file_url,
-        file_name=file.filename,
-        extracted_data=extracted_data
-    )
-    db.add(document)
-    db.commit()
-    db.refresh(document)
+    # OCR runs in the background and updates the profile when it finishes
+    if extraction_status == PENDING:
+        extraction_pipeline.submit(stored.sha256, doc_type)
     
     # Update user profile with extracted data
-    if doc_type == DocumentType.AADHAAR and extracted_data:
-        if extracted_data.get("aadhaar_number"):
-            current_user.aadhaar_number = extracted_data["aadhaar_number"]
-        if extracted_data.get("full_name") and not current_user.full_name:
-            current_user.full_name = extracted_data["full_name"]
-        if extracted_data.get("date_of_birth"):
-            current_user.date_of_birth = extracted_data["date_of_birth"]
-        if extracted_data.get("address"):
-            current_user.address = extracted_data["address"]
-        if extracted_data.get("pincode"):
-            current_user.pincode = extracted_data["pincode"]
-        if extracted_data.get("gender"):
-            current_user.gender = extracted_data["gender"]
-        db.commit()
-    
-    elif doc_type == DocumentType.PAN and extracted_data:
-        if extracted_data.get("pan_number"):
-            current_user.pan_number = extracted_data["pan_number"]
-        if extracted_data.get("full_name") and not current_user.full_name:
-            current_user.full_name = extracted_data["full_name"]
-        if extracted_data.get("date_of_birth") and not current_user.date_of_birth:
-            current_user.date_of_birth = extracted_data["date_of_birth"]
-        db.commit()
+    elif extracted_data:
+        await run_in_threadpool(apply_extraction, current_user.id, doc_type, extracted_data)
     
     return document
 
@@ -87,7 +88,7 @@ def get_documents(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    return db.query(Document).filter(Document.user_id == current_user.id).all()
+    return db.scalars(user_documents(current_user.id)).all()
 
 @router.get("/autofill-data", response_model=AutoFillData)
 def get_autofill_data(
@@ -95,10 +96,4 @@ def get_autofill_data(
     current_user: User = Depends(get_current_user)
 ):
     """Get all user data for auto-filling forms"""
-    return AutoFillData(
-        user=current_user,
-        electricity_accounts=current_user.electricity_accounts,
-        gas_accounts=current_user.gas_accounts,
-        water_accounts=current_user.water_accounts,
-        property_accounts=current_user.property_accounts
-    )
+    return AutoFillData(user=current_user, **get_account_bundle(db, current_user.id))
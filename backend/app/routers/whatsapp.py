@@ -2,8 +2,8 @@ from fastapi import APIRouter, Request, HTTPException
 from fastapi.responses import JSONResponse, PlainTextResponse
 import json
 from datetime import datetime
-import httpx
 from app.config import settings
+from app.http_clients import http_clients
 
 router = APIRouter(prefix="/api/whatsapp", tags=["whatsapp"])
 
@@ -315,9 +315,8 @@ async def send_message(phone: str, text: str):
     }
     
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(url, json=payload, headers=headers)
-            response.raise_for_status()
+        response = await http_clients.request("whatsapp", "POST", url, json=payload, headers=headers)
+        response.raise_for_status()
     except Exception as e:
         print(f"Error sending WhatsApp message: {e}")
 
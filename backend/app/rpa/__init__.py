@@ -0,0 +1,16 @@
+"""
+RPA submission queue and workers
+"""
+from app.config import get_settings
+from app.metrics import register_collector
+from app.rpa.queue import PermanentError, LeaseLost, LeaseHeartbeat, active_submission, enqueue, enqueue_many, claim, complete, fail, requeue_expired
+from app.rpa.handlers import register_handler, get_handler, resolve_target
+from app.rpa.worker import RPAWorkerPool
+from app.rpa.browser_pool import BrowserPool, PoolTimeout, browser_pool
+
+settings = get_settings()
+
+# Shared pool for the API process, started on startup when RPA_WORKERS > 0
+worker_pool = RPAWorkerPool(workers=settings.RPA_WORKERS, poll_interval=settings.RPA_POLL_INTERVAL)
+register_collector("rpa_workers", worker_pool.stats)
+register_collector("browser_pool", browser_pool.stats)
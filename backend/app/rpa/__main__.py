@@ -0,0 +1,27 @@
+"""
+python -m app.rpa [workers]
+Runs RPA workers without the API, so automation can scale separately
+"""
+import logging
+import signal
+import sys
+import threading
+
+from app.config import get_settings
+from app.rpa import RPAWorkerPool, browser_pool
+
+logging.basicConfig(level=logging.INFO)
+settings = get_settings()
+
+workers = int(sys.argv[1]) if len(sys.argv) > 1 else max(settings.RPA_WORKERS, 1)
+pool = RPAWorkerPool(workers=workers, poll_interval=settings.RPA_POLL_INTERVAL)
+stopped = threading.Event()
+signal.signal(signal.SIGTERM, lambda *_: stopped.set())
+signal.signal(signal.SIGINT, lambda *_: stopped.set())
+
+if settings.RPA_BROWSER_AUTOMATION:
+    threading.Thread(target=browser_pool.warm, daemon=True).start()
+pool.start()
+stopped.wait()
+pool.stop()
+browser_pool.close()
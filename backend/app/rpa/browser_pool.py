@@ -0,0 +1,274 @@
+"""
+Headless Browser Pool
+Keeps warm Chrome sessions for the RPA workers instead of launching one
+per submission. A browser is retired after max_uses checkouts, when its
+process tree grows past the memory ceiling, or when a health check or a
+job using it fails; callers wait in line for a free one.
+"""
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Deque, Dict, Iterator, Optional
+
+from app.config import get_settings
+
+try:
+    from selenium import webdriver
+    from selenium.webdriver.chrome.service import Service as ChromeService
+except ImportError:  # only needed when RPA_BROWSER_AUTOMATION is on
+    webdriver = None
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+class PoolTimeout(Exception):
+    """No browser became free within the checkout timeout (the job is retried)"""
+
+
+def chrome_factory():
+    """Headless Chrome via chromedriver, as installed by the Dockerfile"""
+    if webdriver is None:
+        raise RuntimeError("selenium is not installed, pip install selenium to use browser automation")
+    options = webdriver.ChromeOptions()
+    for argument in ("--headless=new", "--no-sandbox", "--disable-dev-shm-usage", "--disable-gpu", "--window-size=1366,900"):
+        options.add_argument(argument)
+    service = ChromeService(executable_path=settings.CHROME_DRIVER_PATH) if settings.CHROME_DRIVER_PATH else ChromeService()
+    return webdriver.Chrome(options=options, service=service)
+
+
+def _driver_pid(driver) -> Optional[int]:
+    process = getattr(getattr(driver, "service", None), "process", None)
+    return getattr(process, "pid", None)
+
+
+def process_tree_rss_mb(pid: Optional[int]) -> Optional[float]:
+    """Resident memory of a process and its descendants from /proc, None if unavailable"""
+    if pid is None or not os.path.isdir("/proc"):
+        return None
+    total_kb, stack = 0, [pid]
+    while stack:
+        current = stack.pop()
+        try:
+            with open(f"/proc/{current}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total_kb += int(line.split()[1])
+                        break
+            with open(f"/proc/{current}/task/{current}/children") as f:
+                stack.extend(int(child) for child in f.read().split())
+        except (OSError, ValueError):
+            continue
+    return total_kb / 1024
+
+
+class PooledBrowser:
+    def __init__(self, driver):
+        self.driver = driver
+        self.pid = _driver_pid(driver)
+        self.uses = 0
+        self.created = time.monotonic()
+
+
+class BrowserPool:
+    """At most `size` browsers, shared by checkout()"""
+
+    def __init__(
+        self,
+        factory: Callable[[], Any],
+        size: int,
+        max_uses: int,
+        max_memory_mb: float,
+        checkout_timeout: float,
+    ):
+        self.factory = factory
+        self.size = size
+        self.max_uses = max_uses
+        self.max_memory_mb = max_memory_mb
+        self.checkout_timeout = checkout_timeout
+        self._idle: Deque[PooledBrowser] = deque()
+        self._cond = threading.Condition()
+        self._open = 0  # idle + checked out + launching
+        self._closed = False
+        self.waiting = 0
+        self.launched = 0
+        self.launch_failures = 0
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.retired: Dict[str, int] = {}
+
+    def warm(self) -> None:
+        """Launch browsers until the pool is full, meant for a background thread"""
+        while True:
+            with self._cond:
+                if self._closed or self._open >= self.size:
+                    return
+                self._open += 1
+            browser = self._launch()
+            if browser is None:
+                return
+            with self._cond:
+                self._idle.append(browser)
+                self._cond.notify()
+
+    def _launch(self) -> Optional[PooledBrowser]:
+        """Start a browser for a slot already counted in _open"""
+        try:
+            browser = PooledBrowser(self.factory())
+        except Exception as e:
+            logger.error(f"Browser launch failed: {e}")
+            with self._cond:
+                self._open -= 1
+                self.launch_failures += 1
+                self._cond.notify()
+            return None
+        with self._cond:
+            self.launched += 1
+        return browser
+
+    @staticmethod
+    def _healthy(browser: PooledBrowser) -> bool:
+        try:
+            return browser.driver.execute_script("return 1") == 1
+        except Exception:
+            return False
+
+    @contextmanager
+    def checkout(self, timeout: Optional[float] = None) -> Iterator[Any]:
+        """
+        Yield a driver, waiting up to `timeout` seconds for one to free up.
+        A job that raises takes its browser down with it, since the page
+        state is unknown.
+        """
+        browser = self._acquire(self.checkout_timeout if timeout is None else timeout)
+        ok = False
+        try:
+            yield browser.driver
+            ok = True
+        finally:
+            self._release(browser, ok)
+
+    def _acquire(self, timeout: float) -> PooledBrowser:
+        started = time.monotonic()
+        deadline = started + timeout
+        while True:
+            launch = False
+            with self._cond:
+                self.waiting += 1
+                try:
+                    while not self._idle and self._open >= self.size and not self._closed:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            self.timeouts += 1
+                            raise PoolTimeout(f"No browser free after {timeout:.1f}s ({self.size} in use)")
+                        self._cond.wait(remaining)
+                finally:
+                    self.waiting -= 1
+                if self._closed:
+                    raise RuntimeError("Browser pool is closed")
+                if self._idle:
+                    browser = self._idle.popleft()
+                else:
+                    self._open += 1
+                    launch = True
+
+            if launch:
+                browser = self._launch()
+                if browser is None:
+                    raise RuntimeError("Could not launch a browser")
+            elif not self._healthy(browser):
+                self._retire(browser, "health_check")
+                continue
+
+            waited = time.monotonic() - started
+            with self._cond:
+                self.checkouts += 1
+                self.wait_total += waited
+                self.wait_max = max(self.wait_max, waited)
+            return browser
+
+    def _release(self, browser: PooledBrowser, ok: bool) -> None:
+        browser.uses += 1
+        reason = None
+        if not ok:
+            reason = "job_error"
+        elif browser.uses >= self.max_uses:
+            reason = "max_uses"
+        else:
+            rss = process_tree_rss_mb(browser.pid)
+            if rss is not None and rss > self.max_memory_mb:
+                reason = "memory"
+        if reason is None:
+            try:
+                # Next job starts from a clean session
+                browser.driver.delete_all_cookies()
+                browser.driver.get("about:blank")
+            except Exception:
+                reason = "reset_failed"
+        if reason is not None:
+            self._retire(browser, reason)
+            return
+        with self._cond:
+            if self._closed:
+                self._open -= 1
+                self._quit(browser)
+                return
+            self._idle.append(browser)
+            self._cond.notify()
+
+    @staticmethod
+    def _quit(browser: PooledBrowser) -> None:
+        try:
+            browser.driver.quit()
+        except Exception as e:
+            logger.warning(f"Browser quit failed: {e}")
+
+    def _retire(self, browser: PooledBrowser, reason: str) -> None:
+        self._quit(browser)
+        with self._cond:
+            self._open -= 1
+            self.retired[reason] = self.retired.get(reason, 0) + 1
+            self._cond.notify()
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            idle, self._idle = list(self._idle), deque()
+            self._open -= len(idle)
+            self._cond.notify_all()
+        for browser in idle:
+            self._quit(browser)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            idle = list(self._idle)
+            stats = {
+                "size": self.size,
+                "open": self._open,
+                "idle": len(idle),
+                "in_use": self._open - len(idle),
+                "waiting": self.waiting,
+                "launched": self.launched,
+                "launch_failures": self.launch_failures,
+                "checkouts": self.checkouts,
+                "checkout_timeouts": self.timeouts,
+                "checkout_wait_avg_ms": round(self.wait_total / self.checkouts * 1000, 1) if self.checkouts else 0.0,
+                "checkout_wait_max_ms": round(self.wait_max * 1000, 1),
+                "retired": dict(self.retired),
+            }
+        stats["idle_rss_mb"] = [process_tree_rss_mb(browser.pid) for browser in idle]
+        return stats
+
+
+browser_pool = BrowserPool(
+    chrome_factory,
+    size=settings.RPA_BROWSER_POOL_SIZE,
+    max_uses=settings.RPA_BROWSER_MAX_USES,
+    max_memory_mb=settings.RPA_BROWSER_MAX_MEMORY_MB,
+    checkout_timeout=settings.RPA_BROWSER_CHECKOUT_TIMEOUT,
+)
@@ -0,0 +1,182 @@
+"""
+RPA Automation Handlers
+Maps a target_website (services catalog supplier id) to the function that
+submits a job's form data there. In DEMO mode the targets that have a demo
+government table are handled either by driving the local demo portal in a
+pooled browser (RPA_BROWSER_AUTOMATION) or by writing to the table directly.
+"""
+import os
+import random
+import string
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.config import get_settings
+from app.data import get_service_loader
+from app.database import SessionLocal
+from app.models import (
+    ServiceType, DemoTorrentApplication, DemoAdaniGasApplication, DemoAmcWaterApplication, DemoAnyrorApplication
+)
+from app.rpa.queue import PermanentError, ensure_lease
+
+settings = get_settings()
+
+# handler(submission_data, target_url) -> response data, may set "confirmation_number"
+Handler = Callable[[Dict[str, Any], Optional[str]], Dict[str, Any]]
+
+_handlers: Dict[str, Handler] = {}
+
+
+def register_handler(target: str, handler: Handler) -> None:
+    _handlers[target] = handler
+
+
+def get_handler(target: str) -> Handler:
+    handler = _handlers.get(target)
+    if handler is None:
+        raise PermanentError(f"No automation registered for '{target}' in {settings.RPA_MODE} mode")
+    return handler
+
+
+def registered_targets():
+    return list(_handlers)
+
+
+# Default automation target per service when the form names no supplier,
+# these are the portals with a demo government counterpart
+DEFAULT_TARGETS = {
+    ServiceType.ELECTRICITY: "torrent-power",
+    ServiceType.GAS: "adani-gas",
+    ServiceType.WATER: "amc-water",
+    ServiceType.PROPERTY: "anyror",
+}
+
+
+def resolve_target(service_type: ServiceType, application_type: str, form_data: Dict[str, Any]) -> Tuple[str, Optional[str]]:
+    """(target_website, target_url) for an application, PermanentError if it cannot be automated"""
+    if application_type != "name_change":
+        raise PermanentError("Application type not supported for automation")
+    target = form_data.get("supplier_id") or DEFAULT_TARGETS.get(service_type)
+    _, supplier = get_service_loader().catalog.find_supplier(target) if target else (None, None)
+    if supplier is None:
+        raise PermanentError("Service type not supported for automation yet")
+    # Refuse here rather than let a worker fail the job after its retries
+    if target not in _handlers:
+        raise PermanentError(f"No automation registered for '{target}' in {settings.RPA_MODE} mode")
+    if settings.RPA_MODE == "DEMO":
+        return target, f"{settings.DEMO_BASE_URL}/{target}"
+    return target, supplier.get("name_change_url") or supplier.get("portal_url")
+
+
+# ============ DEMO GOVERNMENT PORTALS ============
+
+class DemoPortal:
+    """A demo government table plus the portal-specific form fields it stores"""
+
+    def __init__(self, model, prefix: str, screenshot_name: str, fields: List[str]):
+        self.model = model
+        self.prefix = prefix
+        self.screenshot_name = screenshot_name
+        self.fields = fields
+
+
+DEMO_PORTALS = {
+    "torrent-power": DemoPortal(DemoTorrentApplication, "TP", "torrent", ["service_number", "t_no"]),
+    "adani-gas": DemoPortal(DemoAdaniGasApplication, "AG", "adani_gas", ["consumer_number", "bp_number"]),
+    "amc-water": DemoPortal(DemoAmcWaterApplication, "AMC", "amc_water", ["connection_id", "zone"]),
+    "anyror": DemoPortal(DemoAnyrorApplication, "ROR", "anyror", ["survey_number", "property_id", "district"]),
+}
+
+
+def _confirmation_number(prefix: str) -> str:
+    suffix = "".join(random.choices(string.digits, k=6))
+    return f"{prefix}{datetime.utcnow():%Y%m%d}{suffix}"
+
+
+def applicant_name(data: Dict[str, Any]) -> str:
+    name = data.get("new_name") or data.get("applicant_name") or data.get("full_name")
+    if not name:
+        raise PermanentError("Applicant name is missing from the form data")
+    return name
+
+
+def record_demo_application(target: str, data: Dict[str, Any]) -> str:
+    """File an application in the target's demo table, returns its confirmation number"""
+    portal = DEMO_PORTALS[target]
+    confirmation_number = _confirmation_number(portal.prefix)
+    db = SessionLocal()
+    try:
+        db.add(portal.model(
+            confirmation_number=confirmation_number,
+            applicant_name=applicant_name(data),
+            mobile=data.get("mobile"),
+            email=data.get("email"),
+            application_type=data.get("application_type", "name_change"),
+            **{field: data.get(field) for field in portal.fields},
+        ))
+        db.commit()
+    finally:
+        db.close()
+    return confirmation_number
+
+
+def _direct_demo_handler(target: str) -> Handler:
+    """Writes straight to the demo table, no browser involved"""
+
+    def submit(data: Dict[str, Any], target_url: Optional[str]) -> Dict[str, Any]:
+        ensure_lease()
+        return {
+            "confirmation_number": record_demo_application(target, data),
+            "portal": target_url,
+            "message": "Application recorded by demo portal",
+        }
+
+    return submit
+
+
+def _browser_demo_handler(target: str) -> Handler:
+    """Fills the demo portal form (routers/demo_govt.py) in a pooled headless browser"""
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support import expected_conditions
+    from selenium.webdriver.support.ui import WebDriverWait
+    from app.rpa.browser_pool import browser_pool
+
+    portal = DEMO_PORTALS[target]
+
+    def submit(data: Dict[str, Any], target_url: Optional[str]) -> Dict[str, Any]:
+        values = {
+            "applicant_name": applicant_name(data),
+            "mobile": data.get("mobile"),
+            "email": data.get("email"),
+            **{field: data.get(field) for field in portal.fields},
+        }
+        with browser_pool.checkout() as driver:
+            driver.get(target_url)
+            for name, value in values.items():
+                if value:
+                    driver.find_element(By.NAME, name).send_keys(str(value))
+            # Submitting twice files two applications, only do it while the job is ours
+            ensure_lease()
+            driver.find_element(By.CSS_SELECTOR, "button[type=submit]").click()
+            confirmation = WebDriverWait(driver, settings.RPA_PAGE_TIMEOUT).until(
+                expected_conditions.presence_of_element_located((By.ID, "confirmation-number"))
+            ).text.strip()
+            screenshot = os.path.join(settings.RPA_SCREENSHOT_DIR, f"{portal.screenshot_name}_{confirmation}.png")
+            os.makedirs(settings.RPA_SCREENSHOT_DIR, exist_ok=True)
+            driver.save_screenshot(screenshot)
+        return {
+            "confirmation_number": confirmation,
+            "portal": target_url,
+            "screenshot": screenshot,
+            "message": "Application submitted through demo portal",
+        }
+
+    return submit
+
+
+if settings.RPA_MODE == "DEMO":
+    for target in DEMO_PORTALS:
+        if settings.RPA_BROWSER_AUTOMATION:
+            register_handler(target, _browser_demo_handler(target))
+        else:
+            register_handler(target, _direct_demo_handler(target))
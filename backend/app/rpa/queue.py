@@ -0,0 +1,396 @@
+"""
+RPA Submission Queue
+rpa_submissions rows are the jobs. Workers claim one at a time with a
+lease; a worker that dies mid-job loses its lease and the row is retried.
+"""
+import logging
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import and_, func, insert, or_, select, update
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app import events
+from app.config import get_settings
+from app.database import SessionLocal
+from app.models import Application, ApplicationStatus, RPASubmission, RPASubmissionStatus
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+CLAIMABLE = (RPASubmissionStatus.QUEUED, RPASubmissionStatus.RETRY)
+# An application has at most one job in these states (uq_rpa_submissions_active_application)
+ACTIVE = CLAIMABLE + (RPASubmissionStatus.PROCESSING,)
+
+
+class PermanentError(Exception):
+    """Raised by a handler when retrying cannot help (bad data, unsupported target)"""
+
+
+class LeaseLost(Exception):
+    """The job's lease could not be renewed, another worker may already be running it"""
+
+
+def backoff_seconds(retry_count: int) -> float:
+    """Exponential backoff with jitter, capped at RPA_RETRY_MAX_SECONDS"""
+    delay = min(settings.RPA_RETRY_MAX_SECONDS, settings.RPA_RETRY_BASE_SECONDS * 2 ** retry_count)
+    return delay * random.uniform(0.5, 1.0)
+
+
+def active_submission_query(application_id: int):
+    return (
+        select(RPASubmission)
+        .where(RPASubmission.application_id == application_id, RPASubmission.status.in_(ACTIVE))
+        .limit(1)
+    )
+
+
+def active_submission(db: Session, application_id: int) -> Optional[RPASubmission]:
+    """The application's queued, running or retrying job, if it has one"""
+    return db.scalar(active_submission_query(application_id))
+
+
+def enqueue(
+    db: Session,
+    application: Application,
+    target_website: str,
+    target_url: Optional[str],
+    submission_data: Dict[str, Any],
+) -> RPASubmission:
+    """
+    Add a job in the caller's transaction, it becomes visible on commit.
+    Callers check active_submission first; a concurrent duplicate fails the
+    commit with IntegrityError.
+    """
+    submission = RPASubmission(
+        application_id=application.id,
+        target_website=target_website,
+        target_url=target_url,
+        status=RPASubmissionStatus.QUEUED,
+        submission_data=submission_data,
+        retry_count=0,
+        max_retries=settings.RPA_MAX_RETRIES,
+        available_at=datetime.utcnow(),
+    )
+    db.add(submission)
+    application.status = ApplicationStatus.PROCESSING
+    return submission
+
+
+def enqueue_many(db: Session, user_id: int, jobs: List[Dict[str, Any]]) -> None:
+    """
+    Add jobs for one user's applications in one executemany INSERT, each a
+    dict with application_id, target_website, target_url and
+    submission_data. The caller sets the applications' status and commits;
+    the jobs' status events go out with that commit.
+    """
+    if not jobs:
+        return
+    now = datetime.utcnow()
+    inserted = db.execute(insert(RPASubmission).returning(
+        RPASubmission.id,
+        RPASubmission.application_id,
+        RPASubmission.target_website,
+        RPASubmission.status,
+        RPASubmission.retry_count,
+        RPASubmission.confirmation_number,
+        RPASubmission.error_message,
+    ), [
+        {
+            **job,
+            "status": RPASubmissionStatus.QUEUED,
+            "retry_count": 0,
+            "max_retries": settings.RPA_MAX_RETRIES,
+            "available_at": now,
+        }
+        for job in jobs
+    ]).all()
+    # A Core INSERT skips the ORM flush hooks that publish status events
+    for row in inserted:
+        events.publish_on_commit(db, "rpa_submission", user_id, events.rpa_submission_payload(row))
+
+
+def _ready(now: datetime):
+    return and_(
+        RPASubmission.status.in_(CLAIMABLE),
+        or_(RPASubmission.available_at.is_(None), RPASubmission.available_at <= now),
+    )
+
+
+def ready_targets(db: Session) -> List[str]:
+    """Distinct target_website values that have a job ready to run"""
+    rows = db.scalars(
+        select(RPASubmission.target_website).where(_ready(datetime.utcnow())).distinct()
+    ).all()
+    db.rollback()
+    return [target for target in rows if target]
+
+
+def _has_capacity(limits: Dict[str, float], now: datetime):
+    """
+    Condition on the row being claimed that its target has a slot free,
+    counted over every worker process: jobs running under a live lease
+    against max_in_flight, and attempts started within the last burst / rate
+    seconds against burst, a sliding-window token bucket
+    """
+    others = aliased(RPASubmission)
+    window = timedelta(seconds=limits["burst"] * 60.0 / limits["rate_per_minute"])
+    running = select(func.count()).select_from(others).where(
+        others.target_website == RPASubmission.target_website,
+        others.status == RPASubmissionStatus.PROCESSING,
+        others.lease_expires_at > now,
+    ).scalar_subquery()
+    started = select(func.count()).select_from(others).where(
+        others.target_website == RPASubmission.target_website,
+        others.started_at > now - window,
+    ).scalar_subquery()
+    return and_(running < int(limits["max_in_flight"]), started < limits["burst"])
+
+
+def claim(
+    db: Session,
+    worker_id: str,
+    targets: Optional[Iterable[str]] = None,
+    lease_seconds: Optional[float] = None,
+    limits: Optional[Dict[str, float]] = None,
+) -> Optional[RPASubmission]:
+    """
+    Claim the oldest ready job, optionally only for the given targets and
+    only while its target is within `limits` (rate_per_minute, burst and
+    max_in_flight, see scheduler.TargetScheduler.limits_for)
+
+    Postgres skips rows other workers have locked (FOR UPDATE SKIP LOCKED).
+    SQLite has a single writer, so the conditional UPDATE below acts as
+    compare-and-swap and a worker that loses the race tries the next row.
+    The limits are counted inside that UPDATE; on Postgres claims for one
+    target also take a transaction-level advisory lock, so two processes
+    cannot both count the last free slot.
+    """
+    lease_seconds = settings.RPA_LEASE_SECONDS if lease_seconds is None else lease_seconds
+    if limits is not None and limits["rate_per_minute"] <= 0:
+        return None
+    postgres = db.get_bind().dialect.name == "postgresql"
+    for _ in range(5):
+        now = datetime.utcnow()
+        candidate = select(RPASubmission.id, RPASubmission.target_website).where(_ready(now))
+        if targets is not None:
+            candidate = candidate.where(RPASubmission.target_website.in_(list(targets)))
+        candidate = candidate.order_by(RPASubmission.id).limit(1)
+        if postgres:
+            candidate = candidate.with_for_update(skip_locked=True)
+
+        row = db.execute(candidate).first()
+        if row is None:
+            db.rollback()
+            return None
+        job_id, target = row
+
+        condition = _ready(now)
+        if limits is not None:
+            if postgres:
+                db.execute(select(func.pg_advisory_xact_lock(func.hashtext(target))))
+            condition = and_(condition, _has_capacity(limits, now))
+        claimed = db.execute(
+            update(RPASubmission)
+            .where(RPASubmission.id == job_id, condition)
+            .values(
+                status=RPASubmissionStatus.PROCESSING,
+                claimed_by=worker_id,
+                started_at=now,
+                lease_expires_at=now + timedelta(seconds=lease_seconds),
+            )
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.commit()
+        if claimed:
+            job = db.get(RPASubmission, job_id, populate_existing=True)
+            # Claimed with a Core UPDATE, which the ORM status hooks do not see
+            events.publish("rpa_submission", job.application.user_id, events.rpa_submission_payload(job))
+            return job
+        if limits is not None and db.scalar(select(RPASubmission.id).where(RPASubmission.id == job_id, _ready(now))):
+            # Still ready, so its target is at its limit rather than the row taken
+            db.rollback()
+            return None
+    return None
+
+
+def extend_lease(db: Session, job_id: int, worker_id: str, lease_seconds: Optional[float] = None) -> bool:
+    """Push the lease out for a long job, False if the job was taken away"""
+    lease_seconds = settings.RPA_LEASE_SECONDS if lease_seconds is None else lease_seconds
+    extended = db.execute(
+        update(RPASubmission)
+        .where(
+            RPASubmission.id == job_id,
+            RPASubmission.status == RPASubmissionStatus.PROCESSING,
+            RPASubmission.claimed_by == worker_id,
+        )
+        .values(lease_expires_at=datetime.utcnow() + timedelta(seconds=lease_seconds))
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.commit()
+    return bool(extended)
+
+
+_current_lease = threading.local()
+
+
+class LeaseHeartbeat:
+    """
+    Renews a claimed job's lease from a background thread while its handler
+    runs, so a long portal session is not handed to a second worker. Used
+    as a context manager around the handler call; handlers call
+    ensure_lease() before any step that cannot be repeated.
+    """
+
+    def __init__(self, job_id: int, worker_id: str, lease_seconds: Optional[float] = None):
+        self.job_id = job_id
+        self.worker_id = worker_id
+        self.lease_seconds = settings.RPA_LEASE_SECONDS if lease_seconds is None else lease_seconds
+        self.lost = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        # Renewals stop counting as safe a little before the lease really ends
+        self._expires = time.monotonic() + self.lease_seconds * 0.9
+        self.renewals = 0
+
+    def __enter__(self) -> "LeaseHeartbeat":
+        self._thread = threading.Thread(target=self._run, name=f"rpa-lease-{self.job_id}", daemon=True)
+        self._thread.start()
+        _current_lease.heartbeat = self
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        _current_lease.heartbeat = None
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        interval = max(self.lease_seconds / 3, 0.1)
+        while not self._stop.wait(interval):
+            try:
+                db = SessionLocal()
+                try:
+                    renewed = extend_lease(db, self.job_id, self.worker_id, self.lease_seconds)
+                finally:
+                    db.close()
+            except Exception as e:
+                # Database hiccup: the lease still has time left, try again next beat
+                logger.warning(f"Could not renew lease on RPA job {self.job_id}: {e}")
+                if time.monotonic() >= self._expires:
+                    self.lost.set()
+                    return
+                continue
+            if not renewed:
+                self.lost.set()
+                return
+            self.renewals += 1
+            self._expires = time.monotonic() + self.lease_seconds * 0.9
+
+    def check(self) -> None:
+        if self.lost.is_set() or time.monotonic() >= self._expires:
+            self.lost.set()
+            raise LeaseLost(f"Lease on RPA job {self.job_id} was lost")
+
+
+def ensure_lease() -> None:
+    """Raise LeaseLost if the job running on this thread no longer holds its lease"""
+    heartbeat = getattr(_current_lease, "heartbeat", None)
+    if heartbeat is not None:
+        heartbeat.check()
+
+
+def _finish(db: Session, job: RPASubmission, worker_id: str, values: Dict[str, Any]) -> bool:
+    """
+    Write a job's outcome as one conditional UPDATE that only matches while
+    `worker_id` still holds it. False, with nothing written, if the lease
+    expired and the job was reclaimed in the meantime.
+    """
+    finished = db.execute(
+        update(RPASubmission)
+        .where(
+            RPASubmission.id == job.id,
+            RPASubmission.status == RPASubmissionStatus.PROCESSING,
+            RPASubmission.claimed_by == worker_id,
+        )
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if not finished:
+        db.rollback()
+        logger.warning(f"RPA job {job.id} lost its lease before {worker_id} finished")
+        return False
+    for name, value in values.items():
+        set_committed_value(job, name, value)
+    # Written with a Core UPDATE, which the ORM status hooks do not see
+    events.publish_on_commit(db, "rpa_submission", job.application.user_id, events.rpa_submission_payload(job))
+    return True
+
+
+def complete(db: Session, job: RPASubmission, worker_id: str, result: Dict[str, Any]) -> None:
+    now = datetime.utcnow()
+    finished = _finish(db, job, worker_id, {
+        "status": RPASubmissionStatus.SUCCESS,
+        "response_data": result,
+        "confirmation_number": result.get("confirmation_number"),
+        "error_message": None,
+        "completed_at": now,
+        "lease_expires_at": None,
+    })
+    if not finished:
+        return
+    application = job.application
+    application.status = ApplicationStatus.SUBMITTED
+    application.submitted_at = application.submitted_at or now
+    if job.confirmation_number:
+        application.external_reference = job.confirmation_number
+    db.commit()
+
+
+def fail(db: Session, job: RPASubmission, worker_id: str, error: str, permanent: bool = False) -> None:
+    """Schedule a retry after backoff, or give up once max_retries is used"""
+    if not _finish(db, job, worker_id, _failure(job, error, permanent)):
+        return
+    if job.status == RPASubmissionStatus.FAILED:
+        job.application.status = ApplicationStatus.PENDING
+    db.commit()
+
+
+def _failure(job: RPASubmission, error: str, permanent: bool) -> Dict[str, Any]:
+    """Column values recording a failed attempt: RETRY after backoff, or FAILED once retries run out"""
+    now = datetime.utcnow()
+    values: Dict[str, Any] = {"error_message": error, "lease_expires_at": None}
+    if permanent or job.retry_count >= job.max_retries:
+        values.update(status=RPASubmissionStatus.FAILED, completed_at=now)
+        logger.error(f"RPA job {job.id} for {job.target_website} failed: {error}")
+    else:
+        available_at = now + timedelta(seconds=backoff_seconds(job.retry_count))
+        values.update(status=RPASubmissionStatus.RETRY, available_at=available_at, retry_count=job.retry_count + 1)
+        logger.warning(f"RPA job {job.id} for {job.target_website} will retry at {available_at}: {error}")
+    return values
+
+
+def _fail(job: RPASubmission, error: str, permanent: bool) -> None:
+    for name, value in _failure(job, error, permanent).items():
+        setattr(job, name, value)
+    if job.status == RPASubmissionStatus.FAILED:
+        job.application.status = ApplicationStatus.PENDING
+
+
+def requeue_expired(db: Session) -> int:
+    """Visibility timeout: jobs whose worker stopped renewing the lease are retried"""
+    now = datetime.utcnow()
+    query = select(RPASubmission).where(
+        RPASubmission.status == RPASubmissionStatus.PROCESSING,
+        RPASubmission.lease_expires_at < now,
+    ).limit(100)
+    if db.get_bind().dialect.name == "postgresql":
+        query = query.with_for_update(skip_locked=True)
+    expired = db.scalars(query).all()
+    for job in expired:
+        _fail(job, f"Lease held by {job.claimed_by} expired", permanent=False)
+    db.commit()
+    return len(expired)
@@ -0,0 +1,109 @@
+"""
+Per-Portal Rate Shaping
+Each automation target gets a rate (submissions per minute, burst) and a
+cap on jobs in flight, read from the supplier's "rpa_limits" in
+services_data.json. Workers pick the least recently served target that has
+ready jobs, so one slow portal cannot hold every worker.
+
+The limits are enforced by queue.claim against the job table, so they hold
+across every worker thread and process; this module only orders targets
+and keeps per-process figures.
+"""
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Iterable, List
+
+from app.config import get_settings
+from app.data import get_service_loader
+
+settings = get_settings()
+
+# Completions kept per target for the throughput figure
+THROUGHPUT_WINDOW_SECONDS = 60.0
+
+
+class TargetState:
+    def __init__(self):
+        self.in_flight = 0
+        self.last_served = 0.0
+        self.claimed = 0
+        self.completed = 0
+        self.failed = 0
+        self.throttled = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.recent: deque = deque()
+
+
+class TargetScheduler:
+    """Target order and per-target figures for RPA workers, shared by the threads of one pool"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._targets: Dict[str, TargetState] = {}
+
+    @staticmethod
+    def limits_for(target: str) -> Dict[str, float]:
+        limits = get_service_loader().catalog.rpa_limits.get(target, {})
+        return {
+            "rate_per_minute": limits.get("rate_per_minute", settings.RPA_DEFAULT_RATE_PER_MINUTE),
+            "burst": limits.get("burst", settings.RPA_DEFAULT_BURST),
+            "max_in_flight": int(limits.get("max_in_flight", settings.RPA_DEFAULT_MAX_IN_FLIGHT)),
+        }
+
+    def _state(self, target: str) -> TargetState:
+        state = self._targets.get(target)
+        if state is None:
+            state = self._targets[target] = TargetState()
+        return state
+
+    def order(self, ready_targets: Iterable[str]) -> List[str]:
+        """Targets with ready jobs, least recently served first"""
+        with self._lock:
+            return sorted(ready_targets, key=lambda target: self._state(target).last_served)
+
+    def record_throttled(self, target: str) -> None:
+        """A claim for `target` found no free slot (or lost a race for the job)"""
+        with self._lock:
+            self._state(target).throttled += 1
+
+    def record_claim(self, target: str, waited: float) -> None:
+        with self._lock:
+            state = self._state(target)
+            state.in_flight += 1
+            state.claimed += 1
+            state.last_served = time.monotonic()
+            state.wait_total += waited
+            state.wait_max = max(state.wait_max, waited)
+
+    def record_result(self, target: str, succeeded: bool) -> None:
+        now = time.monotonic()
+        with self._lock:
+            state = self._state(target)
+            state.in_flight -= 1
+            if succeeded:
+                state.completed += 1
+                state.recent.append(now)
+            else:
+                state.failed += 1
+            while state.recent and state.recent[0] < now - THROUGHPUT_WINDOW_SECONDS:
+                state.recent.popleft()
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        with self._lock:
+            targets = {}
+            for target, state in self._targets.items():
+                targets[target] = {
+                    **self.limits_for(target),
+                    "in_flight": state.in_flight,
+                    "claimed": state.claimed,
+                    "completed": state.completed,
+                    "failed": state.failed,
+                    "throttled": state.throttled,
+                    "completed_last_minute": sum(1 for t in state.recent if t >= now - THROUGHPUT_WINDOW_SECONDS),
+                    "queue_wait_avg_ms": round(state.wait_total / state.claimed * 1000, 1) if state.claimed else 0.0,
+                    "queue_wait_max_ms": round(state.wait_max * 1000, 1),
+                }
+            return targets
@@ -0,0 +1,158 @@
+"""
+RPA Worker Pool
+Threads that claim queued submissions and run their automation handler,
+either inside the API process (RPA_WORKERS) or standalone via
+python -m app.rpa
+"""
+import logging
+import os
+import socket
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from app.config import get_settings
+from app.database import SessionLocal
+from app.rpa import queue
+from app.rpa.handlers import get_handler
+from app.rpa.scheduler import TargetScheduler
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+class RPAWorkerPool:
+    """Fixed number of worker threads polling the submission queue, shaped per target"""
+
+    def __init__(self, workers: int, poll_interval: float):
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.scheduler = TargetScheduler()
+        self.name = f"{socket.gethostname()}:{os.getpid()}"
+        self._threads: List[threading.Thread] = []
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._next_reap = 0.0
+        self.busy = 0
+        self.succeeded = 0
+        self.retried = 0
+        self.failed = 0
+        self.requeued = 0
+        self.leases_lost = 0
+        self.last_error: Optional[str] = None
+
+    def start(self) -> None:
+        if self._threads or self.workers <= 0:
+            return
+        self._stop.clear()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, args=(f"{self.name}/{i}",), name=f"rpa-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info(f"Started {self.workers} RPA workers")
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Stop claiming new jobs and wait for running ones to finish"""
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def _run(self, worker_id: str) -> None:
+        while not self._stop.is_set():
+            try:
+                worked = self.run_once(worker_id)
+            except Exception as e:
+                # Database unavailable or similar, back off and keep the thread alive
+                logger.exception(f"RPA worker {worker_id} error: {e}")
+                self.last_error = str(e)
+                worked = False
+            if not worked:
+                self._stop.wait(self.poll_interval)
+
+    def run_once(self, worker_id: str) -> bool:
+        """Claim and process one job, returns False when nothing could run"""
+        db = SessionLocal()
+        try:
+            self._reap(db)
+            ready = queue.ready_targets(db)
+            job, target = None, None
+            for target in self.scheduler.order(ready):
+                job = queue.claim(db, worker_id, targets=[target], limits=self.scheduler.limits_for(target))
+                if job is not None:
+                    break
+                # At max in flight or over its rate, across every worker process
+                self.scheduler.record_throttled(target)
+            
+            if job is None:
+                return False
+            
+            waited = (job.started_at - (job.available_at or job.started_at)).total_seconds()
+            self.scheduler.record_claim(target, max(waited, 0.0))
+            succeeded = False
+            try:
+                succeeded = self._process(db, job, worker_id)
+            finally:
+                self.scheduler.record_result(target, succeeded)
+            return True
+        finally:
+            db.close()
+
+    def _reap(self, db) -> None:
+        """Recover expired leases every RPA_REAP_INTERVAL, busy or idle (one worker per interval)"""
+        with self._lock:
+            now = time.monotonic()
+            if now < self._next_reap:
+                return
+            self._next_reap = now + settings.RPA_REAP_INTERVAL
+        requeued = queue.requeue_expired(db)
+        if requeued:
+            with self._lock:
+                self.requeued += requeued
+
+    def _process(self, db, job, worker_id: str) -> bool:
+        with self._lock:
+            self.busy += 1
+        try:
+            handler = get_handler(job.target_website)
+            with queue.LeaseHeartbeat(job.id, worker_id):
+                result = handler(job.submission_data or {}, job.target_url)
+        except queue.LeaseLost as e:
+            # Another worker owns the job now, leave the row to it
+            logger.error(f"RPA job {job.id} aborted: {e}")
+            self._count("leases_lost")
+            return False
+        except queue.PermanentError as e:
+            queue.fail(db, job, worker_id, str(e), permanent=True)
+            self._count("failed")
+            return False
+        except Exception as e:
+            logger.exception(f"RPA job {job.id} raised")
+            queue.fail(db, job, worker_id, f"{type(e).__name__}: {e}")
+            self._count("failed" if job.status == queue.RPASubmissionStatus.FAILED else "retried")
+            return False
+        else:
+            queue.complete(db, job, worker_id, result or {})
+            self._count("succeeded")
+            return True
+        finally:
+            with self._lock:
+                self.busy -= 1
+
+    def _count(self, outcome: str) -> None:
+        with self._lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "running": sum(thread.is_alive() for thread in self._threads),
+            "busy": self.busy,
+            "succeeded": self.succeeded,
+            "retried": self.retried,
+            "failed": self.failed,
+            "requeued_expired": self.requeued,
+            "leases_lost": self.leases_lost,
+            "last_error": self.last_error,
+            "targets": self.scheduler.stats(),
+        }
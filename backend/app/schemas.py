@@ -51,7 +51,9 @@ class DocumentResponse(BaseModel):
     doc_type: DocumentType
     file_url: str
     file_name: Optional[str]
+    thumbnail_url: Optional[str] = None
     extracted_data: Optional[dict]
+    extraction_status: Optional[str] = None
     is_verified: int
     created_at: datetime
     
@@ -166,6 +168,14 @@ class ApplicationResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class BulkApplicationRequest(BaseModel):
+    # Items are validated one by one so a bad row is reported, not a 422 for the batch
+    applications: List[dict]
+    submit: bool = True
+    automate: bool = False
+    # Insert nothing if any item is invalid
+    atomic: bool = False
+
 # Auto-fill Response
 class AutoFillData(BaseModel):
     user: UserResponse
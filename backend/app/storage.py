@@ -0,0 +1,185 @@
+"""
+Upload Storage
+Streams uploaded files to disk in fixed-size chunks through aiofiles,
+hashing (SHA-256) and size-checking in the same pass. Documents are kept
+in a content-addressed blob store, UPLOAD_DIR/blobs/ab/cd/<sha256>, so the
+same bytes uploaded twice occupy disk once. Document rows carrying the
+hash are the blob's references; it is unlinked when the last one goes.
+"""
+import asyncio
+import hashlib
+import os
+import uuid
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional
+
+import aiofiles
+import aiofiles.os
+from fastapi import UploadFile
+from sqlalchemy import func, select
+
+from app.config import get_settings
+from app.models import Document
+
+settings = get_settings()
+
+BLOB_DIR = os.path.join(settings.UPLOAD_DIR, "blobs")
+# Staging area on the same filesystem, so publishing a blob is a rename
+INCOMING_DIR = os.path.join(BLOB_DIR, "incoming")
+
+
+class UploadTooLarge(Exception):
+    """The upload exceeded UPLOAD_MAX_BYTES (HTTP 413)"""
+
+    def __init__(self, limit: int):
+        super().__init__(f"File exceeds the {limit / (1024 * 1024):.0f} MB upload limit")
+        self.limit = limit
+
+
+class StoredUpload:
+    def __init__(self, path: str, size: int, sha256: str, content_type: Optional[str] = None):
+        self.path = path
+        self.size = size
+        self.sha256 = sha256
+        self.content_type = content_type
+
+
+def safe_filename(filename: Optional[str], default: str = "upload") -> str:
+    """Client filename reduced to its last path component"""
+    name = os.path.basename((filename or "").replace("\\", "/")).strip()
+    return name if name and name not in (".", "..") else default
+
+
+async def save_upload(file: UploadFile, path: str, max_bytes: Optional[int] = None) -> StoredUpload:
+    """
+    Copy `file` to `path` chunk by chunk and return its size and hex digest.
+    Raises UploadTooLarge as soon as the limit is crossed; the temporary
+    file is removed on any failure.
+    """
+    limit = settings.UPLOAD_MAX_BYTES if max_bytes is None else max_bytes
+    if file.size is not None and file.size > limit:
+        raise UploadTooLarge(limit)
+
+    directory = os.path.dirname(path) or "."
+    await aiofiles.os.makedirs(directory, exist_ok=True)
+    temp_path = os.path.join(directory, f".{uuid.uuid4().hex}.part")
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        async with aiofiles.open(temp_path, "wb") as out:
+            while True:
+                chunk = await file.read(settings.UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > limit:
+                    raise UploadTooLarge(limit)
+                digest.update(chunk)
+                await out.write(chunk)
+        await aiofiles.os.replace(temp_path, path)
+    except BaseException:
+        try:
+            await aiofiles.os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+    return StoredUpload(path, size, digest.hexdigest(), file.content_type)
+
+
+# ============ BLOB STORE ============
+
+def blob_path(sha256: str) -> str:
+    return os.path.join(BLOB_DIR, sha256[:2], sha256[2:4], sha256)
+
+
+def upload_url(path: str) -> str:
+    """file_url for a path under UPLOAD_DIR, stored relative to it so the directory can move"""
+    return os.path.relpath(path, settings.UPLOAD_DIR).replace(os.sep, "/")
+
+
+def blob_url(sha256: str) -> str:
+    return upload_url(blob_path(sha256))
+
+
+# Files derived from a blob (app/imaging.py) live beside it and share its lifetime
+DERIVATIVES = ("normalized", "thumbnail")
+
+
+def derivative_path(sha256: str, kind: str) -> str:
+    return f"{blob_path(sha256)}.{kind}.jpg"
+
+
+def derivative_url(sha256: str, kind: str) -> str:
+    return upload_url(derivative_path(sha256, kind))
+
+
+_blob_locks: Dict[str, asyncio.Lock] = {}
+_blob_lock_users: Dict[str, int] = {}
+
+
+@asynccontextmanager
+async def blob_lock(sha256: str) -> AsyncIterator[None]:
+    """
+    Serializes the reference changes of one blob within this process: an
+    upload holds it from looking up the digest until publish_blob, a
+    delete from counting the remaining references until release_blob, so
+    a blob is never unlinked under a row that was committed meanwhile.
+    """
+    lock = _blob_locks.setdefault(sha256, asyncio.Lock())
+    _blob_lock_users[sha256] = _blob_lock_users.get(sha256, 0) + 1
+    try:
+        async with lock:
+            yield
+    finally:
+        _blob_lock_users[sha256] -= 1
+        if not _blob_lock_users[sha256]:
+            del _blob_lock_users[sha256]
+            del _blob_locks[sha256]
+
+
+def blob_references(sha256: str):
+    """Statement counting the Document rows that reference a blob"""
+    return select(func.count()).select_from(Document).where(Document.content_hash == sha256)
+
+
+async def receive_upload(file: UploadFile, max_bytes: Optional[int] = None) -> StoredUpload:
+    """Stream an upload into the staging area; publish_blob or discard_upload it next"""
+    return await save_upload(file, os.path.join(INCOMING_DIR, uuid.uuid4().hex), max_bytes)
+
+
+async def publish_blob(upload: StoredUpload) -> None:
+    """
+    Move a staged upload to its blob path, called under blob_lock once the
+    Document row referencing it is committed. A duplicate replaces the
+    existing blob with identical bytes.
+    """
+    path = blob_path(upload.sha256)
+    await aiofiles.os.makedirs(os.path.dirname(path), exist_ok=True)
+    await aiofiles.os.replace(upload.path, path)
+    upload.path = path
+
+
+async def discard_upload(upload: StoredUpload) -> None:
+    try:
+        await aiofiles.os.remove(upload.path)
+    except OSError:
+        pass
+
+
+async def release_blob(sha256: str, references: int) -> bool:
+    """
+    Unlink a blob once `references` is zero. The count must be taken after
+    the delete committed and under blob_lock, held until this returns.
+    """
+    if references:
+        return False
+    for kind in DERIVATIVES:
+        try:
+            await aiofiles.os.remove(derivative_path(sha256, kind))
+        except FileNotFoundError:
+            pass
+    try:
+        await aiofiles.os.remove(blob_path(sha256))
+    except FileNotFoundError:
+        return False
+    return True
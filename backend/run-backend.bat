@@ -6,7 +6,7 @@ echo 📦 Installing dependencies...
 pip install -r requirements.txt
 
 echo 🗄️ Setting up database...
-python -c "from app.database import engine, Base; Base.metadata.create_all(bind=engine); print('✅ Database initialized')"
+python -m app.migrations
 
 echo 🚀 Starting server on http://localhost:8000
 echo 📚 API Docs: http://localhost:8000/docs
@@ -0,0 +1,88 @@
+"""
+Endpoint Load Check
+Fires REQUESTS authenticated GETs at a running API with CONCURRENCY in
+flight and prints latency percentiles and throughput. Used for the
+numbers quoted when the documents router moved onto AsyncSession:
+
+    uvicorn app.main:app --port 8000            # one worker
+    python scripts/load_test.py --requests 2000 --concurrency 64
+
+The user is registered on first use. Run it before and after a change on
+the same machine and database; the absolute numbers mean little alone.
+"""
+import argparse
+import asyncio
+import hashlib
+import statistics
+import time
+from typing import List
+
+import httpx
+
+
+async def _token(client: httpx.AsyncClient, email: str, password: str) -> str:
+    response = await client.post("/api/auth/login", data={"username": email, "password": password})
+    if response.status_code == 401:
+        await client.post("/api/auth/register", json={
+            "email": email,
+            "mobile": f"9{int(hashlib.sha256(email.encode()).hexdigest(), 16) % 10 ** 9:09d}",
+            "password": password,
+            "full_name": "Load Test",
+        })
+        response = await client.post("/api/auth/login", data={"username": email, "password": password})
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+def _percentile(latencies: List[float], fraction: float) -> float:
+    ordered = sorted(latencies)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+async def run(base_url: str, path: str, requests: int, concurrency: int, email: str, password: str) -> None:
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60.0) as client:
+        headers = {"Authorization": f"Bearer {await _token(client, email, password)}"}
+        # Warm the server's caches and connection pools before measuring
+        await asyncio.gather(*(client.get(path, headers=headers) for _ in range(concurrency)))
+
+        latencies: List[float] = []
+        errors = 0
+        remaining = iter(range(requests))
+
+        async def worker() -> None:
+            nonlocal errors
+            for _ in remaining:
+                started = time.perf_counter()
+                try:
+                    response = await client.get(path, headers=headers)
+                    if response.status_code != 200:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    print(f"GET {path}: {requests} requests, {concurrency} concurrent, {errors} errors")
+    print(f"throughput {requests / elapsed:.0f} rps over {elapsed:.1f}s")
+    print(
+        f"latency ms  p50 {_percentile(latencies, 0.50) * 1000:.0f}"
+        f"  p95 {_percentile(latencies, 0.95) * 1000:.0f}"
+        f"  p99 {_percentile(latencies, 0.99) * 1000:.0f}"
+        f"  mean {statistics.mean(latencies) * 1000:.0f}"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--path", default="/api/documents/")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--email", default="loadtest@example.com")
+    parser.add_argument("--password", default="LoadTest123!")
+    args = parser.parse_args()
+    asyncio.run(run(args.base_url, args.path, args.requests, args.concurrency, args.email, args.password))
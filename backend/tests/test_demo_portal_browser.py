@@ -0,0 +1,92 @@
+"""
+Browser automation against the demo portal: serves the app on a local port
+and files an application through routers/demo_govt.py with a pooled headless
+Chrome, the way an RPA worker does with RPA_BROWSER_AUTOMATION on.
+Skipped when selenium or chromedriver is missing. Run from backend/ with:
+python -m pytest tests
+"""
+import os
+import socket
+import tempfile
+import threading
+import time
+
+import pytest
+
+# Settings are read at import, point the app at a scratch database first
+_scratch = tempfile.mkdtemp(prefix="demo-portal-")
+os.environ.update({
+    "DATABASE_URL": f"sqlite:///{os.path.join(_scratch, 'portal.db')}",
+    "AUTO_MIGRATE": "true",
+    "RPA_MODE": "DEMO",
+    "RPA_WORKERS": "0",
+    "OCR_ENABLED": "false",
+    "RPA_SCREENSHOT_DIR": os.path.join(_scratch, "screenshots"),
+})
+
+pytest.importorskip("selenium")
+uvicorn = pytest.importorskip("uvicorn")
+
+from app.database import SessionLocal  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models import DemoTorrentApplication  # noqa: E402
+from app.rpa import browser_pool as browser_pool_module, handlers  # noqa: E402
+from app.rpa.browser_pool import BrowserPool, chrome_factory  # noqa: E402
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture(scope="module")
+def portal_url():
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 30
+    while not server.started:
+        if not thread.is_alive() or time.monotonic() > deadline:
+            pytest.fail("demo portal server did not start")
+        time.sleep(0.05)
+    yield f"http://127.0.0.1:{port}/demo-govt"
+    server.should_exit = True
+    thread.join(timeout=10)
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    try:
+        chrome_factory().quit()
+    except Exception as e:
+        pytest.skip(f"no headless Chrome available: {e}")
+    pool = BrowserPool(chrome_factory, size=1, max_uses=5, max_memory_mb=1024.0, checkout_timeout=30.0)
+    # The handler takes the module-level pool when it is built
+    monkeypatch.setattr(browser_pool_module, "browser_pool", pool)
+    yield pool
+    pool.close()
+
+
+def test_browser_handler_files_demo_application(portal_url, pool):
+    submit = handlers._browser_demo_handler("torrent-power")
+    data = {
+        "full_name": "Asha Patel",
+        "mobile": "9876543210",
+        "email": "asha@example.com",
+        "service_number": "SN-1001",
+        "t_no": "T-42",
+    }
+
+    result = submit(data, f"{portal_url}/torrent-power")
+
+    confirmation = result["confirmation_number"]
+    assert confirmation.startswith("TP")
+    assert os.path.exists(result["screenshot"])
+    assert pool.checkouts == 1
+    with SessionLocal() as db:
+        row = db.query(DemoTorrentApplication).filter_by(confirmation_number=confirmation).one()
+    assert row.service_number == "SN-1001"
+    assert row.t_no == "T-42"
+    assert row.mobile == "9876543210"
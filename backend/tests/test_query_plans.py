@@ -0,0 +1,28 @@
+"""
+Index coverage of the hot per-user queries: migrates a scratch SQLite
+database and EXPLAINs every statement the routers run, failing when one
+falls back to a full table scan or a sort without an index.
+"""
+import pytest
+from sqlalchemy import create_engine
+
+from app import migrations
+from app.migrations import plans
+
+HOT_QUERIES = [name for name, _ in plans.hot_queries("sqlite")]
+
+
+@pytest.fixture(scope="module")
+def query_plans(tmp_path_factory):
+    engine = create_engine(f"sqlite:///{tmp_path_factory.mktemp('plans') / 'plans.db'}")
+    try:
+        migrations.upgrade(engine)
+        yield {name: (indexed, plan) for name, indexed, plan in plans.explain(engine)}
+    finally:
+        engine.dispose()
+
+
+@pytest.mark.parametrize("name", HOT_QUERIES)
+def test_hot_query_uses_an_index(query_plans, name):
+    indexed, plan = query_plans[name]
+    assert indexed, f"{name} scans or sorts without an index: {plan}"
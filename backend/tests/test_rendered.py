@@ -0,0 +1,36 @@
+"""
+Content-coding negotiation for the pre-rendered catalog responses
+"""
+import pytest
+
+from app.data import rendered
+
+PAYLOAD = [{"name": f"provider {i}", "code": f"P{i:04d}"} for i in range(100)]
+
+
+@pytest.fixture
+def body(monkeypatch):
+    # gzip only, whether or not brotli is installed
+    monkeypatch.setattr(rendered, "brotli", None)
+    return rendered.RenderedJSON(PAYLOAD)
+
+
+@pytest.mark.parametrize("accept_encoding, expected", [
+    ("", None),
+    ("gzip", "gzip"),
+    ("GZIP, deflate", "gzip"),
+    ("gzip;q=0.5", "gzip"),
+    ("*", "gzip"),
+    ("deflate", None),
+    ("gzip;q=0", None),
+    ("gzip;q=0, *", None),
+    ("*, gzip;q=0", None),
+    ("*;q=0", None),
+    ("*;q=0, gzip", "gzip"),
+])
+def test_pick_encoding(body, accept_encoding, expected):
+    assert body.pick_encoding(accept_encoding) == expected
+
+
+def test_small_bodies_are_not_compressed():
+    assert rendered.RenderedJSON({"ok": True}).pick_encoding("gzip") is None
@@ -7,16 +7,59 @@ const Applications = () => {
   const navigate = useNavigate();
   const [applications, setApplications] = useState([]);
   const [loading, setLoading] = useState(true);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [total, setTotal] = useState(null);
 
   useEffect(() => {
     fetchApplications();
+    fetchTotal();
   }, []);
 
-  const fetchApplications = async () => {
+  // Live status updates instead of polling each application
+  useEffect(() => {
+    if (!localStorage.getItem('token') || typeof EventSource === 'undefined') return undefined;
+    let source = null;
+    let retryTimer = null;
+    let closed = false;
+
+    // The stream is opened with a single-use ticket, so every reconnect needs a fresh one
+    const connect = async () => {
+      try {
+        const { data } = await api.post('/events/ticket');
+        if (closed) return;
+        source = new EventSource(`/api/events/stream?ticket=${encodeURIComponent(data.ticket)}`);
+        source.addEventListener('application', (event) => {
+          const update = JSON.parse(event.data);
+          setApplications(prev => prev.map(app => (
+            app.id === update.id
+              ? { ...app, status: update.status, external_reference: update.external_reference ?? app.external_reference }
+              : app
+          )));
+        });
+        source.onerror = () => {
+          source.close();
+          if (!closed) retryTimer = setTimeout(connect, 3000);
+        };
+      } catch (error) {
+        if (!closed) retryTimer = setTimeout(connect, 3000);
+      }
+    };
+    connect();
+
+    return () => {
+      closed = true;
+      clearTimeout(retryTimer);
+      if (source) source.close();
+    };
+  }, []);
+
+  const fetchApplications = async (cursor = null) => {
     try {
       setLoading(true);
-      const response = await api.get('/applications/');
-      setApplications(response.data || []);
+      const response = await api.get('/applications/', { params: cursor ? { cursor } : {} });
+      const page = response.data || [];
+      setApplications(prev => (cursor ? [...prev, ...page] : page));
+      setNextCursor(response.headers['x-next-cursor'] || null);
     } catch (error) {
       console.error('Failed to fetch applications');
     } finally {
@@ -24,6 +67,16 @@ const Applications = () => {
     }
   };
 
+  // The list is paged, so the count comes from the stats endpoint rather than what is loaded
+  const fetchTotal = async () => {
+    try {
+      const response = await api.get('/applications/stats');
+      setTotal(response.data?.total ?? null);
+    } catch (error) {
+      console.error('Failed to fetch application count');
+    }
+  };
+
   const getStatusIcon = (status) => {
     switch (status) {
       case 'completed': return <CheckCircle className="w-5 h-5 text-green-500" />;
@@ -130,13 +183,13 @@ const Applications = () => {
             <h2 className="text-xl font-bold text-gray-800">Recent Applications</h2>
             <div className="flex items-center gap-2 text-sm text-gray-500">
               <Filter className="w-4 h-4" />
-              Total: {applications.length}
+              {total !== null ? `Total: ${total}` : `Loaded: ${applications.length}`}
             </div>
           </div>
         </div>
 
         <div className="p-6">
-          {loading ? (
+          {loading && applications.length === 0 ? (
             <div className="flex items-center justify-center py-12">
               <div className="text-center">
                 <div className="w-12 h-12 border-4 border-blue-500 border-t-transparent rounded-full animate-spin mx-auto mb-4"></div>
@@ -205,6 +258,14 @@ const Applications = () => {
                   </div>
                 </div>
               ))}
+              {nextCursor && (
+                <button
+                  onClick={() => fetchApplications(nextCursor)}
+                  className="w-full py-3 text-sm font-medium text-blue-600 hover:bg-blue-50 rounded-lg transition-colors"
+                >
+                  Load more
+                </button>
+              )}
             </div>
           )}
         </div>
@@ -43,13 +43,13 @@ const Dashboard = () => {
 
   const fetchStats = async () => {
     try {
-      const appsRes = await api.get('/applications/');
-      const applications = appsRes.data || [];
-      const pending = applications.filter(a => ['pending', 'draft', 'processing'].includes(a.status)).length;
-      const completed = applications.filter(a => a.status === 'completed').length;
+      const statsRes = await api.get('/applications/stats');
+      const byStatus = statsRes.data?.by_status || {};
+      const pending = ['pending', 'draft', 'processing'].reduce((sum, s) => sum + (byStatus[s] || 0), 0);
+      const completed = byStatus.completed || 0;
       
       setStats({
-        applications: applications.length,
+        applications: statsRes.data?.total || 0,
         pending: pending,
         completed: completed
       });